@@ -1,11 +1,15 @@
 import abc
 import dataclasses
 from pathlib import Path
-from typing import Any, Protocol
+from typing import TYPE_CHECKING, Any, Protocol
 
+from codefox.prompts.prompt_template import PromptTemplate
 from codefox.utils.helper import Helper
-from codefox.utils.local_rag import LocalRAG
 from codefox.utils.parser import Parser
+from codefox.utils.token_budget import TokenBudget, TokenCounter
+
+if TYPE_CHECKING:
+    from codefox.utils.local_rag import LocalRAG
 
 
 class ExecuteResponse(Protocol):
@@ -21,6 +25,9 @@ class BaseAPI(abc.ABC):
     default_embedding = "BAAI/bge-small-en-v1.5"
     default_max_rag_chars = 4096
     default_max_diff_chars = 16_000
+    default_rag_retrieval = "hunks"
+    rag_retrieval_modes = ("hunks", "diff")
+    diff_truncated_notice = "\n\n... [diff truncated for context length]"
 
     def __init__(self, config: dict[str, Any] | None = None) -> None:
         super().__init__()
@@ -58,6 +65,15 @@ class BaseAPI(abc.ABC):
             or self.default_max_diff_chars
         )
 
+        self.token_budget: TokenBudget | None = None
+        if self.model_config["context_window"]:
+            self.token_budget = TokenBudget(
+                TokenCounter(self.model_config["name"]),
+                self.model_config["context_window"],
+                self.model_config["max_completion_tokens"]
+                or self.model_config["max_tokens"],
+            )
+
     @abc.abstractmethod
     def check_model(self, name: str) -> bool:
         pass
@@ -76,6 +92,17 @@ class BaseAPI(abc.ABC):
             self.rag = None
             return True, None
 
+        if self.rag is not None and self.rag.files_path == path_files:
+            # Still open from an earlier review (``codefox serve``): only
+            # the changes since then are indexed.
+            try:
+                self.rag.refresh_files()
+                if self.rag.update():
+                    self.rag.save_index()
+                return True, None
+            except Exception as e:
+                return False, f"LocalRAG error: {str(e)}"
+
         rag_kw = {
             "max_query_chars": self.model_config.get(
                 "rag_max_query_chars", 2000
@@ -91,10 +118,24 @@ class BaseAPI(abc.ABC):
             "rag_threads_embedding": "threads_embedding",
             "rag_lazy_load": "lazy_load",
             "rag_index_dir": "index_dir",
+            "rag_workers": "workers",
+            "rag_pipeline_depth": "pipeline_depth",
+            "rag_upload_parallel": "upload_parallel",
+            "rag_backend": "backend",
+            "rag_quantization": "quantization",
+            "rag_dimensions": "dimensions",
+            "rag_sentence_splitter": "sentence_splitter",
+            "rag_max_file_size": "max_file_size",
+            "rag_skip_generated": "skip_generated",
+            "rag_store_text": "store_text",
+            "rag_query_cache_size": "query_cache_size",
+            "rag_persist_query_cache": "persist_query_cache",
         }
         for config_key, kw_key in key_map.items():
             if config_key in self.model_config:
                 rag_kw[kw_key] = self.model_config[config_key]
+        if self.model_config.get("rag_vector_cache") is False:
+            rag_kw["vector_cache_dir"] = None
 
         safe_rag_kw = {}
         for k, v in rag_kw.items():
@@ -110,6 +151,8 @@ class BaseAPI(abc.ABC):
                 safe_rag_kw[k] = v
 
         try:
+            from codefox.utils.local_rag import LocalRAG
+
             self.rag = LocalRAG(
                 self.model_config["embedding"],
                 files_path=path_files,
@@ -118,6 +161,8 @@ class BaseAPI(abc.ABC):
             if not self.rag.load_index():
                 self.rag.build()
                 self.rag.save_index()
+            elif self.rag.update():
+                self.rag.save_index()
             return True, None
         except Exception as e:
             return False, f"LocalRAG error: {str(e)}"
@@ -131,22 +176,70 @@ class BaseAPI(abc.ABC):
         return []
 
     def get_context(self, diff_text: str) -> str:
-        if len(diff_text) > self.max_diff_chars:
-            diff_text = (
-                diff_text[: self.max_diff_chars]
-                + "\n\n... [diff truncated for context length]"
+        return self.build_context(diff_text)[1]
+
+    def build_context(self, diff_text: str) -> tuple[str, str]:
+        # Returns the diff to send, truncated if needed, and the RAG
+        # context. With ``context_window`` set both share one token
+        # budget; otherwise the character limits apply.
+        max_rag_tokens = None
+        budget = self.token_budget
+        if budget is None:
+            if len(diff_text) > self.max_diff_chars:
+                diff_text = (
+                    diff_text[: self.max_diff_chars]
+                    + self.diff_truncated_notice
+                )
+            budget_chars = self.max_rag_chars
+        else:
+            fixed_text = (
+                PromptTemplate(self.config).get()
+                + PromptTemplate(
+                    {"files_context": "", "diff_text": ""}, "content"
+                ).get()
             )
-
-        rag_context = ""
-        if self.rag:
+            diff_tokens, max_rag_tokens = budget.split(
+                fixed_text, diff_text, with_rag=self.rag is not None
+            )
+            counter = budget.counter
+            if counter.count(diff_text) > diff_tokens:
+                diff_text = (
+                    counter.truncate(
+                        diff_text,
+                        diff_tokens
+                        - counter.count(self.diff_truncated_notice),
+                    )
+                    + self.diff_truncated_notice
+                )
+            budget_chars = int(max_rag_tokens * counter.chars_per_token)
+
+        if not self.rag:
+            return diff_text, ""
+
+        k = Parser.context_k(
+            budget_chars, self.rag.kwargs.get("chunk_size", 1000)
+        )
+        counter_arg = budget.counter if budget else None
+        if self.model_config["rag_retrieval"] == "hunks":
+            rag_context = Parser.get_hunks_context(
+                self.rag,
+                diff_text,
+                k=k,
+                max_rag_chars=self.max_rag_chars,
+                max_rag_tokens=max_rag_tokens,
+                counter=counter_arg,
+            )
+        else:
             rag_context = Parser.get_files_context(
                 self.rag,
                 diff_text,
-                k=12,
+                k=k,
                 max_rag_chars=self.max_rag_chars,
+                max_rag_tokens=max_rag_tokens,
+                counter=counter_arg,
             )
 
-        return rag_context
+        return diff_text, rag_context
 
     def _processing_review_config(
         self, review_config: dict[str, Any]
@@ -222,4 +315,24 @@ class BaseAPI(abc.ABC):
         if not isinstance(timeout, (int, float)) or timeout <= 0:
             raise ValueError(f"Timeout must be positive number, got {timeout}")
 
+        context_window = model_config.setdefault("context_window", None)
+        if context_window is not None and (
+            not isinstance(context_window, int)
+            or isinstance(context_window, bool)
+            or context_window <= 0
+        ):
+            raise ValueError(
+                "context_window must be a positive integer, "
+                f"got {context_window}"
+            )
+
+        retrieval = model_config.setdefault(
+            "rag_retrieval", self.default_rag_retrieval
+        )
+        if retrieval not in self.rag_retrieval_modes:
+            raise ValueError(
+                "rag_retrieval must be one of: "
+                f"{', '.join(self.rag_retrieval_modes)}, got {retrieval}"
+            )
+
         return model_config
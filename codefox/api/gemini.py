@@ -48,7 +48,7 @@ class Gemini(BaseAPI):
         self.rag = None
 
     def execute(self, diff_text: str) -> ExecuteResponse:
-        rag_context = self.get_context(diff_text)
+        diff_text, rag_context = self.build_context(diff_text)
 
         system_prompt = PromptTemplate(self.config)
         context_prompt = PromptTemplate(
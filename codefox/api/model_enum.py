@@ -1,20 +1,23 @@
 import enum
-from typing import cast
+import importlib
+from typing import TYPE_CHECKING, cast
 
-from codefox.api.base_api import BaseAPI
-from codefox.api.gemini import Gemini
-from codefox.api.ollama import Ollama
-from codefox.api.openrouter import OpenRouter
+if TYPE_CHECKING:
+    from codefox.api.base_api import BaseAPI
 
 
 class ModelEnum(enum.Enum):
-    GEMINI = Gemini
-    OPENROUTER = OpenRouter
-    OLLAMA = Ollama
+    # Provider SDKs are slow to import, so each member names its class
+    # and the module is only imported when the class is requested.
+    GEMINI = "codefox.api.gemini.Gemini"
+    OPENROUTER = "codefox.api.openrouter.OpenRouter"
+    OLLAMA = "codefox.api.ollama.Ollama"
 
     @property
-    def api_class(self) -> type[BaseAPI]:
-        return cast(type[BaseAPI], self.value)
+    def api_class(self) -> "type[BaseAPI]":
+        module_name, class_name = self.value.rsplit(".", 1)
+        module = importlib.import_module(module_name)
+        return cast("type[BaseAPI]", getattr(module, class_name))
 
     @classmethod
     def by_name(cls, name: str) -> "ModelEnum":
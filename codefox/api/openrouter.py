@@ -39,7 +39,7 @@ class OpenRouter(BaseAPI):
         return name in self.get_tag_models()
 
     def execute(self, diff_text: str = "") -> ExecuteResponse:
-        rag_context = self.get_context(diff_text)
+        diff_text, rag_context = self.build_context(diff_text)
 
         rag_tool = RagTool(self.rag, self.max_rag_chars)
         search_knowledge_base = rag_tool.get_tool()
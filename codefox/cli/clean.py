@@ -25,12 +25,14 @@ class Clean(BaseCLI):
             return
 
         if type_cache == "all":
-            for cache_type in ("rag", "embedding"):
+            for cache_type in ("rag", "embedding", "vectors"):
                 path = self._get_dir_cache(cache_type)
                 self._clean_dir(path)
             return
 
-        print("Argument invalid. Use next params: all, rag, embedding'")
+        print(
+            "Argument invalid. Use next params: all, rag, embedding, vectors'"
+        )
 
     def _clean_dir(self, path: Path | None) -> None:
         if not path or not path.exists():
@@ -55,11 +57,16 @@ class Clean(BaseCLI):
             return Path(self._get_embedding_cache())
         elif type_cache == "rag":
             return Path(self._get_rag_index_dir())
+        elif type_cache == "vectors":
+            return Path(self._get_vector_cache_dir())
         return None
 
     def _get_embedding_cache(self) -> str:
         return LocalRAG.default_cache_dir
 
+    def _get_vector_cache_dir(self) -> str:
+        return LocalRAG.default_vector_cache_dir
+
     def _get_rag_index_dir(self) -> str:
         configured_path = self.model.model_config.get(
             "rag_index_dir", LocalRAG.default_index_dir
@@ -0,0 +1,74 @@
+import time
+from typing import Any
+
+from rich import print
+from rich.table import Table
+
+from codefox.cli.base_cli import BaseCLI
+from codefox.utils.daemon import DaemonClient
+
+
+class Daemon(BaseCLI):
+    def __init__(self, args: dict[str, Any] | None = None):
+        self.args = args
+
+    def execute(self) -> None:
+        action = (self.args or {}).get("action", "status")
+        if action not in ("status", "stop"):
+            print("Argument invalid. Use next params: status, stop")
+            return
+
+        response = DaemonClient().request({"command": action}, timeout=10)
+        if response is None:
+            print("[yellow]CodeFox daemon is not running[/yellow]")
+            return
+        if not response.get("ok"):
+            print(f"[red]Daemon error: {response.get('error')}[/red]")
+            return
+
+        if action == "stop":
+            print("[green]CodeFox daemon stopped[/green]")
+            return
+        self._print_status(response)
+
+    def _print_status(self, status: dict[str, Any]) -> None:
+        print(
+            f"[green]CodeFox daemon running[/green] (pid {status['pid']}, "
+            f"up {status['uptime'] / 60:.0f} min, "
+            f"{status['rss'] / 2**20:.0f} MiB RSS"
+            + (", reviewing" if status.get("busy") else "")
+            + ")"
+        )
+        repos = status.get("repos") or []
+        if not repos:
+            print("[yellow]No repositories loaded yet[/yellow]")
+            return
+
+        table = Table()
+        table.add_column("Repository", style="cyan")
+        table.add_column("Model")
+        table.add_column("Files", justify="right")
+        table.add_column("Chunks", justify="right")
+        table.add_column("Index")
+        table.add_column("Last scan")
+        for repo in repos:
+            if "files" not in repo:
+                freshness = "no index"
+            elif repo["stale_files"]:
+                freshness = f"[yellow]{repo['stale_files']} changed[/yellow]"
+            else:
+                freshness = "[green]fresh[/green]"
+            last_used = (
+                time.strftime("%H:%M:%S", time.localtime(repo["last_used"]))
+                if repo["last_used"]
+                else "-"
+            )
+            table.add_row(
+                repo["path"],
+                f"{repo['provider']} {repo['model']}",
+                str(repo.get("files", "-")),
+                str(repo.get("chunks", "-")),
+                freshness,
+                last_used,
+            )
+        print(table)
@@ -5,7 +5,6 @@ from rich.table import Table
 
 from codefox.api.base_api import BaseAPI
 from codefox.cli.base_cli import BaseCLI
-from codefox.utils.local_rag import LocalRAG
 
 
 class List(BaseCLI):
@@ -17,6 +16,8 @@ class List(BaseCLI):
 
     def _get_tag_model(self) -> list[str]:
         if self.args and self.args.get("typeModel") == "embeddings":
+            from codefox.utils.local_rag import LocalRAG
+
             return LocalRAG.get_model_tag()
 
         return self.model.get_tag_models()
@@ -1,4 +1,5 @@
 import os
+import sys
 from typing import Any
 
 from rich import print
@@ -8,22 +9,80 @@ from rich.markdown import Markdown
 from rich.markup import escape
 
 from codefox.api.base_api import BaseAPI
-from codefox.bots.github_bot import GitHubBot
 from codefox.cli.base_cli import BaseCLI
 from codefox.cli.list import List
+from codefox.utils.daemon import DaemonClient
 from codefox.utils.helper import Helper
 
 
 class Scan(BaseCLI):
+    # Environment the daemon needs to build the provider client.
+    forwarded_env = ("CODEFOX_API_KEY",)
+
     def __init__(self, model: type[BaseAPI], args: dict[str, Any]):
         self.model = model()
         self.args = args
+        self.model_checked = False
 
         self.github_bot = None
         if self.args.get("ci", False):
+            from codefox.bots.github_bot import GitHubBot
+
             self.github_bot = GitHubBot()
 
     def execute(self) -> None:
+        diff_text = self.prepare()
+        if diff_text is None:
+            return
+
+        try:
+            print("[yellow]Waiting for model response...[/yellow]")
+
+            if not self.args.get("ci", False):
+                self._classic_response_answer(diff_text)
+                return
+
+            self._ci_response_answer(diff_text)
+        finally:
+            # Writes out the query cache entries this review added.
+            if self.model.rag is not None:
+                self.model.rag.close()
+
+    @classmethod
+    def execute_remote(cls, args: dict[str, Any]) -> bool:
+        # Hands the review to a running "codefox serve" daemon. Returns
+        # False when none is listening, so the caller scans locally.
+        if args.get("ci", False):
+            return False
+        client = DaemonClient()
+        conn = client.connect()
+        if conn is None:
+            return False
+
+        print("[yellow]Waiting for CodeFox daemon response...[/yellow]")
+        env = {
+            name: os.environ[name]
+            for name in cls.forwarded_env
+            if name in os.environ
+        }
+        response = client.send(
+            conn,
+            {"command": "scan", "cwd": os.getcwd(), "args": args, "env": env},
+        )
+        sys.stdout.write(response.get("output", ""))
+        if not response.get("ok"):
+            print(
+                "[red]Failed scan: "
+                + escape(str(response.get("error")))
+                + "[/red]"
+            )
+        elif response.get("text") is not None:
+            cls._show_result(response["text"])
+        return True
+
+    def prepare(self) -> str | None:
+        # Everything up to the model request; returns the diff to review,
+        # or None once the reason for stopping has been printed.
         source_branch, target_branch = self._get_branchs()
 
         diff_text = Helper.get_diff(source_branch, target_branch)
@@ -31,32 +90,34 @@ class Scan(BaseCLI):
             print(
                 "[yellow]Repository is not found or not have change[/yellow]"
             )
-            return
-
-        is_connect, error = self.model.check_connection()
-        if not is_connect:
-            print(f"[red]Failed to connect to model: {error}[/red]")
-            return
-
-        name = self.model.model_config["name"]
-        if not self.model.check_model(name):
-            print(f"[red]Model '{name}' not found.")
-
-            command = List(
-                model=self.model.__class__,
-                args={
-                    "typeModel": "models",
-                },
-            )
-            command.execute()
-            return
+            return None
+
+        if not self.model_checked:
+            is_connect, error = self.model.check_connection()
+            if not is_connect:
+                print(f"[red]Failed to connect to model: {error}[/red]")
+                return None
+
+            name = self.model.model_config["name"]
+            if not self.model.check_model(name):
+                print(f"[red]Model '{name}' not found.")
+
+                command = List(
+                    model=self.model.__class__,
+                    args={
+                        "typeModel": "models",
+                    },
+                )
+                command.execute()
+                return None
+            self.model_checked = True
 
         if not diff_text.strip():
             print(
                 "[yellow]No changes to analyze."
                 "Make changes and run scan again.[/yellow]"
             )
-            return
+            return None
 
         is_upload, error = self.model.upload_files(os.getcwd())
         if not is_upload:
@@ -65,15 +126,9 @@ class Scan(BaseCLI):
                 + escape(str(error))
                 + "[/red]"
             )
-            return
-
-        print("[yellow]Waiting for model response...[/yellow]")
-
-        if not self.args.get("ci", False):
-            self._classic_response_answer(diff_text)
-            return
+            return None
 
-        self._ci_response_answer(diff_text)
+        return diff_text
 
     def _ci_response_answer(self, diff_text: str) -> None:
         response = self.model.execute(diff_text)
@@ -84,22 +139,23 @@ class Scan(BaseCLI):
     def _classic_response_answer(self, diff_text: str) -> None:
         try:
             response = self.model.execute(diff_text)
-
-            console = Console()
-            text = Markdown(response.text, code_theme="manni")
-            print("[green]Scan result from model:[/green]\n")
-            console.print(text)
-        except MarkupError:
-            print(
-                "[green]Scan result from model:[/green]\n"
-                + escape(response.text)
-            )
+            self._show_result(response.text)
         except Exception as e:
             err_str = str(e)
             print("[red]Failed scan: " + escape(err_str) + "[/red]")
 
         self.model.remove_files()
 
+    @staticmethod
+    def _show_result(text: str) -> None:
+        try:
+            console = Console()
+            markdown = Markdown(text, code_theme="manni")
+            print("[green]Scan result from model:[/green]\n")
+            console.print(markdown)
+        except MarkupError:
+            print("[green]Scan result from model:[/green]\n" + escape(text))
+
     def _get_branchs(self) -> tuple[str | None, str | None]:
         source_branch = self.args.get("sourceBranch")
         target_branch = self.args.get("targetBranch")
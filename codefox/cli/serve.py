@@ -0,0 +1,19 @@
+from rich import print
+
+from codefox.cli.base_cli import BaseCLI
+from codefox.utils.daemon import DaemonServer
+
+
+class Serve(BaseCLI):
+    def execute(self) -> None:
+        server = DaemonServer()
+        print(
+            f"[green]CodeFox daemon listening on {server.socket_path}[/green]"
+        )
+        try:
+            server.serve_forever()
+        except RuntimeError as e:
+            print(f"[red]{e}[/red]")
+        except KeyboardInterrupt:
+            pass
+        print("[yellow]CodeFox daemon stopped[/yellow]")
@@ -1,18 +1,16 @@
 import importlib.metadata
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from dotenv import load_dotenv
 from rich import print
 
-from codefox.api.base_api import BaseAPI
 from codefox.api.model_enum import ModelEnum
-from codefox.cli.clean import Clean
-from codefox.cli.init import Init
-from codefox.cli.list import List
-from codefox.cli.scan import Scan
 from codefox.utils.helper import Helper
 
+if TYPE_CHECKING:
+    from codefox.api.base_api import BaseAPI
+
 
 class CLIManager:
     def __init__(self, command: str, args: dict[str, Any] | None = None):
@@ -20,9 +18,12 @@ class CLIManager:
         self.args = args
 
         path_env = Path(".codefoxenv")
+        # The daemon gets credentials from each scan that uses it.
         if not load_dotenv(path_env) and command not in [
             "init",
             "version",
+            "serve",
+            "daemon",
         ]:
             raise FileNotFoundError(
                 "Failed to load .codefoxenv file."
@@ -35,25 +36,50 @@ class CLIManager:
             print(f"[green]CodeFox CLI version {version}[/green]")
             return
 
+        # Commands are imported on use, so lightweight ones such as
+        # "version" never load the provider SDKs or the RAG stack.
         if self.command == "list":
+            from codefox.cli.list import List
+
             api_class = self._get_api_class()
             list_model = List(api_class, self.args)
             list_model.execute()
             return
 
         if self.command == "scan":
+            from codefox.cli.scan import Scan
+
+            if Scan.execute_remote(self.args or {}):
+                return
+
             api_class = self._get_api_class()
             scan = Scan(api_class, self.args or {})
             scan.execute()
             return
 
         if self.command == "clean":
+            from codefox.cli.clean import Clean
+
             api_class = self._get_api_class()
             clean = Clean(api_class, self.args or {})
             clean.execute()
             return
 
+        if self.command == "serve":
+            from codefox.cli.serve import Serve
+
+            Serve().execute()
+            return
+
+        if self.command == "daemon":
+            from codefox.cli.daemon import Daemon
+
+            Daemon(self.args or {}).execute()
+            return
+
         if self.command == "init":
+            from codefox.cli.init import Init
+
             init = Init()
             init.execute()
             return
@@ -64,7 +90,7 @@ class CLIManager:
             "to see available commands[/yellow]",
         )
 
-    def _get_api_class(self) -> type[BaseAPI]:
+    def _get_api_class(self) -> "type[BaseAPI]":
         config = Helper.read_yml(".codefox.yml")
         provider = config.get("provider", "gemini")
         return ModelEnum.by_name(provider).api_class
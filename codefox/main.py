@@ -54,6 +54,24 @@ def clean(type_cache: str = typer.Argument("all", help="Cache type")):
     manager.run()
 
 
+@app.command("serve")
+def serve():
+    """Run the review daemon that keeps models and indexes warm."""
+    CLIManager(command="serve", args={}).run()
+
+
+@app.command("daemon")
+def daemon(action: str = typer.Argument("status", help="status or stop")):
+    """Show the status of the review daemon or stop it."""
+    manager = CLIManager(
+        command="daemon",
+        args={
+            "action": action,
+        },
+    )
+    manager.run()
+
+
 @app.command("version")
 def version():
     """Show version."""
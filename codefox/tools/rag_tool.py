@@ -1,13 +1,15 @@
 from collections.abc import Callable
-from typing import cast
+from typing import TYPE_CHECKING, cast
 
 from codefox.tools.base_tool import BaseTool
-from codefox.utils.local_rag import LocalRAG
 from codefox.utils.parser import Parser
 
+if TYPE_CHECKING:
+    from codefox.utils.local_rag import LocalRAG
+
 
 class RagTool(BaseTool):
-    def __init__(self, rag: LocalRAG | None, max_rag_chars: int):
+    def __init__(self, rag: "LocalRAG | None", max_rag_chars: int):
         self.rag = rag
         self.max_rag_chars = max_rag_chars
 
@@ -50,7 +52,13 @@ class RagTool(BaseTool):
             return cast(
                 str,
                 Parser.get_files_context(
-                    self.rag, query, k=18, max_rag_chars=self.max_rag_chars
+                    self.rag,
+                    query,
+                    k=Parser.context_k(
+                        self.max_rag_chars,
+                        self.rag.kwargs.get("chunk_size", 1000),
+                    ),
+                    max_rag_chars=self.max_rag_chars,
                 ),
             )
 
@@ -0,0 +1,243 @@
+import json
+import mmap
+import os
+import shutil
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+
+from codefox.utils.parser import Chunk
+
+
+class ChunkStore:
+    version = 2
+    dead_path_id = -1
+    row_dtype = np.dtype(
+        [
+            ("path_id", "<i4"),
+            ("start_byte", "<i8"),
+            ("end_byte", "<i8"),
+            ("start_line", "<i4"),
+            ("end_line", "<i4"),
+            ("lang_id", "<i2"),
+        ]
+    )
+
+    def __init__(self, store_text: bool = True) -> None:
+        self.store_text = store_text
+        self.paths: list[str] = []
+        self.languages: list[str] = []
+        self._path_lookup: dict[str, int] = {}
+        self._lang_lookup: dict[str, int] = {}
+        # Rows loaded from disk are memory-mapped; rows appended since
+        # then, and their texts, live in the tail lists until the next
+        # save(), so a build holds every new chunk's text in memory.
+        self._rows = np.zeros(0, dtype=self.row_dtype)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._blob: mmap.mmap | bytes = b""
+        self._tail_rows: list[tuple[int, int, int, int, int, int]] = []
+        self._tail_texts: list[bytes] = []
+
+    def __len__(self) -> int:
+        return len(self._rows) + len(self._tail_rows)
+
+    @property
+    def alive_count(self) -> int:
+        alive = int(np.count_nonzero(self._rows["path_id"] >= 0))
+        return alive + sum(1 for row in self._tail_rows if row[0] >= 0)
+
+    def append(self, path: str, chunk: Chunk) -> int:
+        path_id = self._intern(path, self.paths, self._path_lookup)
+        lang_id = self._intern(
+            chunk.language, self.languages, self._lang_lookup
+        )
+        self._tail_rows.append(
+            (
+                path_id,
+                chunk.start_byte,
+                chunk.end_byte,
+                chunk.start_line,
+                chunk.end_line,
+                lang_id,
+            )
+        )
+        self._tail_texts.append(chunk.text.encode("utf-8"))
+        return len(self) - 1
+
+    def remove(self, chunk_id: int) -> None:
+        base = len(self._rows)
+        if chunk_id < base:
+            self._rows["path_id"][chunk_id] = self.dead_path_id
+        else:
+            row = self._tail_rows[chunk_id - base]
+            self._tail_rows[chunk_id - base] = (self.dead_path_id, *row[1:])
+            self._tail_texts[chunk_id - base] = b""
+
+    def row(self, chunk_id: int) -> tuple[int, int, int, int, int, int]:
+        base = len(self._rows)
+        if chunk_id < base:
+            path_id, start_byte, end_byte, start_line, end_line, lang_id = (
+                self._rows[chunk_id].item()
+            )
+            return (
+                int(path_id),
+                int(start_byte),
+                int(end_byte),
+                int(start_line),
+                int(end_line),
+                int(lang_id),
+            )
+        return self._tail_rows[chunk_id - base]
+
+    def path_id(self, chunk_id: int) -> int:
+        base = len(self._rows)
+        if chunk_id < base:
+            return int(self._rows["path_id"][chunk_id])
+        return self._tail_rows[chunk_id - base][0]
+
+    def is_alive(self, chunk_id: int) -> bool:
+        return self.path_id(chunk_id) != self.dead_path_id
+
+    def path(self, chunk_id: int) -> str:
+        path_id = self.path_id(chunk_id)
+        return "" if path_id == self.dead_path_id else self.paths[path_id]
+
+    def lines(self, chunk_id: int) -> tuple[int, int]:
+        row = self.row(chunk_id)
+        return row[3], row[4]
+
+    def language(self, chunk_id: int) -> str:
+        return self.languages[self.row(chunk_id)[5]]
+
+    def text(self, chunk_id: int) -> str:
+        return self._raw(chunk_id).decode("utf-8", errors="replace")
+
+    def texts(self, start: int = 0, end: int | None = None) -> list[str]:
+        end = len(self) if end is None else end
+        return [self.text(i) for i in range(start, end)]
+
+    def iter_texts(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self.text(i) if self.is_alive(i) else ""
+
+    def _raw(self, chunk_id: int) -> bytes:
+        base = len(self._rows)
+        if chunk_id >= base:
+            return self._tail_texts[chunk_id - base]
+        path_id, start_byte, end_byte, *_ = self.row(chunk_id)
+        if path_id == self.dead_path_id:
+            return b""
+        if not self.store_text:
+            return self._read_source(self.paths[path_id], start_byte, end_byte)
+        start = int(self._offsets[chunk_id])
+        end = int(self._offsets[chunk_id + 1])
+        return bytes(self._blob[start:end])
+
+    @staticmethod
+    def _read_source(path: str, start: int, end: int) -> bytes:
+        try:
+            with open(path, "rb") as f:
+                f.seek(start)
+                return f.read(end - start)
+        except OSError:
+            return b""
+
+    @staticmethod
+    def _intern(value: str, table: list[str], lookup: dict[str, int]) -> int:
+        index = lookup.get(value)
+        if index is None:
+            index = len(table)
+            table.append(value)
+            lookup[value] = index
+        return index
+
+    def save(self, path: Path) -> None:
+        # Written to a sibling directory and swapped in, so the files this
+        # store may still be memory-mapping are never truncated under it.
+        tmp_path = path.with_name(path.name + ".tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+
+        count = len(self)
+        rows = np.empty(count, dtype=self.row_dtype)
+        base = len(self._rows)
+        rows[:base] = self._rows
+        if self._tail_rows:
+            rows[base:] = np.array(self._tail_rows, dtype=self.row_dtype)
+        np.save(tmp_path / "rows.npy", rows)
+
+        if self.store_text:
+            offsets = np.zeros(count + 1, dtype=np.int64)
+            with open(tmp_path / "text.bin", "wb") as f:
+                pos = 0
+                for i in range(count):
+                    # Removed chunks keep their id but drop their text.
+                    raw = self._raw(i)
+                    f.write(raw)
+                    pos += len(raw)
+                    offsets[i + 1] = pos
+            np.save(tmp_path / "offsets.npy", offsets)
+
+        with open(tmp_path / "tables.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "store_text": self.store_text,
+                    "paths": self.paths,
+                    "languages": self.languages,
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+        self._close()
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+        saved = self.load(path)
+        if saved is None:
+            raise OSError(f"Failed to reopen chunk store at {path}")
+        self.__dict__.update(saved.__dict__)
+
+    def _close(self) -> None:
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob = b""
+        self._rows = np.zeros(0, dtype=self.row_dtype)
+        self._offsets = np.zeros(1, dtype=np.int64)
+
+    @classmethod
+    def load(cls, path: Path) -> "ChunkStore | None":
+        try:
+            with open(path / "tables.json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != cls.version:
+                return None
+
+            store = cls(store_text=bool(meta["store_text"]))
+            store.paths = list(meta["paths"])
+            store.languages = list(meta["languages"])
+            store._path_lookup = {p: i for i, p in enumerate(store.paths)}
+            store._lang_lookup = {
+                lang: i for i, lang in enumerate(store.languages)
+            }
+            # Copy-on-write, so removals never touch the file on disk.
+            store._rows = np.load(path / "rows.npy", mmap_mode="c")
+            if store._rows.dtype != cls.row_dtype:
+                return None
+
+            if store.store_text:
+                store._offsets = np.load(path / "offsets.npy", mmap_mode="r")
+                if len(store._offsets) != len(store._rows) + 1:
+                    return None
+                with open(path / "text.bin", "rb") as f:
+                    if os.fstat(f.fileno()).st_size:
+                        store._blob = mmap.mmap(
+                            f.fileno(), 0, access=mmap.ACCESS_READ
+                        )
+            return store
+        except (OSError, ValueError, KeyError):
+            return None
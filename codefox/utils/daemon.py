@@ -0,0 +1,285 @@
+import contextlib
+import dataclasses
+import hashlib
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from codefox.cli.scan import Scan
+
+
+def _socket_path(path: str | Path | None) -> Path:
+    return Path(
+        path
+        or os.getenv("CODEFOX_DAEMON_SOCKET")
+        or Path.home() / ".codefox" / "daemon.sock"
+    )
+
+
+@contextlib.contextmanager
+def _client_env(names: tuple[str, ...], env: dict[str, str]) -> Iterator[None]:
+    # Exposes one client's forwarded variables (unset when it sent none)
+    # and restores the daemon's own values afterwards.
+    saved = {name: os.environ.get(name) for name in names}
+    try:
+        for name in names:
+            if name in env:
+                os.environ[name] = str(env[name])
+            else:
+                os.environ.pop(name, None)
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class DaemonClient:
+    # One JSON request and one JSON response per connection, each a
+    # single line.
+    connect_timeout = 0.5
+
+    def __init__(self, socket_path: str | Path | None = None) -> None:
+        self.socket_path = _socket_path(socket_path)
+
+    def connect(self) -> socket.socket | None:
+        # None means no daemon is listening; a socket file left behind by
+        # a killed daemon refuses the connection and counts as none.
+        if not hasattr(socket, "AF_UNIX") or not self.socket_path.exists():
+            return None
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.settimeout(self.connect_timeout)
+            conn.connect(str(self.socket_path))
+        except OSError:
+            conn.close()
+            return None
+        return conn
+
+    def send(
+        self,
+        conn: socket.socket,
+        request: dict[str, Any],
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        with conn:
+            try:
+                conn.settimeout(timeout)
+                conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+                with conn.makefile("rb") as f:
+                    line = f.readline()
+                response = json.loads(line) if line else None
+            except (OSError, ValueError) as e:
+                return {"ok": False, "error": f"Daemon connection lost: {e}"}
+        if not isinstance(response, dict):
+            return {"ok": False, "error": "Daemon closed the connection"}
+        return response
+
+    def request(
+        self, request: dict[str, Any], timeout: float | None = None
+    ) -> dict[str, Any] | None:
+        conn = self.connect()
+        if conn is None:
+            return None
+        return self.send(conn, request, timeout)
+
+
+@dataclasses.dataclass
+class DaemonSession:
+    key: str
+    scan: "Scan"
+    created: float = dataclasses.field(default_factory=time.time)
+    last_used: float = 0.0
+    scans: int = 0
+
+    def describe(self, cwd: str) -> dict[str, Any]:
+        model = self.scan.model
+        info: dict[str, Any] = {
+            "path": cwd,
+            "provider": type(model).__name__,
+            "model": model.model_config.get("name"),
+            "scans": self.scans,
+            "last_used": self.last_used,
+        }
+        rag = model.rag
+        if rag is not None:
+            info.update(
+                chunks=rag.store.alive_count,
+                files=len(rag.manifest),
+                stale_files=len(rag.manifest.stale()),
+                index_version=rag.index_version,
+            )
+        return info
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            response: dict[str, Any] = {"ok": False, "error": str(e)}
+        else:
+            response = self.server.owner.handle(request)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        # Shut down only once the reply is sent; handler threads do not
+        # keep the process alive.
+        if self.server.owner.stopping:
+            threading.Thread(target=self.server.shutdown).start()
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, owner: "DaemonServer") -> None:
+        self.owner = owner
+        super().__init__(path, _Handler)
+
+
+class DaemonServer:
+    max_sessions = 8
+
+    def __init__(self, socket_path: str | Path | None = None) -> None:
+        self.socket_path = _socket_path(socket_path)
+        self.started = time.time()
+        self.sessions: OrderedDict[str, DaemonSession] = OrderedDict()
+        # Reviews change into the repository directory and capture
+        # stdout, both process-wide, so they run one at a time.
+        self.lock = threading.Lock()
+        self._server: _Server | None = None
+        self.ready = threading.Event()
+        self.stopping = False
+
+    def serve_forever(self) -> None:
+        if DaemonClient(self.socket_path).connect() is not None:
+            raise RuntimeError(
+                f"A CodeFox daemon is already listening on {self.socket_path}"
+            )
+        from codefox.utils.local_rag import LocalRAG
+
+        # Repositories using the same embedding model share one instance.
+        LocalRAG.shared_models = {}
+        self.socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        umask = os.umask(0o177)
+        try:
+            self._server = _Server(str(self.socket_path), self)
+        finally:
+            os.umask(umask)
+        try:
+            self.ready.set()
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+            while self.sessions:
+                self._close(self.sessions.popitem()[1])
+            LocalRAG.shared_models = None
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        command = request.get("command")
+        if command == "status":
+            return {"ok": True, **self.status()}
+        if command == "stop":
+            self.stopping = True
+            return {"ok": True}
+        if command == "scan":
+            return self.scan(request)
+        return {"ok": False, "error": f"Unknown command: {command}"}
+
+    def status(self) -> dict[str, Any]:
+        import psutil
+
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started,
+            "rss": psutil.Process().memory_info().rss,
+            "busy": self.lock.locked(),
+            "repos": [
+                session.describe(cwd)
+                for cwd, session in list(self.sessions.items())
+            ],
+        }
+
+    def scan(self, request: dict[str, Any]) -> dict[str, Any]:
+        cwd = str(request.get("cwd") or "")
+        if not os.path.isdir(cwd):
+            return {"ok": False, "error": f"Not a directory: {cwd!r}"}
+        output = io.StringIO()
+        with (
+            self.lock,
+            contextlib.redirect_stdout(output),
+            contextlib.chdir(cwd),
+        ):
+            try:
+                session = self._session(cwd, request.get("env") or {})
+                session.scan.args = request.get("args") or {}
+                diff_text = session.scan.prepare()
+                text = (
+                    session.scan.model.execute(diff_text).text
+                    if diff_text is not None
+                    else None
+                )
+            except Exception as e:
+                # A failed session may hold a broken client or index.
+                self.sessions.pop(cwd, None)
+                return {
+                    "ok": False,
+                    "error": str(e),
+                    "output": output.getvalue(),
+                }
+            session.last_used = time.time()
+            session.scans += 1
+        return {"ok": True, "text": text, "output": output.getvalue()}
+
+    def _session(self, cwd: str, env: dict[str, str]) -> DaemonSession:
+        # Sessions are keyed by repository and rebuilt whenever its
+        # config or credentials change; the least recently used one is
+        # dropped past ``max_sessions``.
+        from codefox.api.model_enum import ModelEnum
+        from codefox.cli.scan import Scan
+        from codefox.utils.helper import Helper
+
+        config = Helper.read_yml(".codefox.yml")
+        env = {name: env[name] for name in Scan.forwarded_env if name in env}
+        key = hashlib.sha256(
+            json.dumps([config, env], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        session = self.sessions.get(cwd)
+        if session is None or session.key != key:
+            api_class = ModelEnum.by_name(
+                config.get("provider", "gemini")
+            ).api_class
+            # Providers read credentials when they are constructed, so
+            # the client's values are only visible for that long.
+            with _client_env(Scan.forwarded_env, env):
+                scan = Scan(api_class, {})
+            session = self.sessions[cwd] = DaemonSession(key, scan)
+        self.sessions.move_to_end(cwd)
+        while len(self.sessions) > self.max_sessions:
+            self._close(self.sessions.popitem(last=False)[1])
+        return session
+
+    @staticmethod
+    def _close(session: DaemonSession) -> None:
+        # Releases the index and writes out its query cache; a failure
+        # here must not take the daemon down.
+        rag = session.scan.model.rag
+        if rag is not None:
+            with contextlib.suppress(Exception):
+                rag.close()
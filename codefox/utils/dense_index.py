@@ -0,0 +1,405 @@
+import abc
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import ExtendedPointId
+
+QUANTIZATIONS = ("none", "float16", "int8")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def quantize(
+    vectors: np.ndarray, quantization: str
+) -> tuple[np.ndarray, np.ndarray | None]:
+    # int8 rows carry their own scale, so a row is restored as
+    # ``row * scale`` without a corpus-wide calibration pass.
+    if quantization == "float16":
+        return vectors.astype("float16"), None
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype("float32")
+        rows = np.rint(vectors / scales[:, None]).astype("int8")
+        return rows, scales
+    return vectors.astype("float32"), None
+
+
+def vector_bytes(dim: int, quantization: str) -> int:
+    if quantization == "float16":
+        return dim * 2
+    if quantization == "int8":
+        return dim + 4
+    return dim * 4
+
+
+def estimate_recall(
+    sample: np.ndarray,
+    quantization: str,
+    dimensions: int | None = None,
+    k: int = 10,
+) -> float:
+    # Every sampled vector queries the others twice: once at full
+    # precision and once truncated and quantized the way the index
+    # stores it. The overlap of the two top-k lists estimates recall.
+    if len(sample) <= k:
+        return 1.0
+    exact = normalize(sample)
+    approx = normalize(exact[:, :dimensions] if dimensions else exact)
+    rows, scales = quantize(approx, quantization)
+    rows = rows.astype("float32")
+    if scales is not None:
+        rows *= scales[:, None]
+
+    exact_scores = exact @ exact.T
+    approx_scores = approx @ rows.T
+    np.fill_diagonal(exact_scores, -np.inf)
+    np.fill_diagonal(approx_scores, -np.inf)
+    exact_top = np.argpartition(-exact_scores, k, axis=1)[:, :k]
+    approx_top = np.argpartition(-approx_scores, k, axis=1)[:, :k]
+    hits = sum(
+        len(np.intersect1d(e, a, assume_unique=True))
+        for e, a in zip(exact_top, approx_top, strict=True)
+    )
+    return hits / (len(sample) * k)
+
+
+class DenseIndex(abc.ABC):
+    # Row ``i`` of a dense index is chunk ``i`` of the chunk store, so
+    # vectors are always added in order starting at ``count()``.
+    name = ""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @abc.abstractmethod
+    def open(self) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def reset(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def add(
+        self, start: int, vectors: np.ndarray, path_ids: list[int]
+    ) -> None:
+        pass
+
+    @abc.abstractmethod
+    def delete(self, ids: list[int]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def search(self, vector: np.ndarray, k: int) -> list[int]:
+        pass
+
+    def search_many(self, vectors: np.ndarray, k: int) -> list[list[int]]:
+        return [self.search(vector, k) for vector in vectors]
+
+    @abc.abstractmethod
+    def count(self) -> int:
+        pass
+
+    def save(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class QdrantIndex(DenseIndex):
+    name = "qdrant"
+    # Embedded (local) Qdrant ignores quantization configs and vector
+    # datatypes and always stores float32, so nothing else is offered.
+    quantizations = ("none",)
+
+    def __init__(
+        self,
+        path: Path,
+        collection_name: str,
+        parallel: int = 1,
+    ) -> None:
+        super().__init__(path)
+        self.collection_name = collection_name
+        self.parallel = parallel
+        self.client: QdrantClient | None = None
+
+    def open(self) -> bool:
+        from qdrant_client import QdrantClient
+
+        if not self.path.exists():
+            return False
+        self.client = QdrantClient(path=str(self.path))
+        return self.client.collection_exists(self.collection_name)
+
+    def reset(self) -> None:
+        from qdrant_client import QdrantClient
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.client is None:
+            self.client = QdrantClient(path=str(self.path))
+        if self.client.collection_exists(self.collection_name):
+            self.client.delete_collection(self.collection_name)
+
+    def add(
+        self, start: int, vectors: np.ndarray, path_ids: list[int]
+    ) -> None:
+        if self.client is None:
+            return
+        if not self.client.collection_exists(self.collection_name):
+            self._create_collection(vectors.shape[1])
+        # The matrix goes to the client as is and the payload only holds
+        # the integer path id, so no per-float Python objects are built
+        # here; paths are resolved through the chunk store at query time.
+        self.client.upload_collection(
+            collection_name=self.collection_name,
+            vectors=vectors,
+            payload=[{"path_id": path_id} for path_id in path_ids],
+            ids=range(start, start + len(vectors)),
+            batch_size=len(vectors),
+            parallel=self.parallel,
+            wait=True,
+        )
+
+    def delete(self, ids: list[int]) -> None:
+        from qdrant_client.models import PointIdsList
+
+        if self.client is None or not ids:
+            return
+        points: list[ExtendedPointId] = list(ids)
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=points),
+        )
+
+    def search(self, vector: np.ndarray, k: int) -> list[int]:
+        if self.client is None:
+            return []
+        results = self.client.query_points(
+            collection_name=self.collection_name,
+            query=vector.tolist(),
+            limit=k,
+        )
+        return [int(point.id) for point in results.points]
+
+    def search_many(self, vectors: np.ndarray, k: int) -> list[list[int]]:
+        from qdrant_client.models import QueryRequest
+
+        if self.client is None:
+            return [[] for _ in vectors]
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                QueryRequest(query=vector.tolist(), limit=k)
+                for vector in vectors
+            ],
+        )
+        return [
+            [int(point.id) for point in response.points]
+            for response in responses
+        ]
+
+    def count(self) -> int:
+        if self.client is None or not self.client.collection_exists(
+            self.collection_name
+        ):
+            return 0
+        return self.client.count(self.collection_name).count
+
+    def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def _create_collection(self, dim: int) -> None:
+        from qdrant_client.models import Distance, VectorParams
+
+        if self.client is None:
+            return
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+        )
+
+
+class NumpyIndex(DenseIndex):
+    name = "numpy"
+    version = 1
+    quantizations = ("none", "float16", "int8")
+    # Rows are scored in blocks so a reduced-precision matrix is upcast
+    # one block at a time and the product still runs through BLAS.
+    block_rows = 1 << 16
+    # Upper bound on the query x row score matrix of one search_many pass.
+    max_score_cells = 1 << 24
+
+    def __init__(self, path: Path, quantization: str = "none") -> None:
+        super().__init__(path)
+        if quantization not in self.quantizations:
+            raise ValueError(
+                f"Unsupported quantization for the numpy backend: "
+                f"{quantization}"
+            )
+        self.quantization = quantization
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self._vectors: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._tail: list[tuple[np.ndarray, np.ndarray | None]] = []
+        self._tail_rows = 0
+        self._dead: set[int] = set()
+
+    def open(self) -> bool:
+        try:
+            with open(self.path / "meta.json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if (
+                meta.get("version") != self.version
+                or meta.get("quantization") != self.quantization
+            ):
+                return False
+            vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+            dead = np.load(self.path / "dead.npy")
+            scales = None
+            if self.quantization == "int8":
+                scales = np.load(self.path / "scales.npy", mmap_mode="r")
+                if len(scales) != len(vectors):
+                    return False
+        except (OSError, ValueError):
+            return False
+        if vectors.ndim != 2:
+            return False
+        self._reset_state()
+        self._vectors = vectors
+        self._scales = scales
+        self._dead = {int(i) for i in dead}
+        return True
+
+    def reset(self) -> None:
+        self._reset_state()
+
+    def add(
+        self, start: int, vectors: np.ndarray, path_ids: list[int]
+    ) -> None:
+        if start != self.count():
+            raise ValueError(
+                f"Vectors must be added in order: expected row "
+                f"{self.count()}, got {start}."
+            )
+        self._tail.append(quantize(normalize(vectors), self.quantization))
+        self._tail_rows += len(vectors)
+
+    def delete(self, ids: list[int]) -> None:
+        self._dead.update(int(i) for i in ids)
+
+    def search(self, vector: np.ndarray, k: int) -> list[int]:
+        return self.search_many(np.asarray(vector)[None], k)[0]
+
+    def search_many(self, vectors: np.ndarray, k: int) -> list[list[int]]:
+        # All queries are scored against a block in one matrix product,
+        # so each block is upcast once however many queries there are.
+        total = self.count()
+        if not total or k < 1:
+            return [[] for _ in vectors]
+        queries = normalize(np.asarray(vectors, dtype="float32"))
+        group = max(1, self.max_score_cells // total)
+        if len(queries) > group:
+            return [
+                ids
+                for i in range(0, len(queries), group)
+                for ids in self.search_many(queries[i : i + group], k)
+            ]
+
+        scores = np.empty((len(queries), total), dtype="float32")
+        pos = 0
+        for matrix, scales in self._matrices():
+            for i in range(0, len(matrix), self.block_rows):
+                block = matrix[i : i + self.block_rows]
+                block_scores = queries @ block.astype("float32", copy=False).T
+                if scales is not None:
+                    block_scores *= scales[i : i + self.block_rows]
+                scores[:, pos : pos + len(block)] = block_scores
+                pos += len(block)
+        if self._dead:
+            scores[:, np.fromiter(self._dead, dtype=np.int64)] = -np.inf
+
+        k = min(k, total)
+        results: list[list[int]] = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top], kind="stable")]
+            results.append([int(i) for i in top if np.isfinite(row[i])])
+        return results
+
+    def count(self) -> int:
+        base = 0 if self._vectors is None else len(self._vectors)
+        return base + self._tail_rows
+
+    def save(self) -> None:
+        # Written to a sibling directory and swapped in, so a matrix that
+        # is still memory-mapped is never truncated under a reader.
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+
+        matrices = self._matrices()
+        dim = int(matrices[0][0].shape[1]) if matrices else 0
+        dtype = quantize(np.zeros((0, dim)), self.quantization)[0].dtype
+        out = np.lib.format.open_memmap(
+            tmp_path / "vectors.npy",
+            mode="w+",
+            dtype=dtype,
+            shape=(self.count(), dim),
+        )
+        pos = 0
+        for matrix, _ in matrices:
+            out[pos : pos + len(matrix)] = matrix
+            pos += len(matrix)
+        out.flush()
+        del out
+        if self.quantization == "int8":
+            np.save(
+                tmp_path / "scales.npy",
+                np.concatenate(
+                    [np.zeros(0, dtype="float32")]
+                    + [scales for _, scales in matrices if scales is not None]
+                ),
+            )
+        np.save(
+            tmp_path / "dead.npy",
+            np.array(sorted(self._dead), dtype=np.int64),
+        )
+        with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": self.version, "quantization": self.quantization},
+                f,
+            )
+
+        self._vectors = None
+        self._scales = None
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(tmp_path, self.path)
+        if not self.open():
+            raise OSError(f"Failed to reopen dense index at {self.path}")
+
+    def close(self) -> None:
+        self._reset_state()
+
+    def _matrices(self) -> list[tuple[np.ndarray, np.ndarray | None]]:
+        matrices = (
+            [] if self._vectors is None else [(self._vectors, self._scales)]
+        )
+        return matrices + self._tail
@@ -0,0 +1,337 @@
+import math
+import os
+import re
+import subprocess
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from codefox.utils.parser import Parser
+
+
+class IgnoreRule:
+    __slots__ = ("regex", "negate", "dir_only", "base")
+
+    def __init__(
+        self, regex: re.Pattern, negate: bool, dir_only: bool, base: str
+    ) -> None:
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+        self.base = base
+
+
+class IgnoreMatcher:
+    # Gitignore semantics: the last matching rule wins, "!" re-includes,
+    # a trailing "/" matches directories only and a pattern containing a
+    # "/" is anchored to the directory of the file that defines it.
+    def __init__(self) -> None:
+        self.rules: list[IgnoreRule] = []
+        self._dirs: dict[str, bool] = {}
+
+    def add_patterns(self, lines: list[str], base: str = "") -> None:
+        for line in lines:
+            rule = self.compile(line, base)
+            if rule is not None:
+                self.rules.append(rule)
+        self._dirs.clear()
+
+    def add_file(self, path: Path, base: str = "") -> None:
+        try:
+            lines = path.read_text(encoding="utf-8").splitlines()
+        except (OSError, UnicodeDecodeError):
+            return
+        self.add_patterns(lines, base)
+
+    @classmethod
+    def compile(cls, line: str, base: str = "") -> IgnoreRule | None:
+        pattern = line.rstrip("\n")
+        if not pattern.endswith("\\ "):
+            pattern = pattern.rstrip()
+        if not pattern or pattern.startswith("#"):
+            return None
+
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        if pattern.startswith("\\"):
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            return None
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+
+        body = cls._translate(pattern)
+        prefix = "" if anchored else "(?:.*/)?"
+        return IgnoreRule(
+            re.compile(f"^{prefix}{body}$"), negate, dir_only, base
+        )
+
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        out: list[str] = []
+        i = 0
+        n = len(pattern)
+        while i < n:
+            c = pattern[i]
+            if pattern.startswith("**/", i) and (i == 0 or out[-1] == "/"):
+                out.append("(?:.*/)?")
+                i += 3
+            elif pattern.startswith("**", i) and i + 2 == n:
+                out.append(".*")
+                i += 2
+            elif c == "*":
+                out.append("[^/]*")
+                i += 1
+            elif c == "?":
+                out.append("[^/]")
+                i += 1
+            elif c == "[":
+                end = pattern.find("]", i + 2)
+                if end < 0:
+                    out.append(re.escape(c))
+                    i += 1
+                    continue
+                chars = pattern[i + 1 : end].replace("\\", "\\\\")
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                out.append(f"[{chars}]")
+                i = end + 1
+            elif c == "\\" and i + 1 < n:
+                out.append(re.escape(pattern[i + 1]))
+                i += 2
+            else:
+                out.append("/" if c == "/" else re.escape(c))
+                i += 1
+        return "".join(out)
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        # A file inside an ignored directory cannot be re-included, so
+        # every ancestor is checked first; their results are cached.
+        parts = rel_path.split("/")
+        for i in range(1, len(parts)):
+            parent = "/".join(parts[:i])
+            ignored = self._dirs.get(parent)
+            if ignored is None:
+                ignored = self._dirs[parent] = self.match(parent, True)
+            if ignored:
+                return True
+        return self.match(rel_path, is_dir)
+
+    def match(self, rel_path: str, is_dir: bool) -> bool:
+        ignored = False
+        for rule in self.rules:
+            if rule.dir_only and not is_dir:
+                continue
+            path = rel_path
+            if rule.base:
+                if not path.startswith(rule.base + "/"):
+                    continue
+                path = path[len(rule.base) + 1 :]
+            if rule.negate == ignored and rule.regex.match(path):
+                ignored = not rule.negate
+        return ignored
+
+
+class FileFilter:
+    default_max_file_size = 1 << 20
+    max_line_length = 1000
+    max_entropy = 5.8
+    sample_bytes = 8192
+    content_check_min_bytes = 2048
+    lockfiles = frozenset(
+        {
+            "cargo.lock",
+            "composer.lock",
+            "gemfile.lock",
+            "go.sum",
+            "package-lock.json",
+            "pipfile.lock",
+            "pnpm-lock.yaml",
+            "poetry.lock",
+            "uv.lock",
+            "yarn.lock",
+        }
+    )
+    minified_suffixes = (".min.js", ".min.mjs", ".min.css", ".bundle.js")
+    generated_markers = (
+        b"@generated",
+        b"do not edit",
+        b"code generated by",
+        b"auto-generated",
+        b"autogenerated",
+        b"generated by the protocol buffer compiler",
+    )
+
+    def __init__(
+        self,
+        max_file_size: int | None = default_max_file_size,
+        skip_generated: bool = True,
+    ) -> None:
+        self.max_file_size = max_file_size
+        self.skip_generated = skip_generated
+        self.skipped: dict[str, list[int]] = {}
+
+    def __bool__(self) -> bool:
+        return self.max_file_size is not None or self.skip_generated
+
+    @property
+    def skipped_files(self) -> int:
+        return sum(files for files, _ in self.skipped.values())
+
+    @property
+    def skipped_bytes(self) -> int:
+        return sum(size for _, size in self.skipped.values())
+
+    def accept(self, path: str) -> bool:
+        reason, size = self.check(path)
+        if reason is None:
+            return True
+        entry = self.skipped.setdefault(reason, [0, 0])
+        entry[0] += 1
+        entry[1] += size
+        return False
+
+    def check(self, path: str) -> tuple[str | None, int]:
+        # Cheapest checks first: one stat, then the file name, and only
+        # files large enough to matter get their first block sampled.
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            return None, 0
+        if self.max_file_size is not None and size > self.max_file_size:
+            return "size", size
+        if not self.skip_generated:
+            return None, size
+
+        name = os.path.basename(path).lower()
+        if name in self.lockfiles:
+            return "lockfile", size
+        if name.endswith(self.minified_suffixes):
+            return "minified", size
+        if size < self.content_check_min_bytes:
+            return None, size
+
+        try:
+            with open(path, "rb") as f:
+                head = f.read(self.sample_bytes)
+        except OSError:
+            return None, size
+
+        if any(
+            marker in head[:1024].lower() for marker in self.generated_markers
+        ):
+            return "generated", size
+        lines = head.split(b"\n")
+        if len(head) == self.sample_bytes and len(lines) > 1:
+            lines = lines[:-1]
+        if max(len(line) for line in lines) > self.max_line_length:
+            return "minified", size
+        if self.entropy(head) > self.max_entropy:
+            return "entropy", size
+        return None, size
+
+    @staticmethod
+    def entropy(data: bytes) -> float:
+        if not data:
+            return 0.0
+        total = len(data)
+        return -sum(
+            count / total * math.log2(count / total)
+            for count in Counter(data).values()
+        )
+
+    def summary(self) -> str:
+        reasons = ", ".join(
+            f"{reason} {files}"
+            for reason, (files, _) in sorted(self.skipped.items())
+        )
+        return (
+            f"Skipped {self.skipped_files} files "
+            f"({self.skipped_bytes / 2**20:.1f} MiB): {reasons}."
+        )
+
+
+class Discovery:
+    default_ignores = [".git/", "__pycache__/", "node_modules/"]
+
+    @classmethod
+    def list_files(
+        cls, root: str, file_filter: FileFilter | None = None
+    ) -> list[str]:
+        matcher = IgnoreMatcher()
+        matcher.add_patterns(cls.default_ignores)
+        # .gitignore files are applied by git itself when it is used.
+        tracked = cls._git_ls_files(root)
+        rel_paths: Iterable[str]
+        if tracked is None:
+            matcher.add_file(Path(root) / ".gitignore")
+            matcher.add_file(Path(root) / ".codefoxignore")
+            rel_paths = cls._walk(root, matcher)
+        else:
+            matcher.add_file(Path(root) / ".codefoxignore")
+            rel_paths = (
+                path for path in tracked if not matcher.is_ignored(path)
+            )
+
+        files = [
+            os.path.join(root, rel_path)
+            for rel_path in rel_paths
+            if Parser.is_supported_extension(Path(rel_path).suffix)
+        ]
+        if file_filter:
+            files = [path for path in files if file_filter.accept(path)]
+        return files
+
+    @classmethod
+    def _git_ls_files(cls, root: str) -> list[str] | None:
+        # Tracked plus untracked-but-not-ignored files, honouring every
+        # .gitignore, .git/info/exclude and the global excludes file.
+        # Tracked files deleted from the working tree are left out.
+        listed = cls._run_ls_files(
+            root, "--cached", "--others", "--exclude-standard"
+        )
+        deleted = cls._run_ls_files(root, "--deleted")
+        if listed is None or deleted is None:
+            return None
+        return sorted(listed - deleted)
+
+    @staticmethod
+    def _run_ls_files(root: str, *flags: str) -> set[str] | None:
+        try:
+            result = subprocess.run(
+                ["git", "ls-files", "-z", *flags],
+                cwd=root,
+                capture_output=True,
+                check=False,
+            )
+        except OSError:
+            return None
+        if result.returncode != 0:
+            return None
+        return {
+            path
+            for path in result.stdout.decode("utf-8", "replace").split("\0")
+            if path
+        }
+
+    @classmethod
+    def _walk(cls, root: str, matcher: IgnoreMatcher) -> Iterator[str]:
+        for dirpath, dirnames, filenames in os.walk(root):
+            rel_dir = os.path.relpath(dirpath, root)
+            rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+            if rel_dir:
+                matcher.add_file(Path(dirpath) / ".gitignore", rel_dir)
+
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            # Pruning in place stops os.walk from descending at all.
+            dirnames[:] = sorted(
+                name
+                for name in dirnames
+                if not matcher.match(prefix + name, True)
+            )
+            for name in sorted(filenames):
+                if not matcher.match(prefix + name, False):
+                    yield prefix + name
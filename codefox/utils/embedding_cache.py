@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+class EmbeddingCache:
+    version = 1
+    digest_size = 16
+    # A key record is the text digest followed by its int64 row number in
+    # the vector file; keys are appended after their vector, so a reader
+    # never sees a key whose row has not been written yet.
+    key_dtype = np.dtype([("digest", f"V{digest_size}"), ("row", "<i8")])
+
+    def __init__(self, cache_dir: str | Path, model_name: str):
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+        self.path = Path(cache_dir) / slug
+        self.model_name = model_name
+        self.dim: int | None = None
+        self.rows: dict[bytes, int] = {}
+        self._vectors: np.ndarray | None = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def digest(cls, text: str) -> bytes:
+        return hashlib.blake2b(
+            text.encode("utf-8"), digest_size=cls.digest_size
+        ).digest()
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        result: list[np.ndarray | None] = [None] * len(texts)
+        if not self.rows:
+            return result
+        vectors = self._vector_view()
+        for i, text in enumerate(texts):
+            row = self.rows.get(self.digest(text))
+            if row is not None and vectors is not None and row < len(vectors):
+                result[i] = vectors[row]
+        return result
+
+    def put_many(self, texts: list[str], vectors: np.ndarray) -> None:
+        if not texts:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            self._write_meta()
+        elif vectors.shape[1] != self.dim:
+            return
+
+        digests = [self.digest(text) for text in texts]
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self._vectors_path(), "ab") as vf:
+            self._lock(vf)
+            first_row = vf.seek(0, os.SEEK_END) // (self.dim * 4)
+            vf.write(vectors.tobytes())
+            vf.flush()
+
+            keys = np.empty(len(digests), dtype=self.key_dtype)
+            keys["digest"] = digests
+            keys["row"] = np.arange(first_row, first_row + len(digests))
+            with open(self._keys_path(), "ab") as kf:
+                kf.write(keys.tobytes())
+
+        for digest, row in zip(digests, keys["row"], strict=True):
+            self.rows[digest] = int(row)
+        self._vectors = None
+
+    def _load(self) -> None:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            self._reset()
+            return
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if (
+                meta.get("version") != self.version
+                or meta.get("model") != self.model_name
+            ):
+                self._reset()
+                return
+            self.dim = int(meta["dim"])
+            if self._keys_path().exists():
+                keys = np.fromfile(self._keys_path(), dtype=self.key_dtype)
+                self.rows = {
+                    bytes(digest): int(row)
+                    for digest, row in zip(
+                        keys["digest"], keys["row"], strict=True
+                    )
+                }
+        except (OSError, ValueError, KeyError):
+            self._reset()
+
+    def _reset(self) -> None:
+        self.dim = None
+        self.rows = {}
+        for path in (self._vectors_path(), self._keys_path()):
+            path.unlink(missing_ok=True)
+
+    def _vector_view(self) -> np.ndarray | None:
+        if self._vectors is None and self.dim:
+            path = self._vectors_path()
+            if not path.exists():
+                return None
+            rows = os.path.getsize(path) // (self.dim * 4)
+            if rows == 0:
+                return None
+            self._vectors = np.memmap(
+                path, dtype="<f4", mode="r", shape=(rows, self.dim)
+            )
+        return self._vectors
+
+    def _write_meta(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "model": self.model_name,
+                    "dim": self.dim,
+                },
+                f,
+            )
+
+    def _vectors_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    def _keys_path(self) -> Path:
+        return self.path / "keys.bin"
+
+    @staticmethod
+    def _lock(file) -> None:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
@@ -1,13 +1,15 @@
-import os
+import warnings
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, cast
 
-import git
 import yaml
 
-from codefox.utils.parser import Parser, TreeSitterParser
+from codefox.utils.discovery import Discovery, FileFilter, IgnoreMatcher
+from codefox.utils.parser import Parser
 
 if TYPE_CHECKING:
+    from tree_sitter import Parser as TreeSitterParser
+
     import codefox.utils.local_rag as local_rag
 
 
@@ -27,43 +29,36 @@ class Helper:
 
     @staticmethod
     def read_codefoxignore() -> list[str]:
-        ignore = Path(".codefoxignore")
-        if not ignore.exists():
+        # Kept for older callers: the patterns of ./.codefoxignore that
+        # IgnoreMatcher applies, which Discovery now does by itself.
+        warnings.warn(
+            "Helper.read_codefoxignore() is deprecated; Discovery applies "
+            ".codefoxignore through IgnoreMatcher.",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        try:
+            lines = Path(".codefoxignore").read_text("utf-8").splitlines()
+        except (OSError, UnicodeDecodeError):
             return []
-
-        ignored_paths = []
-        with open(ignore, encoding="utf-8") as ignore_file:
-            ignored_paths = [
-                line.strip()
-                for line in ignore_file
-                if line.strip() and not line.startswith("#")
-            ]
-
-        return ignored_paths
+        return [
+            line.strip()
+            for line in lines
+            if IgnoreMatcher.compile(line) is not None
+        ]
 
     @staticmethod
-    def get_all_files(path_files: str) -> list[str]:
-        ignored_paths = Helper.read_codefoxignore()
-
-        all_files_to_upload = []
-        for root, _, files in os.walk(path_files):
-            skip_dirs = [".git", "__pycache__", "node_modules"]
-            if os.path.basename(root) in skip_dirs or any(
-                ignored in root for ignored in ignored_paths
-            ):
-                continue
-
-            for filename in files:
-                ext = Path(filename).suffix.lower()
-                if Parser.get_ts_parser_by_extension(ext):
-                    all_files_to_upload.append(os.path.join(root, filename))
-
-        return all_files_to_upload
+    def get_all_files(
+        path_files: str, file_filter: FileFilter | None = None
+    ) -> list[str]:
+        return Discovery.list_files(path_files, file_filter)
 
     @staticmethod
     def get_diff(
         source_branch: str | None = None, target_branch: str | None = None
     ) -> str | None:
+        import git
+
         try:
             repo = git.Repo(".")
 
@@ -86,7 +81,7 @@ class Helper:
         return cast(str, Parser.parse_diff_for_rag(diff_text, max_tokens))
 
     @staticmethod
-    def get_ts_parser_by_extension(ext: str) -> TreeSitterParser | None:
+    def get_ts_parser_by_extension(ext: str) -> "TreeSitterParser | None":
         return Parser.get_ts_parser_by_extension(ext)
 
     @staticmethod
@@ -0,0 +1,127 @@
+import mmap
+import multiprocessing
+import os
+import re
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from codefox.utils.manifest import Manifest
+from codefox.utils.parser import Chunk, Parser
+
+_BLANK = re.compile(rb"\s*\Z")
+
+
+def read_and_chunk(
+    file: str, chunk_size: int, chunk_overlap: int, splitter: str = "builtin"
+) -> tuple[str, list[Chunk] | None, str | None]:
+    # Each file is read once as bytes; large ones are memory-mapped
+    # instead, so the parser, the chunk slices and the manifest hash
+    # share one buffer.
+    try:
+        path = Path(file)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < Ingest.mmap_min_bytes:
+                data = f.read()
+                return (
+                    file,
+                    _chunk_source(
+                        path, data, chunk_size, chunk_overlap, splitter
+                    ),
+                    Manifest.bytes_hash(data),
+                )
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                return (
+                    file,
+                    _chunk_source(
+                        path, source, chunk_size, chunk_overlap, splitter
+                    ),
+                    Manifest.bytes_hash(source),
+                )
+    except Exception:
+        return file, None, None
+
+
+def read_and_chunk_many(
+    files: list[str], chunk_size: int, chunk_overlap: int, splitter: str
+) -> list[tuple[str, list[Chunk] | None, str | None]]:
+    return [
+        read_and_chunk(file, chunk_size, chunk_overlap, splitter)
+        for file in files
+    ]
+
+
+def _chunk_source(
+    path: Path,
+    source: bytes | mmap.mmap,
+    chunk_size: int,
+    chunk_overlap: int,
+    splitter: str,
+) -> list[Chunk]:
+    if _BLANK.match(source):
+        return []
+    return Parser.smart_chunk_spans(
+        path, source, chunk_size, chunk_overlap, splitter
+    )
+
+
+class Ingest:
+    default_workers = os.cpu_count() or 1
+    min_parallel_files = 32
+    files_per_task = 16
+    tasks_per_worker = 2
+    mmap_min_bytes = 1 << 20
+
+    @staticmethod
+    def _mp_context() -> multiprocessing.context.BaseContext:
+        # The pool is started from the build pipeline's reader thread, and
+        # forking a multi-threaded process can deadlock on locks other
+        # threads hold, so workers never start with ``fork``.
+        methods = multiprocessing.get_all_start_methods()
+        return multiprocessing.get_context(
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+
+    @classmethod
+    def iter_chunks(
+        cls,
+        files: list[str],
+        chunk_size: int,
+        chunk_overlap: int,
+        workers: int | None = None,
+        splitter: str = "builtin",
+    ) -> Iterator[tuple[str, list[Chunk] | None, str | None]]:
+        workers = workers or cls.default_workers
+        if workers <= 1 or len(files) < cls.min_parallel_files:
+            for file in files:
+                yield read_and_chunk(file, chunk_size, chunk_overlap, splitter)
+            return
+
+        # At most ``tasks_per_worker`` tasks per worker are in flight and
+        # results are yielded in submission order, so chunk ids stay
+        # deterministic and a slow consumer holds the pool back instead
+        # of letting finished results pile up. Leaving the loop early
+        # cancels pending work.
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=cls._mp_context()
+        )
+        pending: deque[Future] = deque()
+        try:
+            for i in range(0, len(files), cls.files_per_task):
+                pending.append(
+                    executor.submit(
+                        read_and_chunk_many,
+                        files[i : i + cls.files_per_task],
+                        chunk_size,
+                        chunk_overlap,
+                        splitter,
+                    )
+                )
+                if len(pending) >= workers * cls.tasks_per_worker:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -1,23 +1,68 @@
+import dataclasses
 import json
 import math
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import bm25s
-import nltk
 import numpy as np
 import psutil
-from fastembed import TextEmbedding
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, PointStruct, VectorParams
 from rich.console import Console
-from rich.progress import track
-
+from rich.progress import Progress
+
+from codefox.utils.chunk_store import ChunkStore
+from codefox.utils.dense_index import (
+    QUANTIZATIONS,
+    DenseIndex,
+    NumpyIndex,
+    QdrantIndex,
+    estimate_recall,
+    vector_bytes,
+)
+from codefox.utils.discovery import FileFilter
+from codefox.utils.embedding_cache import EmbeddingCache
 from codefox.utils.helper import Helper
-from codefox.utils.parser import Parser
+from codefox.utils.ingest import Ingest
+from codefox.utils.manifest import Manifest
+from codefox.utils.parser import Chunk, Parser
+from codefox.utils.query_cache import QueryCache
+from codefox.utils.symbol_table import SymbolTable
+
+if TYPE_CHECKING:
+    from bm25s.tokenization import Tokenizer
+
+# bm25s, fastembed and qdrant_client take seconds to import, so
+# they are loaded inside the methods that use them; importing this
+# module for its defaults (e.g. from ``codefox clean``) stays cheap.
+
+
+@dataclasses.dataclass
+class BuildStats:
+    files: int = 0
+    points: int = 0
+    embed_seconds: float = 0.0
+    upload_seconds: float = 0.0
+    total_seconds: float = 0.0
+    dimensions: int = 0
+    sample: list[np.ndarray] = dataclasses.field(default_factory=list)
+
+    @property
+    def points_per_second(self) -> float:
+        if not self.total_seconds:
+            return 0.0
+        return self.points / self.total_seconds
 
 
 class LocalRAG:
     default_cache_dir = ".codefox/embedding_cache/"
+    default_vector_cache_dir = ".codefox/vector_cache/"
     default_index_dir = ".codefox/rag_index/"
     default_collection_name = "codefox_rag"
     default_language = "english"
@@ -25,13 +70,23 @@ class LocalRAG:
     default_threads_embedding = None
     default_lazy_load = False
     default_embed_batch_size = 64
+    default_max_dead_ratio = 0.5
+    default_pipeline_depth = 4
+    default_backend = "qdrant"
+    backends = ("qdrant", "numpy")
+    recall_sample_size = 256
+    bm25_format_version = 2
+    # Set to a dict by a long-running process (``codefox serve``) so that
+    # every index using the same embedding model shares one instance.
+    shared_models: dict[tuple, Any] | None = None
 
     def __init__(self, embedding: str, files_path: str, **kwargs):
+        import bm25s
+        from fastembed import TextEmbedding
+
         self.console = Console()
         self.console.print("[bold cyan]Initializing LocalRAG...[/bold cyan]")
 
-        nltk.download("punkt")
-
         ram_gb = psutil.virtual_memory().total / math.pow(1024, 3)
         if ram_gb < 8:
             self.default_embed_batch_size = 16
@@ -40,39 +95,80 @@ class LocalRAG:
         else:
             self.default_embed_batch_size = 64
 
-        self.all_files = Helper.get_all_files(files_path)
         self.kwargs = self._get_kwargs(**kwargs)
+        self.file_filter = FileFilter(
+            max_file_size=self.kwargs["max_file_size"],
+            skip_generated=self.kwargs["skip_generated"],
+        )
+        self.all_files = Helper.get_all_files(files_path, self.file_filter)
 
-        with self.console.status(
-            "[blue]Loading TextEmbedding model...[/blue]"
-        ):
-            self.model = TextEmbedding(
-                embedding,
-                cache_dir=self.default_cache_dir,
-                threads=self.kwargs["threads_embedding"],
-                lazy_load=self.kwargs["lazy_load"],
-            )
-        self.console.print("[green]✓[/green] Model loaded successfully.")
+        model_key = (
+            embedding,
+            self.kwargs["threads_embedding"],
+            self.kwargs["lazy_load"],
+        )
+        shared = self.shared_models
+        if shared is not None and model_key in shared:
+            self.model = shared[model_key]
+        else:
+            with self.console.status(
+                "[blue]Loading TextEmbedding model...[/blue]"
+            ):
+                self.model = TextEmbedding(
+                    embedding,
+                    cache_dir=self.default_cache_dir,
+                    threads=self.kwargs["threads_embedding"],
+                    lazy_load=self.kwargs["lazy_load"],
+                )
+            if shared is not None:
+                shared[model_key] = self.model
+            self.console.print("[green]✓[/green] Model loaded successfully.")
 
         self.retriever = bm25s.BM25()
-        self.files: list[dict] = []
-        self.client: QdrantClient | None = None
-        self.chunks: list[str] = []
+        # Token ids of every chunk and their vocabulary, so an update
+        # tokenizes only new chunks; read from disk on first use.
+        self.tokenizer: Tokenizer | None = None
+        self.corpus_ids: list[list[int]] | None = None
+        self.dense: DenseIndex | None = None
+        self.store = ChunkStore(self.kwargs["store_text"])
+        self.manifest = Manifest()
+        self.symbols = SymbolTable()
+        self.vector_cache = (
+            EmbeddingCache(self.kwargs["vector_cache_dir"], embedding)
+            if self.kwargs["vector_cache_dir"]
+            else None
+        )
         self.embedding_name = embedding
         self.files_path = files_path
         self.collection_name = self.default_collection_name
+        # Changes whenever the indexed content does, so cached search
+        # results are never served for a different index.
+        self.index_version = ""
+        self.query_cache = QueryCache(
+            self.kwargs["query_cache_size"],
+            self._query_cache_path()
+            if self.kwargs["persist_query_cache"]
+            else None,
+            key=f"{embedding}:{self.kwargs['dimensions']}",
+            search_key=(
+                f"rff_k={self.kwargs['rff_k']}:"
+                f"min_score={self.kwargs['min_score']}"
+            ),
+        )
 
     def load_index(self) -> bool:
         idx_dir = self._index_dir()
         meta_path = idx_dir / "meta.json"
-        chunks_path = idx_dir / "chunks.json"
-        files_path = idx_dir / "files.json"
-        qdrant_path = self._qdrant_path()
+        if not meta_path.exists():
+            return False
+        manifest = Manifest.load(self._manifest_path())
+        store = ChunkStore.load(self._store_path())
+        symbols = SymbolTable.load(self._symbols_path())
         if (
-            not meta_path.exists()
-            or not chunks_path.exists()
-            or not files_path.exists()
-            or not qdrant_path.exists()
+            manifest is None
+            or store is None
+            or symbols is None
+            or store.store_text != self.kwargs["store_text"]
         ):
             return False
         try:
@@ -81,238 +177,690 @@ class LocalRAG:
             if (
                 meta.get("embedding") != self.embedding_name
                 or meta.get("files_path") != self.files_path
+                or meta.get("backend", "qdrant") != self.kwargs["backend"]
+                or meta.get("quantization", "none")
+                != self.kwargs["quantization"]
+                or meta.get("dimensions") != self.kwargs["dimensions"]
+                or meta.get("chunker", 1) != Parser.chunker_version
             ):
                 return False
-            self.client = QdrantClient(path=str(qdrant_path))
-            if not self.client.collection_exists(self.collection_name):
+            self.close()
+            self.dense = self._dense_index()
+            if not self.dense.open():
+                self.close()
                 return False
-            with open(chunks_path, encoding="utf-8") as f:
-                self.chunks = json.load(f)
-            with open(files_path, encoding="utf-8") as f:
-                self.files = json.load(f)
-            corpus_tokens = bm25s.tokenize(
-                self.chunks, stopwords=self.kwargs["language"]
-            )
-            self.retriever.index(corpus_tokens)
+            self.store = store
+            self.manifest = manifest
+            self.symbols = symbols
+            self.tokenizer = self.corpus_ids = None
+            self.index_version = meta.get("index_version") or uuid.uuid4().hex
+            if not self._load_bm25(meta.get("bm25")):
+                self._tokenize_corpus()
+                self._index_bm25()
+                self._save_bm25()
+                self._write_meta()
             self.console.print("[green]✓[/green] RAG index loaded from disk.")
             return True
         except Exception:
             return False
 
     def save_index(self) -> None:
-        if self.client is None or not self.chunks or not self.files:
+        if self.dense is None or not len(self.store):
             return
         idx_dir = self._index_dir()
         idx_dir.mkdir(parents=True, exist_ok=True)
-        with open(idx_dir / "chunks.json", "w", encoding="utf-8") as f:
-            json.dump(self.chunks, f, ensure_ascii=False)
-        with open(idx_dir / "files.json", "w", encoding="utf-8") as f:
-            json.dump(self.files, f, ensure_ascii=False)
-        with open(idx_dir / "meta.json", "w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "embedding": self.embedding_name,
-                    "files_path": self.files_path,
-                },
-                f,
-                indent=0,
-            )
+        self.dense.save()
+        self.store.save(self._store_path())
+        self.manifest.save(self._manifest_path())
+        self.symbols.compact(self.store.is_alive)
+        self.symbols.save(self._symbols_path())
+        self._save_bm25()
+        self._write_meta()
+        self.query_cache.save()
         self.console.print("[green]✓[/green] RAG index saved to disk.")
 
     def build(self) -> None:
+        from bm25s.tokenization import Tokenizer
+
         self.console.print(
             "[bold magenta]Starting RAG database build...[/bold magenta]"
         )
-        texts: list[str] = []
-
-        chunk_size = self.kwargs.get("chunk_size", 1000)
-        chunk_overlap = self.kwargs.get("chunk_overlap", 200)
-        max_chunks = self.kwargs.get("max_chunks")
-        max_files = self.kwargs.get("max_files")
+        self.store = ChunkStore(self.kwargs["store_text"])
+        self.manifest = Manifest()
+        self.symbols = SymbolTable()
+        self.index_version = uuid.uuid4().hex
 
-        step = chunk_size - chunk_overlap
-        if step <= 0:
-            step = chunk_size
+        idx_dir = self._index_dir()
+        idx_dir.mkdir(parents=True, exist_ok=True)
+        self.close()
+        self.dense = self._dense_index()
+        self.dense.reset()
 
-        files_read = 0
-        for file in track(
+        self.tokenizer = Tokenizer(stopwords=self.kwargs["language"])
+        stats, self.corpus_ids = self._stream_chunks(
             self.all_files,
-            description="[cyan]Reading & chunking files...[/cyan]",
-        ):
-            if max_files is not None and files_read >= max_files:
-                break
-            try:
-                path = Path(file)
-                content = path.read_text(encoding="utf-8")
-
-                if not content.strip():
-                    continue
-
-                files_read += 1
-
-                chunks = Parser.smart_chunk(
-                    path, content, chunk_size, chunk_overlap
-                )
-
-                for chunk_text in chunks:
-                    texts.append(chunk_text)
-                    self.files.append({"path": file, "text": chunk_text})
+            max_files=self.kwargs.get("max_files"),
+            tokenizer=self.tokenizer,
+        )
 
-                if max_chunks is not None and len(texts) >= max_chunks:
-                    break
-            except Exception:
-                continue
+        self.console.print(
+            f"[green]✓[/green] Created {len(self.store)} chunks from "
+            f"{stats.files} files."
+        )
+        self._report_skipped()
+        self.console.print(
+            f"[green]✓[/green] Dense index ({self.dense.name}) built: "
+            f"{stats.points} points in {stats.total_seconds:.1f}s "
+            f"({stats.points_per_second:.0f} points/s; "
+            f"embed {stats.embed_seconds:.1f}s, "
+            f"upload {stats.upload_seconds:.1f}s)."
+        )
+        self._report_vectors(stats)
+        self._index_bm25()
 
         self.console.print(
-            f"[green]✓[/green] Created {len(texts)} chunks from "
-            f"{files_read} files."
+            "[bold green]RAG build complete and ready for "
+            "queries![/bold green]\n"
         )
 
-        with self.console.status(
-            "[yellow]Tokenizing and building BM25 index...[/yellow]"
-        ):
-            corpus_tokens = bm25s.tokenize(
-                texts, stopwords=self.kwargs["language"]
-            )
+    def refresh_files(self) -> None:
+        # A long-lived index re-lists its files before each update so
+        # files added since it was opened are picked up.
+        self.file_filter.skipped.clear()
+        self.all_files = Helper.get_all_files(
+            self.files_path, self.file_filter
+        )
 
-            self.retriever.index(corpus_tokens)
-        self.console.print("[green]✓[/green] BM25 lexical index built.")
+    def update(self) -> bool:
+        if self.dense is None:
+            return False
 
-        self.chunks = texts
-        batch_size = max(
-            self.kwargs.get("embed_batch_size", self.default_embed_batch_size),
-            1,
+        # Files skipped by ``max_files`` or ``max_chunks`` are retried
+        # only once there is room for them again.
+        max_files = self.kwargs.get("max_files")
+        max_chunks = self.kwargs.get("max_chunks")
+        indexed = sum(
+            1 for entry in self.manifest.entries.values() if entry["chunks"]
         )
-        idx_dir = self._index_dir()
-        idx_dir.mkdir(parents=True, exist_ok=True)
-        qdrant_path = self._qdrant_path()
-        self.client = QdrantClient(path=str(qdrant_path))
+        room = (max_files is None or indexed < max_files) and (
+            max_chunks is None or self.store.alive_count < max_chunks
+        )
+        changes = self.manifest.diff(self.all_files, retry_skipped=room)
+        if not changes:
+            if changes.touched:
+                self.manifest.save(self._manifest_path())
+            self.console.print("[green]✓[/green] RAG index is up to date.")
+            return False
 
-        if self.client.collection_exists(self.collection_name):
-            self.client.delete_collection(self.collection_name)
+        stale_ids: list[int] = []
+        for file in changes.removed + changes.modified:
+            stale_ids.extend(self.manifest.remove(file))
 
-        with self.console.status(
-            "[magenta]Building Qdrant vector index...[/magenta]"
-        ):
-            dim: int | None = None
-            for i in track(
-                range(0, len(texts), batch_size),
-                total=(len(texts) + batch_size - 1) // batch_size,
-                description="[blue]Generating embeddings...[/blue]",
-            ):
-                batch = texts[i : i + batch_size]
-                emb = np.array(list(self.model.embed(batch)), dtype="float32")
-
-                if dim is None:
-                    dim = emb.shape[1]
-                    self.client.create_collection(
-                        collection_name=self.collection_name,
-                        vectors_config=VectorParams(
-                            size=dim, distance=Distance.COSINE
-                        ),
-                    )
+        dead = len(self.store) - self.store.alive_count + len(stale_ids)
+        if dead > len(self.store) * self.default_max_dead_ratio:
+            self.console.print(
+                "[yellow]Most of the index is stale, rebuilding...[/yellow]"
+            )
+            self.build()
+            return True
 
-                points = [
-                    PointStruct(
-                        id=j,
-                        vector=vec.tolist(),
-                        payload={"path": self.files[j]["path"]},
-                    )
-                    for j, vec in enumerate(emb, start=i)
-                ]
-                self.client.upsert(
-                    collection_name=self.collection_name,
-                    points=points,
-                )
+        self.index_version = uuid.uuid4().hex
+        tokenizer, corpus_ids = self._corpus_tokens()
+        for chunk_id in stale_ids:
+            self.store.remove(chunk_id)
+            corpus_ids[chunk_id] = []
+        self.dense.delete(stale_ids)
+
+        if max_files is not None:
+            indexed = sum(
+                1
+                for entry in self.manifest.entries.values()
+                if entry["chunks"]
+            )
+            max_files = max(max_files - indexed, 0)
+        _, new_ids = self._stream_chunks(
+            changes.modified + changes.added,
+            max_files=max_files,
+            tokenizer=tokenizer,
+        )
+        corpus_ids.extend(new_ids)
+        self._index_bm25()
 
-        self.console.print("[green]✓[/green] Qdrant semantic index built.")
         self.console.print(
-            "[bold green]RAG build complete and ready for "
-            "queries![/bold green]\n"
+            f"[green]✓[/green] RAG index updated: "
+            f"{len(changes.added)} added, {len(changes.modified)} modified, "
+            f"{len(changes.removed)} removed files."
         )
+        self._report_skipped()
+        return True
 
     def search(self, query: str, k: int = 5) -> list[dict]:
-        if self.client is None or not self.chunks:
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries: list[str], k: int = 5) -> list[list[dict]]:
+        if self.dense is None or not len(self.store):
             self.console.print(
                 "[bold red]Index is empty. "
                 "Please run build() first.[/bold red]"
             )
-            return []
-
-        if query.startswith("class "):
-            name = query.split()[1]
+            return [[] for _ in queries]
+
+        results: list[list[int]] = [[] for _ in queries]
+        pending: dict[str, list[int]] = {}
+        cached = 0
+        for i, query in enumerate(queries):
+            # Definition lookups ("class Foo", "def bar", a bare
+            # identifier) are answered from the symbol table before any
+            # embedding work.
+            symbol = SymbolTable.parse_query(query)
+            if symbol is not None:
+                matches = [
+                    chunk_id
+                    for chunk_id in self.symbols.lookup(*symbol)
+                    if self.store.is_alive(chunk_id)
+                ]
+                if matches:
+                    results[i] = matches[:k]
+                    continue
 
-            matches = [
-                i
-                for i, chunk in enumerate(self.chunks)
-                if f"class {name}" in chunk
-            ]
+            if "max_query_chars" in self.kwargs:
+                query = query[: self.kwargs["max_query_chars"]]
+            query = QueryCache.normalize(query)
+            hit = self.query_cache.get_results(query, k, self.index_version)
+            if hit is not None:
+                results[i] = hit
+                cached += 1
+            else:
+                pending.setdefault(query, []).append(i)
+
+        if pending:
+            texts = list(pending)
+            for text, top_ids in zip(
+                texts, self._hybrid_search(texts, k), strict=True
+            ):
+                self.query_cache.put_results(
+                    text, k, self.index_version, top_ids
+                )
+                for i in pending[text]:
+                    results[i] = top_ids
 
-            if matches:
-                return [self.files[i] for i in matches[:k]]
+        found = sum(len(ids) for ids in results)
+        note = " (cached)" if cached and not pending else ""
+        if len(queries) == 1:
+            self.console.print(
+                f"[green]✓ Found top {found} matching chunks{note}.[/green]"
+            )
+        else:
+            self.console.print(
+                f"[green]✓ Found {found} matching chunks for "
+                f"{len(queries)} queries ({cached} cached).[/green]"
+            )
+        return [[self._chunk(i) for i in ids] for ids in results]
 
-        search_k = min(len(self.chunks), max(k * 2, 10))
+    def _hybrid_search(self, queries: list[str], k: int) -> list[list[int]]:
+        import bm25s
 
-        if "max_query_chars" in self.kwargs:
-            query = query[: self.kwargs["max_query_chars"]]
+        if self.dense is None:
+            return [[] for _ in queries]
+        dense = self.dense
+        search_k = min(len(self.store), max(k * 2, 10))
 
         with self.console.status(
             "[bold cyan]Analyzing query...[/bold cyan]"
         ) as status:
-            status.update("[cyan]Embedding search query...[/cyan]")
-            q_vec = list(self.model.embed([query]))[0]
+            vectors = [self.query_cache.get_vector(query) for query in queries]
+            missing = [i for i, vec in enumerate(vectors) if vec is None]
+            if missing:
+                status.update("[cyan]Embedding search queries...[/cyan]")
+                # One embedding batch for every query not seen before.
+                embedded = self._truncate(
+                    np.array(
+                        list(self.model.embed([queries[i] for i in missing])),
+                        dtype="float32",
+                    )
+                )
+                for i, vec in zip(missing, embedded, strict=True):
+                    vectors[i] = vec
+                    self.query_cache.put_vector(queries[i], vec)
 
-            status.update("[cyan]Performing Qdrant semantic search...[/cyan]")
-            dense_results = self.client.query_points(
-                collection_name=self.collection_name,
-                query=q_vec.tolist(),
-                limit=search_k,
+            status.update(
+                "[cyan]Performing semantic and BM25 lexical search...[/cyan]"
             )
+            # Dense search runs on a worker thread while BM25 scores the
+            # whole batch here; both spend most of their time in NumPy or
+            # native code, so they overlap.
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                dense_future = executor.submit(
+                    dense.search_many, np.stack(vectors), search_k
+                )
+                query_tokens = bm25s.tokenize(
+                    queries,
+                    stopwords=self.kwargs["language"],
+                    show_progress=False,
+                )
+                bm25_results, _ = self.retriever.retrieve(
+                    query_tokens, k=search_k, show_progress=False
+                )
+                dense_results = dense_future.result()
 
-            dense_ids = [r.id for r in dense_results.points]
+            status.update("[cyan]Fusing results with RRF algorithm...[/cyan]")
+            return [
+                self._fuse(dense_ids, sparse_ids, k)
+                for dense_ids, sparse_ids in zip(
+                    dense_results, bm25_results, strict=True
+                )
+            ]
+
+    def _fuse(self, dense_ids, sparse_ids, k: int) -> list[int]:
+        rrf_scores: dict[int, float] = {}
 
-            status.update("[cyan]Performing BM25 lexical search...[/cyan]")
-            query_tokens = bm25s.tokenize(
-                [query], stopwords=self.kwargs["language"]
+        for rank, doc_id in enumerate(dense_ids):
+            doc_id = int(doc_id)
+            if not self.store.is_alive(doc_id):
+                continue
+
+            rrf_scores[doc_id] = rrf_scores.get(doc_id, 0.0) + 1.0 / (
+                self.kwargs["rff_k"] + rank + 1
             )
-            bm25_results, _ = self.retriever.retrieve(query_tokens, k=search_k)
-            sparse_ids = bm25_results[0]
 
-            status.update("[cyan]Fusing results with RRF algorithm...[/cyan]")
-            rrf_scores: dict[int, float] = {}
+        for rank, doc_id in enumerate(sparse_ids):
+            if isinstance(doc_id, dict):
+                doc_id = doc_id.get("id", rank)
+            doc_id = int(doc_id)
+            if not self.store.is_alive(doc_id):
+                continue
+            rrf_scores[doc_id] = rrf_scores.get(doc_id, 0.0) + 1.0 / (
+                self.kwargs["rff_k"] + rank + 1
+            )
 
-            for rank, doc_id in enumerate(dense_ids):
-                doc_id = int(doc_id)
+        sorted_docs = sorted(
+            rrf_scores.items(), key=lambda x: x[1], reverse=True
+        )
+        min_score = self.kwargs.get("min_score")
+        if min_score is not None:
+            sorted_docs = [
+                (doc_id, score)
+                for doc_id, score in sorted_docs
+                if score >= min_score
+            ]
+        return [doc_id for doc_id, _ in sorted_docs[:k]]
+
+    def _chunk(self, chunk_id: int) -> dict:
+        start_line, end_line = self.store.lines(chunk_id)
+        return {
+            "path": self.store.path(chunk_id),
+            "text": self.store.text(chunk_id),
+            "start_line": start_line,
+            "end_line": end_line,
+            "language": self.store.language(chunk_id),
+        }
+
+    def _iter_chunks(
+        self, files: list[str]
+    ) -> Iterator[tuple[str, list[Chunk] | None, str | None]]:
+        return Ingest.iter_chunks(
+            files,
+            self.kwargs.get("chunk_size", 1000),
+            self.kwargs.get("chunk_overlap", 200),
+            workers=self.kwargs.get("workers"),
+            splitter=Parser.resolve_splitter(self.kwargs["sentence_splitter"]),
+        )
 
-                rrf_scores[doc_id] = rrf_scores.get(doc_id, 0.0) + 1.0 / (
-                    self.kwargs["rff_k"] + rank + 1
+    def _add_chunks(
+        self, file: str, chunks: list[Chunk] | None, digest: str | None
+    ) -> bool:
+        chunk_ids: list[int] = []
+        for chunk in chunks or []:
+            chunk_id = self.store.append(file, chunk)
+            self.symbols.add(chunk_id, chunk.symbols)
+            chunk_ids.append(chunk_id)
+
+        self.manifest.record(file, chunk_ids, digest)
+        return bool(chunks)
+
+    def _index_bm25(self) -> None:
+        import bm25s
+        from bm25s.tokenization import Tokenized
+
+        tokenizer, corpus_ids = self._corpus_tokens()
+        with self.console.status("[yellow]Building BM25 index...[/yellow]"):
+            self.retriever = bm25s.BM25()
+            if corpus_ids:
+                self.retriever.index(
+                    Tokenized(
+                        ids=corpus_ids, vocab=tokenizer.get_vocab_dict()
+                    ),
+                    show_progress=False,
                 )
+        self.console.print("[green]✓[/green] BM25 lexical index built.")
 
-            for rank, doc_id in enumerate(sparse_ids):
-                if isinstance(doc_id, dict):
-                    doc_id = doc_id.get("id", rank)
-                doc_id = int(doc_id)
-                rrf_scores[doc_id] = rrf_scores.get(doc_id, 0.0) + 1.0 / (
-                    self.kwargs["rff_k"] + rank + 1
-                )
+    def _corpus_tokens(self) -> tuple["Tokenizer", list[list[int]]]:
+        # Removed chunks keep their position as empty documents, so the
+        # ids stay aligned with chunk ids.
+        from bm25s.tokenization import Tokenizer
+
+        if self.tokenizer is None or self.corpus_ids is None:
+            tokenizer = Tokenizer(stopwords=self.kwargs["language"])
+            corpus_ids = self._load_corpus_ids(tokenizer)
+            if corpus_ids is None:
+                return self._tokenize_corpus()
+            self.tokenizer, self.corpus_ids = tokenizer, corpus_ids
+        return self.tokenizer, self.corpus_ids
+
+    def _tokenize_corpus(self) -> tuple["Tokenizer", list[list[int]]]:
+        from bm25s.tokenization import Tokenizer
+
+        tokenizer = Tokenizer(stopwords=self.kwargs["language"])
+        with self.console.status("[yellow]Tokenizing BM25 corpus...[/yellow]"):
+            tokens = tokenizer.tokenize(
+                list(self.store.iter_texts()),
+                update_vocab=True,
+                return_as="ids",
+                show_progress=False,
+            )
+        self.tokenizer = tokenizer
+        self.corpus_ids = [
+            ids if self.store.is_alive(i) else []
+            for i, ids in enumerate(tokens)
+        ]
+        return self.tokenizer, self.corpus_ids
+
+    def _load_corpus_ids(
+        self, tokenizer: "Tokenizer"
+    ) -> list[list[int]] | None:
+        bm25_path = self._bm25_path()
+        try:
+            tokenizer.load_vocab(str(bm25_path))
+            ids = np.load(bm25_path / "corpus_ids.npy")
+            offsets = np.load(bm25_path / "corpus_offsets.npy")
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(offsets) != len(self.store) + 1:
+            return None
+        return [
+            ids[start:end].tolist()
+            for start, end in zip(offsets[:-1], offsets[1:], strict=True)
+        ]
+
+    def _bm25_meta(self) -> dict:
+        import bm25s
+
+        return {
+            "format": self.bm25_format_version,
+            "bm25s": bm25s.__version__,
+            "language": self.kwargs["language"],
+            "documents": len(self.store),
+        }
+
+    def _load_bm25(self, meta: dict | None) -> bool:
+        import bm25s
+
+        bm25_path = self._bm25_path()
+        if meta != self._bm25_meta() or not bm25_path.exists():
+            return False
+        try:
+            self.retriever = bm25s.BM25.load(str(bm25_path), mmap=True)
+        except Exception:
+            return False
+        return True
+
+    def _save_bm25(self) -> None:
+        # Write to a sibling directory and swap it in, so a retriever
+        # still memory-mapping the old files is never truncated under it.
+        bm25_path = self._bm25_path()
+        tmp_path = bm25_path.with_name(bm25_path.name + ".tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tokenizer, corpus_ids = self._corpus_tokens()
+        self.retriever.save(str(tmp_path))
+        tokenizer.save_vocab(str(tmp_path))
+        np.save(
+            tmp_path / "corpus_ids.npy",
+            np.fromiter(
+                (token for ids in corpus_ids for token in ids),
+                dtype=np.int32,
+            ),
+        )
+        np.save(
+            tmp_path / "corpus_offsets.npy",
+            np.cumsum([0, *map(len, corpus_ids)], dtype=np.int64),
+        )
+        if bm25_path.exists():
+            shutil.rmtree(bm25_path)
+        os.replace(tmp_path, bm25_path)
 
-            sorted_docs = sorted(
-                rrf_scores.items(), key=lambda x: x[1], reverse=True
+    def _write_meta(self) -> None:
+        with open(self._index_dir() / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "embedding": self.embedding_name,
+                    "files_path": self.files_path,
+                    "backend": self.kwargs["backend"],
+                    "quantization": self.kwargs["quantization"],
+                    "dimensions": self.kwargs["dimensions"],
+                    "chunker": Parser.chunker_version,
+                    "index_version": self.index_version,
+                    "bm25": self._bm25_meta(),
+                },
+                f,
+                indent=0,
             )
-            min_score = self.kwargs.get("min_score")
-            if min_score is not None:
-                sorted_docs = [
-                    (doc_id, score)
-                    for doc_id, score in sorted_docs
-                    if score >= min_score
-                ]
-            top_ids = [doc_id for doc_id, _ in sorted_docs[:k]]
 
+    def _stream_chunks(
+        self,
+        files: list[str],
+        max_files: int | None = None,
+        tokenizer: "Tokenizer | None" = None,
+    ) -> tuple[BuildStats, list[list[int]]]:
+        # Three stages joined by bounded queues: the reader thread pulls
+        # chunks from the ingest pool, this thread embeds them and the
+        # writer thread upserts vectors, so the slowest stage sets the
+        # pace. The queues bound how far chunking runs ahead and how many
+        # embedded batches wait for upload, not total memory: every
+        # chunk's text stays in the store's tail and its token ids in
+        # ``corpus_ids`` until the index is saved.
+        batch_size = max(
+            self.kwargs.get("embed_batch_size", self.default_embed_batch_size),
+            1,
+        )
+        depth = self.kwargs["pipeline_depth"]
+        max_chunks = self.kwargs.get("max_chunks")
+        batches: queue.Queue = queue.Queue(maxsize=depth)
+        uploads: queue.Queue = queue.Queue(maxsize=depth)
+        corpus_ids: list[list[int]] = []
+        stats = BuildStats()
+        started = time.perf_counter()
+
+        def read() -> None:
+            start = len(self.store)
+            # Removed chunks keep their rows, so only live ones count
+            # towards ``max_chunks``.
+            live = self.store.alive_count
+            done = 0
+            try:
+                for file, chunks, digest in self._iter_chunks(files):
+                    if stop.is_set():
+                        return
+                    if max_files is not None and stats.files >= max_files:
+                        break
+                    if self._add_chunks(file, chunks, digest):
+                        stats.files += 1
+                    live += len(chunks or ())
+                    done += 1
+                    progress.advance(read_task)
+
+                    while len(self.store) - start >= batch_size:
+                        batches.put((start, start + batch_size))
+                        start += batch_size
+
+                    if max_chunks is not None and live >= max_chunks:
+                        break
+                for file in files[done:]:
+                    self.manifest.skip(file)
+                if start < len(self.store):
+                    batches.put((start, len(self.store)))
+                batches.put(None)
+            except BaseException as e:
+                batches.put(e)
+
+        def write() -> None:
+            while (item := uploads.get()) is not None:
+                if errors:
+                    continue
+                try:
+                    upload_started = time.perf_counter()
+                    self._upload(*item)
+                    stats.upload_seconds += (
+                        time.perf_counter() - upload_started
+                    )
+                    stats.points += len(item[1])
+                except BaseException as e:
+                    errors.append(e)
+
+        stop = threading.Event()
+        errors: list[BaseException] = []
+        with Progress(console=self.console) as progress:
+            read_task = progress.add_task(
+                "[cyan]Reading & chunking files...[/cyan]", total=len(files)
+            )
+            embed_task = progress.add_task(
+                "[blue]Generating embeddings...[/blue]", total=None
+            )
+            reader = threading.Thread(target=read, daemon=True)
+            writer = threading.Thread(target=write, daemon=True)
+            reader.start()
+            writer.start()
+            try:
+                while (item := batches.get()) is not None:
+                    if isinstance(item, BaseException):
+                        raise item
+                    if errors:
+                        raise errors[0]
+                    start, end = item
+                    batch = self.store.texts(start, end)
+                    if tokenizer is not None:
+                        corpus_ids.extend(
+                            tokenizer.tokenize(
+                                batch,
+                                update_vocab=True,
+                                return_as="ids",
+                                show_progress=False,
+                            )
+                        )
+                    embed_started = time.perf_counter()
+                    emb = self._embed(batch)
+                    stats.embed_seconds += time.perf_counter() - embed_started
+                    missing = self.recall_sample_size - sum(
+                        len(rows) for rows in stats.sample
+                    )
+                    if missing > 0:
+                        stats.sample.append(emb[:missing])
+                    emb = self._truncate(emb)
+                    stats.dimensions = emb.shape[1]
+                    uploads.put((start, emb))
+                    progress.advance(embed_task, end - start)
+            finally:
+                stop.set()
+                uploads.put(None)
+                writer.join()
+                # Unblock a reader still waiting on a full queue.
+                while reader.is_alive():
+                    try:
+                        batches.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+
+        if errors:
+            raise errors[0]
+        stats.total_seconds = time.perf_counter() - started
+        return stats, corpus_ids
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        if self.vector_cache is None:
+            return np.array(list(self.model.embed(texts)), dtype="float32")
+
+        cached = self.vector_cache.get_many(texts)
+        missing: dict[str, list[int]] = {}
+        for i, vec in enumerate(cached):
+            if vec is None:
+                missing.setdefault(texts[i], []).append(i)
+
+        if missing:
+            new_texts = list(missing)
+            new_emb = np.array(
+                list(self.model.embed(new_texts)), dtype="float32"
+            )
+            self.vector_cache.put_many(new_texts, new_emb)
+            for text, vec in zip(new_texts, new_emb, strict=True):
+                for i in missing[text]:
+                    cached[i] = vec
+
+        return np.array(cached, dtype="float32")
+
+    def _upload(self, start: int, emb: np.ndarray) -> None:
+        if self.dense is None:
+            return
+        self.dense.add(
+            start,
+            emb,
+            [self.store.path_id(j) for j in range(start, start + len(emb))],
+        )
+
+    def _dense_index(self) -> DenseIndex:
+        if self.kwargs["backend"] == "numpy":
+            return NumpyIndex(
+                self._vectors_path(), quantization=self.kwargs["quantization"]
+            )
+        return QdrantIndex(
+            self._qdrant_path(),
+            self.collection_name,
+            parallel=self.kwargs["upload_parallel"],
+        )
+
+    def _truncate(self, vectors: np.ndarray) -> np.ndarray:
+        # Matryoshka-trained models keep most of their quality when only
+        # the leading dimensions are kept; cosine distance renormalizes.
+        dimensions = self.kwargs["dimensions"]
+        if dimensions is None:
+            return vectors
+        if dimensions > vectors.shape[1]:
+            raise ValueError(
+                f"Parameter 'dimensions' ({dimensions}) exceeds the "
+                f"embedding size ({vectors.shape[1]})."
+            )
+        return np.ascontiguousarray(vectors[:, :dimensions])
+
+    def _report_skipped(self) -> None:
+        if self.file_filter.skipped:
+            self.console.print(
+                f"[yellow]•[/yellow] {self.file_filter.summary()}"
+            )
+
+    def _report_vectors(self, stats: BuildStats) -> None:
+        if not stats.points:
+            return
+        quantization = self.kwargs["quantization"]
+        size = stats.points * vector_bytes(stats.dimensions, quantization)
+        full_size = stats.points * vector_bytes(
+            stats.sample[0].shape[1], "none"
+        )
+        recall = estimate_recall(
+            np.concatenate(stats.sample),
+            quantization,
+            self.kwargs["dimensions"],
+        )
         self.console.print(
-            f"[green]✓ Found top {len(top_ids)} matching chunks.[/green]"
+            f"[green]✓[/green] Vectors: {stats.dimensions} dims, "
+            f"{quantization} storage, {size / 2**20:.1f} MiB "
+            f"({size / full_size:.0%} of float32), "
+            f"estimated recall@10 {recall:.1%}."
         )
 
-        return [self.files[i] for i in top_ids]
+    def close(self) -> None:
+        self.query_cache.save()
+        if self.dense is not None:
+            self.dense.close()
+            self.dense = None
 
     def _get_kwargs(self, **kwargs):
         kwargs.setdefault("language", self.default_language)
@@ -326,6 +874,19 @@ class LocalRAG:
         kwargs.setdefault("min_score", None)
         kwargs.setdefault("max_chunks", None)
         kwargs.setdefault("max_files", None)
+        kwargs.setdefault("workers", None)
+        kwargs.setdefault("pipeline_depth", self.default_pipeline_depth)
+        kwargs.setdefault("upload_parallel", 1)
+        kwargs.setdefault("backend", self.default_backend)
+        kwargs.setdefault("quantization", "none")
+        kwargs.setdefault("sentence_splitter", "builtin")
+        kwargs.setdefault("max_file_size", FileFilter.default_max_file_size)
+        kwargs.setdefault("skip_generated", True)
+        kwargs.setdefault("dimensions", None)
+        kwargs.setdefault("vector_cache_dir", self.default_vector_cache_dir)
+        kwargs.setdefault("store_text", True)
+        kwargs.setdefault("query_cache_size", QueryCache.default_max_entries)
+        kwargs.setdefault("persist_query_cache", False)
         kwargs.setdefault("index_dir", self.default_index_dir)
 
         if not isinstance(kwargs["language"], str):
@@ -392,6 +953,99 @@ class LocalRAG:
                 "Parameter 'max_files' must be a positive integer or None."
             )
 
+        if kwargs.get("workers") is not None and (
+            not isinstance(kwargs["workers"], int) or kwargs["workers"] < 1
+        ):
+            raise ValueError(
+                "Parameter 'workers' must be a positive integer or None."
+            )
+
+        if (
+            not isinstance(kwargs["pipeline_depth"], int)
+            or kwargs["pipeline_depth"] < 1
+        ):
+            raise ValueError(
+                "Parameter 'pipeline_depth' must be a positive integer."
+            )
+
+        if (
+            not isinstance(kwargs["upload_parallel"], int)
+            or kwargs["upload_parallel"] < 1
+        ):
+            raise ValueError(
+                "Parameter 'upload_parallel' must be a positive integer."
+            )
+
+        if kwargs["backend"] not in self.backends:
+            raise ValueError(
+                "Parameter 'backend' must be one of: "
+                f"{', '.join(self.backends)}."
+            )
+
+        if kwargs["quantization"] not in QUANTIZATIONS:
+            raise ValueError(
+                "Parameter 'quantization' must be one of: "
+                f"{', '.join(QUANTIZATIONS)}."
+            )
+
+        if (
+            kwargs["backend"] == "qdrant"
+            and kwargs["quantization"] not in QdrantIndex.quantizations
+        ):
+            raise ValueError(
+                f"Quantization '{kwargs['quantization']}' is only "
+                "supported by the numpy backend; embedded Qdrant stores "
+                "float32 vectors."
+            )
+
+        if kwargs["sentence_splitter"] not in Parser.SENTENCE_SPLITTERS:
+            raise ValueError(
+                "Parameter 'sentence_splitter' must be one of: "
+                f"{', '.join(Parser.SENTENCE_SPLITTERS)}."
+            )
+
+        if kwargs["max_file_size"] is not None and (
+            not isinstance(kwargs["max_file_size"], int)
+            or kwargs["max_file_size"] < 1
+        ):
+            raise ValueError(
+                "Parameter 'max_file_size' must be a positive integer or None."
+            )
+
+        if not isinstance(kwargs["skip_generated"], bool):
+            raise TypeError("Parameter 'skip_generated' must be a boolean.")
+
+        if kwargs["dimensions"] is not None and (
+            not isinstance(kwargs["dimensions"], int)
+            or kwargs["dimensions"] < 1
+        ):
+            raise ValueError(
+                "Parameter 'dimensions' must be a positive integer or None."
+            )
+
+        if kwargs["vector_cache_dir"] is not None and not isinstance(
+            kwargs["vector_cache_dir"], (str, Path)
+        ):
+            raise TypeError(
+                "Parameter 'vector_cache_dir' must be a path or None."
+            )
+
+        if not isinstance(kwargs["store_text"], bool):
+            raise TypeError("Parameter 'store_text' must be a boolean.")
+
+        if (
+            not isinstance(kwargs["query_cache_size"], int)
+            or kwargs["query_cache_size"] < 0
+        ):
+            raise ValueError(
+                "Parameter 'query_cache_size' must be a non-negative integer."
+            )
+
+        if not isinstance(kwargs["persist_query_cache"], bool):
+            raise TypeError(
+                "Parameter 'persist_query_cache' must be a boolean."
+            )
+
         if kwargs.get("min_score") is not None and not isinstance(
             kwargs["min_score"], (int, float)
         ):
@@ -405,7 +1059,27 @@ class LocalRAG:
     def _qdrant_path(self) -> Path:
         return self._index_dir() / "qdrant"
 
+    def _vectors_path(self) -> Path:
+        return self._index_dir() / "vectors"
+
+    def _manifest_path(self) -> Path:
+        return self._index_dir() / "manifest.json"
+
+    def _store_path(self) -> Path:
+        return self._index_dir() / "chunks"
+
+    def _bm25_path(self) -> Path:
+        return self._index_dir() / "bm25"
+
+    def _symbols_path(self) -> Path:
+        return self._index_dir() / "symbols.json"
+
+    def _query_cache_path(self) -> Path:
+        return self._index_dir() / "query_cache"
+
     @classmethod
     def get_model_tag(cls) -> list[str]:
+        from fastembed import TextEmbedding
+
         models = TextEmbedding.list_supported_models()
         return list(map(lambda data: data["model"], models))
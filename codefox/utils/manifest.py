@@ -0,0 +1,159 @@
+import dataclasses
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any
+
+
+@dataclasses.dataclass
+class ManifestDiff:
+    added: list[str] = dataclasses.field(default_factory=list)
+    modified: list[str] = dataclasses.field(default_factory=list)
+    removed: list[str] = dataclasses.field(default_factory=list)
+    touched: list[str] = dataclasses.field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+
+class Manifest:
+    version = 1
+    hash_block_size = 1 << 20
+
+    def __init__(self, entries: dict[str, dict[str, Any]] | None = None):
+        self.entries: dict[str, dict[str, Any]] = entries or {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.entries
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest | None":
+        if not path.exists():
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != cls.version:
+            return None
+        return cls(data.get("files") or {})
+
+    def save(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": self.version, "files": self.entries},
+                f,
+                ensure_ascii=False,
+            )
+
+    @staticmethod
+    def bytes_hash(data: bytes | mmap.mmap) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    @classmethod
+    def file_hash(cls, path: str) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            while block := f.read(cls.hash_block_size):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def record(
+        self,
+        path: str,
+        chunk_ids: list[int],
+        digest: str | None = None,
+    ) -> None:
+        # Unreadable files are recorded too, with a size of -1, so they
+        # are not picked up as new files on every update.
+        try:
+            stat = os.stat(path)
+            size, mtime = stat.st_size, stat.st_mtime_ns
+            if digest is None:
+                digest = self.file_hash(path)
+        except OSError:
+            size, mtime, digest = -1, -1, ""
+        self.entries[path] = {
+            "size": size,
+            "mtime": mtime,
+            "hash": digest,
+            "chunks": list(chunk_ids),
+        }
+
+    def skip(self, path: str) -> None:
+        # A file left out by the index limits. It counts as unchanged
+        # until it changes, or until ``diff(retry_skipped=True)``.
+        self.record(path, [], digest="")
+        self.entries[path]["skipped"] = True
+
+    def chunk_ids(self, path: str) -> list[int]:
+        entry = self.entries.get(path)
+        return list(entry["chunks"]) if entry else []
+
+    def remove(self, path: str) -> list[int]:
+        entry = self.entries.pop(path, None)
+        return list(entry["chunks"]) if entry else []
+
+    def stale(self) -> list[str]:
+        # Stat-only check for status reports: recorded files whose size or
+        # mtime changed, or which are gone. New files are not detected.
+        stale = []
+        for path, entry in list(self.entries.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stale.append(path)
+                continue
+            if (
+                stat.st_size != entry["size"]
+                or stat.st_mtime_ns != entry["mtime"]
+            ):
+                stale.append(path)
+        return stale
+
+    def diff(
+        self, paths: list[str], retry_skipped: bool = False
+    ) -> ManifestDiff:
+        # Size and mtime are checked first; the content hash is only
+        # computed when they differ, so an unchanged tree costs one stat.
+        result = ManifestDiff()
+        current = set(paths)
+
+        for path in paths:
+            entry = self.entries.get(path)
+            if entry is None or (retry_skipped and entry.get("skipped")):
+                result.added.append(path)
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                if entry["size"] != -1:
+                    result.removed.append(path)
+                continue
+            if (
+                stat.st_size == entry["size"]
+                and stat.st_mtime_ns == entry["mtime"]
+            ):
+                continue
+            try:
+                digest = self.file_hash(path)
+            except OSError:
+                result.removed.append(path)
+                continue
+            if digest == entry["hash"]:
+                entry["size"] = stat.st_size
+                entry["mtime"] = stat.st_mtime_ns
+                result.touched.append(path)
+            else:
+                result.modified.append(path)
+
+        result.removed.extend(
+            path for path in self.entries if path not in current
+        )
+        return result
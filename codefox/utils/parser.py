@@ -1,25 +1,204 @@
+import bisect
+import math
+import mmap
 import re
+from collections.abc import Callable
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, cast, get_args
 
-from nltk.tokenize import sent_tokenize
-from pygments.lexers import get_lexer_for_filename
-from pygments.util import ClassNotFound
-from tree_sitter import Parser as TreeSitterParser
-from tree_sitter_language_pack import SupportedLanguage, get_parser
-
 if TYPE_CHECKING:
+    from tree_sitter import Parser as TreeSitterParser
+    from tree_sitter import Query
+
     import codefox.utils.local_rag as local_rag
+    from codefox.utils.token_budget import TokenCounter
+
+
+class Chunk:
+    __slots__ = (
+        "text",
+        "start_byte",
+        "end_byte",
+        "start_line",
+        "end_line",
+        "language",
+        "symbols",
+    )
+
+    def __init__(
+        self,
+        text: str,
+        start_byte: int,
+        end_byte: int,
+        start_line: int,
+        end_line: int,
+        language: str = "text",
+        symbols: list[tuple[str, str, int]] | None = None,
+    ):
+        self.text = text
+        self.start_byte = start_byte
+        self.end_byte = end_byte
+        self.start_line = start_line
+        self.end_line = end_line
+        self.language = language
+        # (name, kind, line) of the definitions starting in this chunk.
+        self.symbols = symbols or []
+
+    def __repr__(self) -> str:
+        return (
+            f"Chunk(lines={self.start_line}-{self.end_line}, "
+            f"bytes={self.start_byte}-{self.end_byte}, "
+            f"language={self.language!r})"
+        )
 
 
 class Parser:
-    CODE_CHUNK_TYPES = {
-        "function_definition",
-        "class_definition",
-        "method_definition",
-        "function_declaration",
-        "class_declaration",
+    # Fallback for languages without an entry in DEFINITION_TYPES.
+    CODE_CHUNK_TYPES = frozenset(
+        {
+            "function_definition",
+            "class_definition",
+            "method_definition",
+            "function_declaration",
+            "class_declaration",
+        }
+    )
+    # Node types that become one chunk each, per tree-sitter language.
+    # The walk does not descend into a match, so a class is chunked as a
+    # whole and only top-level functions are chunked on their own.
+    DEFINITION_TYPES: dict[str, frozenset[str]] = {
+        "python": frozenset(
+            {"function_definition", "class_definition", "decorated_definition"}
+        ),
+        "go": frozenset(
+            {"function_declaration", "method_declaration", "type_declaration"}
+        ),
+        "rust": frozenset(
+            {
+                "function_item",
+                "impl_item",
+                "trait_item",
+                "struct_item",
+                "enum_item",
+                "macro_definition",
+            }
+        ),
+        "java": frozenset(
+            {
+                "class_declaration",
+                "interface_declaration",
+                "enum_declaration",
+                "record_declaration",
+                "annotation_type_declaration",
+                "method_declaration",
+                "constructor_declaration",
+            }
+        ),
+        "javascript": frozenset(
+            {
+                "function_declaration",
+                "generator_function_declaration",
+                "class_declaration",
+                "method_definition",
+            }
+        ),
+        "c": frozenset({"function_definition"}),
+        "ruby": frozenset({"method", "singleton_method", "class", "module"}),
+        "php": frozenset(
+            {
+                "function_definition",
+                "class_declaration",
+                "interface_declaration",
+                "trait_declaration",
+                "enum_declaration",
+                "method_declaration",
+            }
+        ),
+        "kotlin": frozenset(
+            {"function_declaration", "class_declaration", "object_declaration"}
+        ),
+        "swift": frozenset(
+            {
+                "function_declaration",
+                "class_declaration",
+                "protocol_declaration",
+            }
+        ),
+        "scala": frozenset(
+            {
+                "function_definition",
+                "class_definition",
+                "object_definition",
+                "trait_definition",
+            }
+        ),
+        "lua": frozenset({"function_declaration"}),
+        "bash": frozenset({"function_definition"}),
+        "julia": frozenset(
+            {
+                "function_definition",
+                "macro_definition",
+                "struct_definition",
+                "module_definition",
+            }
+        ),
+        "haskell": frozenset({"function", "data_type", "class", "instance"}),
+        "ocaml": frozenset(
+            {"value_definition", "type_definition", "module_definition"}
+        ),
     }
+    DEFINITION_TYPES["typescript"] = DEFINITION_TYPES["javascript"] | {
+        "abstract_class_declaration",
+        "interface_declaration",
+        "type_alias_declaration",
+        "enum_declaration",
+        "internal_module",
+    }
+    DEFINITION_TYPES["tsx"] = DEFINITION_TYPES["typescript"]
+    # Variable declarations whose value is one of these are definitions
+    # too (``export const handler = () => {}``): the declaration is
+    # chunked like a function and the declarator's name is the symbol.
+    FUNCTION_VALUE_TYPES: dict[str, frozenset[str]] = {
+        "javascript": frozenset(
+            {"arrow_function", "function_expression", "generator_function"}
+        ),
+    }
+    FUNCTION_VALUE_TYPES["typescript"] = FUNCTION_VALUE_TYPES["javascript"]
+    FUNCTION_VALUE_TYPES["tsx"] = FUNCTION_VALUE_TYPES["javascript"]
+    DECLARATION_TYPES = frozenset(
+        {"lexical_declaration", "variable_declaration"}
+    )
+    # Definitions that only wrap another one are not symbols themselves.
+    SYMBOL_WRAPPER_TYPES = frozenset({"decorated_definition"})
+    FUNCTION_WORDS = (
+        "function",
+        "method",
+        "constructor",
+        "macro",
+        "value",
+        "variable_declarator",
+    )
+    # Bumped whenever chunk boundaries change, so existing indexes are
+    # rebuilt instead of mixing old and new chunks.
+    chunker_version = 4
+    max_split_depth = 32
+    max_header_chars = 200
+    hunk_query_tokens = 64
+    context_overfetch = 3
+    min_context_k = 4
+    max_context_k = 64
+    PROSE_LANGUAGES = {"markdown", "text", "restructuredtext"}
+    SENTENCE_SPLITTERS = ("builtin", "nltk")
+    _SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*(?=\s)")
+    _MD_HEADING = re.compile(r"#{1,6}\s")
+    _YAML_TOP_KEY = re.compile(r"(?:---\s*$|[^\s#-][^:#]*:(?:\s|$))")
+    _punkt_available: bool | None = None
+    # Per-process registries: pygments guesses a language once per
+    # extension and each language gets one reusable tree-sitter parser,
+    # so discovery and chunking cost a dict lookup per file.
+    _languages: dict[str, str | None] = {}
+    _ts_parsers: dict[str, "TreeSitterParser | None"] = {}
+    _symbol_queries: dict[str, "Query | None"] = {}
 
     @classmethod
     def parse_diff_for_rag(cls, diff_text: str, max_tokens: int = 300) -> str:
@@ -72,6 +251,15 @@ class Parser:
         query = " ".join(parts[:max_tokens]) if max_tokens else " ".join(parts)
         return query.strip() or diff_text[:2000].strip()
 
+    @classmethod
+    def context_k(cls, budget_chars: int, chunk_size: int) -> int:
+        # Enough candidates to fill the budget a few times over, so the
+        # packer has smaller chunks to choose from when large ones overflow.
+        k = math.ceil(
+            cls.context_overfetch * budget_chars / max(chunk_size, 1)
+        )
+        return max(cls.min_context_k, min(cls.max_context_k, k))
+
     @classmethod
     def get_files_context(
         cls,
@@ -80,6 +268,8 @@ class Parser:
         k: int = 5,
         max_rag_chars: int = 16_000,
         parse_diff: bool = True,
+        max_rag_tokens: int | None = None,
+        counter: "TokenCounter | None" = None,
     ) -> str:
         if parse_diff and (
             "diff --git" in query or "--- a/" in query or "+++ b/" in query
@@ -87,86 +277,851 @@ class Parser:
             query = cls.parse_diff_for_rag(query)
         rag_chunks = rag.search(query, k=k)
 
-        total = 0
-        parts: list[str] = []
-        for c in rag_chunks:
-            block = f"<file path='{c['path']}'>\n{c['text']}\n</file>"
-            if total + len(block) > max_rag_chars and parts:
-                break
+        return cls._pack_context(
+            rag_chunks,
+            [1.0 / (rank + 1) for rank in range(len(rag_chunks))],
+            max_rag_chars,
+            max_rag_tokens,
+            counter,
+        )
 
-            total += len(block)
-            parts.append(block)
+    @classmethod
+    def get_hunks_context(
+        cls,
+        rag: "local_rag.LocalRAG",
+        diff_text: str,
+        k: int = 5,
+        max_rag_chars: int = 16_000,
+        max_queries: int = 32,
+        max_rag_tokens: int | None = None,
+        counter: "TokenCounter | None" = None,
+    ) -> str:
+        # One query per hunk, all sent as one batch. Chunks found for
+        # several hunks are merged and valued by their summed reciprocal
+        # ranks. Each hunk's best chunk is reserved first, so no hunk is
+        # left without context while the budget goes to runners-up.
+        hunks = cls.split_diff_hunks(diff_text, max_queries)
+        if len(hunks) < 2:
+            return cls.get_files_context(
+                rag,
+                diff_text,
+                k,
+                max_rag_chars,
+                max_rag_tokens=max_rag_tokens,
+                counter=counter,
+            )
+
+        queries = [
+            cls.parse_diff_for_rag(
+                f"+++ b/{path}\n{hunk}", cls.hunk_query_tokens
+            )
+            for path, hunk in hunks
+        ]
+        ranked = rag.search_many(queries, k=k)
+
+        found: dict[tuple, dict] = {}
+        scores: dict[tuple, float] = {}
+        best: list[tuple] = []
+        for chunks in ranked:
+            for rank, c in enumerate(chunks):
+                key = (
+                    c["path"],
+                    c.get("start_line"),
+                    c.get("end_line"),
+                    None if c.get("start_line") else c["text"],
+                )
+                found.setdefault(key, c)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (rank + 1)
+                if rank == 0:
+                    best.append(key)
 
-        return "\n\n".join(parts)
+        index = {key: i for i, key in enumerate(found)}
+        return cls._pack_context(
+            list(found.values()),
+            list(scores.values()),
+            max_rag_chars,
+            max_rag_tokens,
+            counter,
+            reserved=[index[key] for key in best],
+        )
 
     @classmethod
-    def get_ts_parser_by_extension(cls, ext: str) -> TreeSitterParser | None:
+    def _pack_context(
+        cls,
+        chunks: list[dict],
+        values: list[float],
+        max_rag_chars: int,
+        max_rag_tokens: int | None = None,
+        counter: "TokenCounter | None" = None,
+        reserved: list[int] | None = None,
+    ) -> str:
+        # The budget is in tokens when ``max_rag_tokens`` is given and in
+        # characters otherwise. Each chunk is measured once as its own
+        # block plus separator; merging shared lines and headers only
+        # shrinks that, so running totals of these costs never overshoot
+        # by much. ``reserved`` chunks are taken first, in order, while
+        # they fit, the rest is packed as a knapsack, and a greedy pass
+        # fills whatever merging freed up.
+        from codefox.utils.token_budget import TokenCounter, pack
+
+        measure: Callable[[str], int]
+        if max_rag_tokens is None:
+            capacity, measure = max_rag_chars, len
+        else:
+            capacity = max_rag_tokens
+            measure = (counter or TokenCounter()).count
+
+        def size(indices: list[int]) -> int:
+            return measure(cls._render_context([chunks[i] for i in indices]))
+
+        separator = measure("\n\n")
+        costs = [size([i]) + separator for i in range(len(chunks))]
+        by_value = sorted(range(len(chunks)), key=lambda i: -values[i])
+        selected: list[int] = []
+        used = 0
+        for i in dict.fromkeys(reserved or ()):
+            if used + costs[i] <= capacity:
+                selected.append(i)
+                used += costs[i]
+        kept = len(selected)
+        chosen = set(selected)
+        rest = [i for i in by_value if i not in chosen]
+        packed = pack(
+            [costs[i] for i in rest],
+            [values[i] for i in rest],
+            capacity - used,
+        )
+        selected.extend(rest[j] for j in sorted(packed))
+        chosen.update(selected)
+
+        used = size(selected)
+        for i in by_value:
+            if i not in chosen and used + costs[i] <= capacity:
+                selected.append(i)
+                chosen.add(i)
+                used += costs[i]
+
+        # Token counts are not strictly additive, so the rendered total is
+        # checked and the lowest-valued unreserved chunks dropped if over.
+        while len(selected) > kept and (total := size(selected)) > capacity:
+            droppable = sorted(selected[kept:], key=lambda i: values[i])
+            excess = total - capacity
+            dropped = set()
+            for i in droppable:
+                dropped.add(i)
+                excess -= costs[i]
+                if excess <= 0:
+                    break
+            selected = [i for i in selected if i not in dropped]
+
+        selected.sort(key=lambda i: -values[i])
+        return cls._render_context([chunks[i] for i in selected])
+
+    @classmethod
+    def split_diff_hunks(
+        cls, diff_text: str, max_hunks: int | None = None
+    ) -> list[tuple[str, str]]:
+        # Returns ``(path, hunk)`` pairs; each hunk keeps its "@@" header
+        # and changed lines. Past ``max_hunks``, the hunks of each file
+        # are joined and then neighbouring files share one entry.
+        hunks: list[tuple[str, list[str]]] = []
+        path = ""
+        prev = ""
+        for line in diff_text.splitlines():
+            if line.startswith("diff --git "):
+                m = re.match(r"diff --git a/(.+?) b/(.+)$", line)
+                path = m.group(2).strip() if m else ""
+                hunks.append((path, []))
+            elif line.startswith("+++ ") and prev.startswith("--- "):
+                target = line[4:].strip()
+                if target != "/dev/null":
+                    path = target.removeprefix("b/")
+                else:
+                    path = prev[4:].strip().removeprefix("a/")
+                hunks.append((path, []))
+            elif line.startswith("@@") and hunks:
+                hunks.append((path, [line]))
+            elif hunks and hunks[-1][1]:
+                hunks[-1][1].append(line)
+            prev = line
+
+        pairs = [(p, "\n".join(lines)) for p, lines in hunks if lines]
+        if max_hunks is None or len(pairs) <= max_hunks:
+            return pairs
+
+        files: dict[str, list[str]] = {}
+        for p, hunk in pairs:
+            files.setdefault(p, []).append(hunk)
+        merged = [(p, "\n".join(parts)) for p, parts in files.items()]
+        if len(merged) <= max_hunks:
+            return merged
+        size = -(-len(merged) // max_hunks)
+        return [
+            (
+                group[0][0],
+                "\n".join(
+                    f"+++ b/{p}\n{hunk}" if i else hunk
+                    for i, (p, hunk) in enumerate(group)
+                ),
+            )
+            for group in (
+                merged[i : i + size] for i in range(0, len(merged), size)
+            )
+        ]
+
+    @staticmethod
+    def _format_context_block(entry: dict) -> str:
+        lines = (
+            " lines='"
+            + ", ".join(f"{start}-{end}" for start, end in entry["ranges"])
+            + "'"
+            if entry["ranges"]
+            else ""
+        )
+        return (
+            f"<file path='{entry['path']}'{lines}>\n{entry['text']}\n</file>"
+        )
+
+    @classmethod
+    def _render_context(cls, chunks: list[dict]) -> str:
+        return "\n\n".join(
+            cls._format_context_block(entry)
+            for entry in cls.merge_context_chunks(chunks)
+        )
+
+    @staticmethod
+    def merge_context_chunks(chunks: list[dict]) -> list[dict]:
+        # One entry per file, in the order of each file's best-ranked hit.
+        # Overlapping or adjacent line ranges are joined and every line is
+        # emitted once; ranges with a gap are separated by "...". Chunks
+        # without line numbers cannot be merged and stay as they are.
+        entries: list[dict] = []
+        by_path: dict[str, dict] = {}
+        for c in chunks:
+            start, end = c.get("start_line"), c.get("end_line")
+            if not start or not end:
+                entries.append(
+                    {"path": c["path"], "ranges": [], "text": c["text"]}
+                )
+                continue
+            entry = by_path.get(c["path"])
+            if entry is None:
+                entry = by_path[c["path"]] = {
+                    "path": c["path"],
+                    "spans": [],
+                    "lines": {},
+                }
+                entries.append(entry)
+            entry["spans"].append((start, end))
+
+            parts = c["text"].removesuffix("\n").split("\n")
+            # Pieces of a split definition start with its signature, which
+            # lies outside their line range.
+            del parts[: max(len(parts) - (end - start + 1), 0)]
+            lines = entry["lines"]
+            for line_no, line in enumerate(parts, start):
+                # A sentence chunk may start mid-line; keep the fuller copy.
+                if len(line) > len(lines.get(line_no, "")):
+                    lines[line_no] = line
+                else:
+                    lines.setdefault(line_no, line)
+
+        for entry in by_path.values():
+            ranges: list[list[int]] = []
+            for start, end in sorted(entry.pop("spans")):
+                if ranges and start <= ranges[-1][1] + 1:
+                    ranges[-1][1] = max(ranges[-1][1], end)
+                else:
+                    ranges.append([start, end])
+            lines = entry.pop("lines")
+            entry["ranges"] = [(start, end) for start, end in ranges]
+            entry["text"] = "\n...\n".join(
+                "\n".join(
+                    lines[line_no]
+                    for line_no in range(start, end + 1)
+                    if line_no in lines
+                )
+                for start, end in ranges
+            )
+        return entries
+
+    @classmethod
+    def get_language_by_extension(cls, ext: str) -> str | None:
+        ext = ext.lower()
+        if ext not in cls._languages:
+            cls._languages[ext] = cls._guess_language(ext)
+        return cls._languages[ext]
+
+    @classmethod
+    def get_ts_parser_by_extension(cls, ext: str) -> "TreeSitterParser | None":
+        lang = cls.get_language_by_extension(ext)
+        if lang is None:
+            return None
+        if lang not in cls._ts_parsers:
+            cls._ts_parsers[lang] = cls._load_ts_parser(lang)
+        return cls._ts_parsers[lang]
+
+    @classmethod
+    def is_supported_extension(cls, ext: str) -> bool:
+        return cls.get_ts_parser_by_extension(ext) is not None
+
+    @staticmethod
+    def _guess_language(ext: str) -> str | None:
+        from pygments.lexers import get_lexer_for_filename
+        from pygments.util import ClassNotFound
+        from tree_sitter_language_pack import SupportedLanguage
+
         try:
-            lang = get_lexer_for_filename(ext)
-            lang = lang.name.lower()
-            if lang not in get_args(SupportedLanguage):
-                return None
+            lang = get_lexer_for_filename(ext).name.lower()
+        except ClassNotFound:
+            return None
+        if lang not in get_args(SupportedLanguage):
+            return None
+        return cast(str, lang)
+
+    @staticmethod
+    def _load_ts_parser(lang: str) -> "TreeSitterParser | None":
+        from tree_sitter_language_pack import get_parser
 
+        try:
             return get_parser(cast(Any, lang))
-        except (ClassNotFound, ModuleNotFoundError):
+        except (LookupError, ModuleNotFoundError):
             return None
 
     @classmethod
     def chunk_code_with_ts(cls, parser, content: str) -> list[str]:
-        tree = parser.parse(bytes(content, "utf8"))
-        root = tree.root_node
+        return [chunk.text for chunk in cls.chunk_code_spans(parser, content)]
 
-        chunks = []
+    @classmethod
+    def definition_types(cls, language: str) -> frozenset[str]:
+        return cls.DEFINITION_TYPES.get(language, cls.CODE_CHUNK_TYPES)
 
-        def walk(node):
-            if node.type in cls.CODE_CHUNK_TYPES:
-                chunk = content[node.start_byte : node.end_byte]
-                chunks.append(chunk)
-                return
+    @classmethod
+    def chunk_code_spans(
+        cls,
+        parser,
+        content: str | bytes | mmap.mmap,
+        language: str = "text",
+        chunk_size: int | None = None,
+    ) -> list[Chunk]:
+        # ``content`` may already be the file's bytes (or an mmap of it):
+        # tree-sitter parses the buffer in place and only the text of the
+        # final chunks is ever decoded.
+        source = (
+            content.encode("utf-8") if isinstance(content, str) else content
+        )
+        tree = parser.parse(source)
+        nodes = cls._definition_nodes(
+            tree,
+            cls.definition_types(language),
+            cls.FUNCTION_VALUE_TYPES.get(language, frozenset()),
+        )
+        if chunk_size is None:
+            spans = [(node.start_byte, node.end_byte, "") for node in nodes]
+        else:
+            spans = cls._pack_definitions(source, nodes, chunk_size)
+        chunks = cls._byte_spans_to_chunks(source, spans, language)
+
+        starts = [chunk.start_byte for chunk in chunks]
+        for offset, symbol in cls.extract_symbols(parser, tree, language):
+            index = bisect.bisect_right(starts, offset) - 1
+            if index >= 0:
+                chunks[index].symbols.append(symbol)
+        return chunks
+
+    @classmethod
+    def extract_symbols(
+        cls, parser, tree, language: str
+    ) -> list[tuple[int, tuple[str, str, int]]]:
+        # One query per language captures every definition, nested ones
+        # included, without walking the tree in Python. Returns
+        # ``(start_byte, (name, kind, line))`` in document order.
+        query = cls._symbol_query(parser, language)
+        if query is None:
+            return []
+        from tree_sitter import QueryCursor
+
+        symbols: list[tuple[int, tuple[str, str, int]]] = []
+        for node in (
+            QueryCursor(query).captures(tree.root_node).get("definition", [])
+        ):
+            name = cls._symbol_name(node)
+            if name:
+                kind = cls._symbol_kind(node.type)
+                line = node.start_point[0] + 1
+                symbols.append((node.start_byte, (name, kind, line)))
+        symbols.sort()
+        return symbols
+
+    @classmethod
+    def _symbol_query(cls, parser, language: str) -> "Query | None":
+        if language not in cls._symbol_queries:
+            from tree_sitter import Query
+
+            grammar = parser.language
+            types = [
+                node_type
+                for node_type in sorted(cls.definition_types(language))
+                if node_type not in cls.SYMBOL_WRAPPER_TYPES
+                and grammar.id_for_node_kind(node_type, True) is not None
+            ]
+            values = [
+                node_type
+                for node_type in sorted(
+                    cls.FUNCTION_VALUE_TYPES.get(language, ())
+                )
+                if grammar.id_for_node_kind(node_type, True) is not None
+            ]
+            patterns = [f"({t})" for t in types]
+            if values:
+                patterns.append(
+                    "(variable_declarator name: (identifier) value: ["
+                    + " ".join(f"({t})" for t in values)
+                    + "])"
+                )
+            cls._symbol_queries[language] = (
+                Query(grammar, "[" + " ".join(patterns) + "] @definition")
+                if patterns
+                else None
+            )
+        return cls._symbol_queries[language]
+
+    @staticmethod
+    def _symbol_name(node) -> str | None:
+        # Most grammars name a definition through a ``name`` field; Rust
+        # impls use ``type`` and Go wraps types in a named type_spec.
+        name = node.child_by_field_name("name") or node.child_by_field_name(
+            "type"
+        )
+        if name is None:
+            for child in node.named_children:
+                name = child.child_by_field_name("name")
+                if name is not None:
+                    break
+        if name is None or name.text is None:
+            return None
+        return cast(str, name.text.decode("utf-8", errors="replace"))
+
+    @classmethod
+    def _symbol_kind(cls, node_type: str) -> str:
+        if any(word in node_type for word in cls.FUNCTION_WORDS):
+            return "function"
+        return "class"
+
+    @classmethod
+    def _definition_nodes(
+        cls,
+        tree,
+        types: frozenset[str],
+        function_values: frozenset[str] = frozenset(),
+    ) -> list:
+        nodes: list = []
+        # A cursor walk in document order: no Python recursion, so deep
+        # ASTs cost neither stack frames nor per-level child lists.
+        cursor = tree.walk()
+        if not cursor.goto_first_child():
+            return nodes
+        while True:
+            node = cursor.node
+            if node.type in types or (
+                function_values
+                and node.type in cls.DECLARATION_TYPES
+                and cls._declares_function(node, function_values)
+            ):
+                nodes.append(node)
+            elif cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent() or cursor.depth == 0:
+                    return nodes
+
+    @staticmethod
+    def _declares_function(node, function_values: frozenset[str]) -> bool:
+        for declarator in node.named_children:
+            value = declarator.child_by_field_name("value")
+            if value is not None and value.type in function_values:
+                return True
+        return False
+
+    @classmethod
+    def _pack_definitions(
+        cls, source: bytes | mmap.mmap, nodes: list, chunk_size: int
+    ) -> list[tuple[int, int, str]]:
+        # Consecutive small definitions share a chunk while the slice
+        # spanning them fits ``chunk_size``; a definition that does not
+        # fit on its own is split. Sizes are in bytes, which equals
+        # characters for ASCII source.
+        spans: list[tuple[int, int, str]] = []
+        run: tuple[int, int] | None = None
+        for node in nodes:
+            if node.end_byte - node.start_byte > chunk_size:
+                if run is not None:
+                    spans.append((*run, ""))
+                    run = None
+                cls._split_node(
+                    source, node, chunk_size, node.start_byte, [], spans, 0
+                )
+            elif run is not None and node.end_byte - run[0] <= chunk_size:
+                run = (run[0], node.end_byte)
+            else:
+                if run is not None:
+                    spans.append((*run, ""))
+                run = (node.start_byte, node.end_byte)
+        if run is not None:
+            spans.append((*run, ""))
+        return spans
 
-            for child in node.children:
-                walk(child)
+    @classmethod
+    def _split_node(
+        cls,
+        source: bytes | mmap.mmap,
+        node,
+        chunk_size: int,
+        start: int,
+        headers: list[tuple[int, str]],
+        spans: list[tuple[int, int, str]],
+        depth: int,
+    ) -> None:
+        # Children are grouped greedily up to ``chunk_size`` and an
+        # oversized child is split in turn, starting where the pending
+        # group started so a signature stays with the first piece of its
+        # body. Descending into a body records the signature as a header
+        # for every later piece; ``headers`` holds (offset, text) pairs.
+        children = node.children
+        if not children or depth >= cls.max_split_depth:
+            cls._split_lines(
+                source, start, node.end_byte, chunk_size, headers, spans
+            )
+            return
+
+        body = node.child_by_field_name("body")
+        group: list[int] | None = None
+        pending: int | None = start
+        for child in children:
+            if child.end_byte - child.start_byte > chunk_size:
+                carry = group[0] if group else pending
+                if carry is None:
+                    carry = child.start_byte
+                child_headers = headers
+                if body is not None and child == body:
+                    signature = " ".join(
+                        source[node.start_byte : child.start_byte]
+                        .decode("utf-8", errors="replace")
+                        .split()
+                    )
+                    if signature:
+                        child_headers = headers + [
+                            (
+                                node.start_byte,
+                                signature[: cls.max_header_chars],
+                            )
+                        ]
+                cls._split_node(
+                    source,
+                    child,
+                    chunk_size,
+                    carry,
+                    child_headers,
+                    spans,
+                    depth + 1,
+                )
+                group = None
+                pending = None
+            elif group is None:
+                group_start = child.start_byte if pending is None else pending
+                group = [group_start, child.end_byte]
+                pending = None
+            elif child.end_byte - group[0] > chunk_size:
+                cls._add_span(
+                    source, group[0], group[1], chunk_size, headers, spans
+                )
+                group = [child.start_byte, child.end_byte]
+            else:
+                group[1] = child.end_byte
+        if group is not None:
+            cls._add_span(
+                source, group[0], group[1], chunk_size, headers, spans
+            )
+
+    @classmethod
+    def _split_lines(
+        cls,
+        source: bytes | mmap.mmap,
+        start: int,
+        end: int,
+        chunk_size: int,
+        headers: list[tuple[int, str]],
+        spans: list[tuple[int, int, str]],
+    ) -> None:
+        # Last resort for a node without splittable children: cut at the
+        # last newline in the second half of the window, or else at a
+        # UTF-8 character boundary.
+        pos = start
+        while pos < end:
+            stop = min(end, pos + chunk_size)
+            if stop < end:
+                cut = source.rfind(b"\n", pos + chunk_size // 2, stop)
+                if cut >= 0:
+                    stop = cut + 1
+                else:
+                    while stop > pos + 1 and source[stop] & 0xC0 == 0x80:
+                        stop -= 1
+            cls._add_span(source, pos, stop, chunk_size, headers, spans)
+            pos = stop
+
+    @staticmethod
+    def _add_span(
+        source: bytes | mmap.mmap,
+        start: int,
+        end: int,
+        chunk_size: int,
+        headers: list[tuple[int, str]],
+        spans: list[tuple[int, int, str]],
+    ) -> None:
+        if not source[start:end].strip():
+            return
+        # Pieces open at the start of their first line, so indentation is
+        # kept, and a short tail is folded into the piece before it.
+        line_start = source.rfind(b"\n", 0, start) + 1
+        if not source[line_start:start].strip():
+            start = max(line_start, spans[-1][1] if spans else 0)
+        header = "\n".join(text for offset, text in headers if offset < start)
+        if spans:
+            prev_start, prev_end, prev_header = spans[-1]
+            if (
+                prev_header == header
+                and not source[prev_end:start].strip()
+                and end - prev_start <= chunk_size
+            ):
+                spans[-1] = (prev_start, end, header)
+                return
+        spans.append((start, end, header))
 
-        walk(root)
+    @staticmethod
+    def _byte_spans_to_chunks(
+        source: bytes | mmap.mmap,
+        spans: list[tuple[int, int, str]],
+        language: str,
+    ) -> list[Chunk]:
+        # A split piece carries the signatures of the definitions it sits
+        # in as a header line; its byte range covers only the slice.
+        newlines = [m.start() for m in re.finditer(b"\n", source)]
+        chunks: list[Chunk] = []
+        with memoryview(source) as view:
+            for start, end, header in spans:
+                text = str(view[start:end], "utf-8", "replace")
+                chunks.append(
+                    Chunk(
+                        f"{header}\n{text}" if header else text,
+                        start,
+                        end,
+                        bisect.bisect_left(newlines, start) + 1,
+                        bisect.bisect_left(newlines, max(start, end - 1)) + 1,
+                        language,
+                    )
+                )
         return chunks
 
     @classmethod
     def chunk_text_sentences(
         cls, text: str, chunk_size: int, overlap: int
     ) -> list[str]:
-        sentences = sent_tokenize(text)
-        chunks = []
-        current = []
+        return [
+            chunk.text
+            for chunk in cls.chunk_text_spans(text, chunk_size, overlap)
+        ]
+
+    @classmethod
+    def chunk_text_spans(
+        cls,
+        text: str,
+        chunk_size: int,
+        overlap: int,
+        language: str = "text",
+        splitter: str = "builtin",
+    ) -> list[Chunk]:
+        # Each chunk is an exact slice of ``text``: it runs from the start
+        # of its first segment (or the overlap carried over from the
+        # previous chunk) to the end of its last segment. Headings and
+        # top-level YAML keys always open a new chunk.
+        if splitter == "nltk" and cls.ensure_punkt():
+            segments = cls._nltk_segments(text)
+        else:
+            segments = cls.split_segments(text, language)
+
+        bounds: list[tuple[int, int]] = []
+        start: int | None = None
+        last_end = 0
+        for seg_start, seg_end, hard in segments:
+            if hard and start is not None:
+                if not bounds or bounds[-1][1] < last_end:
+                    bounds.append((start, last_end))
+                start = None
+            if start is None:
+                start = seg_start
+            last_end = seg_end
+            if seg_end - start >= chunk_size:
+                bounds.append((start, seg_end))
+                start = max(seg_end - overlap, start) if overlap else None
+
+        if start is not None and (not bounds or bounds[-1][1] < last_end):
+            bounds.append((start, last_end))
+
+        return cls._spans_to_chunks(text, bounds, language)
 
-        current_len = 0
+    @classmethod
+    def split_segments(
+        cls, text: str, language: str = "text"
+    ) -> list[tuple[int, int, bool]]:
+        # Returns ``(start, end, hard)`` character spans. Prose is split
+        # into sentences, everything else (YAML, code, fenced blocks)
+        # into lines; ``hard`` marks a heading or top-level YAML key.
+        segments: list[tuple[int, int, bool]] = []
+        prose = language in cls.PROSE_LANGUAGES
+        in_fence = False
+        pos = 0
+        for line in text.splitlines(keepends=True):
+            line_start = pos
+            pos += len(line)
+            stripped = line.strip()
+            if not stripped:
+                continue
+            start = line_start + len(line) - len(line.lstrip())
+            end = line_start + len(line.rstrip())
+
+            if language == "markdown" and stripped.startswith(("```", "~~~")):
+                in_fence = not in_fence
+                segments.append((start, end, False))
+                continue
+
+            hard = bool(
+                (
+                    language == "markdown"
+                    and not in_fence
+                    and cls._MD_HEADING.match(line)
+                )
+                or (language == "yaml" and cls._YAML_TOP_KEY.match(line))
+            )
+            if not prose or in_fence or hard:
+                segments.append((start, end, hard))
+                continue
+
+            for match in cls._SENTENCE_END.finditer(text, start, end):
+                segments.append((start, match.end(), False))
+                start = match.end()
+                while start < end and text[start].isspace():
+                    start += 1
+            if start < end:
+                segments.append((start, end, False))
+        return segments
+
+    @classmethod
+    def _nltk_segments(cls, text: str) -> list[tuple[int, int, bool]]:
+        from nltk.tokenize import sent_tokenize
+
+        segments: list[tuple[int, int, bool]] = []
+        pos = 0
+        for sent in sent_tokenize(text):
+            sent_start = text.find(sent, pos)
+            if sent_start < 0:
+                sent_start = pos
+            pos = sent_start + len(sent)
+            segments.append((sent_start, pos, False))
+        return segments
 
-        for sent in sentences:
-            current.append(sent)
-            current_len += len(sent)
+    @classmethod
+    def ensure_punkt(cls) -> bool:
+        # Checked once per process: a local lookup when the data is
+        # installed, a single download attempt only when it is missing.
+        if cls._punkt_available is None:
+            import nltk
 
-            if current_len >= chunk_size:
-                chunks.append(" ".join(current))
+            try:
+                nltk.data.find("tokenizers/punkt_tab/english/")
+                cls._punkt_available = True
+            except LookupError:
+                cls._punkt_available = bool(
+                    nltk.download(
+                        "punkt_tab", quiet=True, raise_on_error=False
+                    )
+                )
+        return cls._punkt_available
 
-                overlap_text = " ".join(current)[-overlap:]
-                current = [overlap_text]
-                current_len = len(overlap_text)
+    @classmethod
+    def resolve_splitter(cls, splitter: str) -> str:
+        # Called before chunking is handed to worker processes, so punkt
+        # is looked up (and at most downloaded) once, by the parent.
+        if splitter == "nltk" and not cls.ensure_punkt():
+            return "builtin"
+        return splitter
 
-        if current:
-            chunks.append(" ".join(current))
+    @classmethod
+    def _spans_to_chunks(
+        cls, text: str, bounds: list[tuple[int, int]], language: str
+    ) -> list[Chunk]:
+        chunks: list[Chunk] = []
+        byte_pos = 0
+        char_pos = 0
+        line = 1
+        offsets: dict[int, tuple[int, int]] = {}
+        for point in sorted({p for span in bounds for p in span}):
+            segment = text[char_pos:point]
+            byte_pos += len(segment.encode("utf-8"))
+            line += segment.count("\n")
+            char_pos = point
+            offsets[point] = (byte_pos, line)
 
+        for start, end in bounds:
+            start_byte, start_line = offsets[start]
+            end_byte, end_line = offsets[end]
+            chunks.append(
+                Chunk(
+                    text[start:end],
+                    start_byte,
+                    end_byte,
+                    start_line,
+                    end_line,
+                    language,
+                )
+            )
         return chunks
 
     @classmethod
     def smart_chunk(
         cls, path: Path, content: str, chunk_size, overlap
     ) -> list:
+        return [
+            chunk.text
+            for chunk in cls.smart_chunk_spans(
+                path, content, chunk_size, overlap
+            )
+        ]
+
+    @classmethod
+    def smart_chunk_spans(
+        cls,
+        path: Path,
+        content: str | bytes | mmap.mmap,
+        chunk_size: int,
+        overlap: int,
+        splitter: str = "builtin",
+    ) -> list[Chunk]:
+        # Code is chunked straight from the raw bytes; a file is decoded
+        # as a whole only when it falls back to text splitting.
         ext = path.suffix.lower()
 
-        parser = cls.get_ts_parser_by_extension(ext)
+        language = cls.get_language_by_extension(ext)
+        parser = cls.get_ts_parser_by_extension(ext) if language else None
 
         if parser:
-            chunks = cls.chunk_code_with_ts(parser, content)
+            chunks = cls.chunk_code_spans(
+                parser, content, language or "text", chunk_size
+            )
             if chunks:
                 return chunks
 
-        return cls.chunk_text_sentences(content, chunk_size, overlap)
+        if not isinstance(content, str):
+            content = str(content, "utf-8", "replace")
+        return cls.chunk_text_spans(
+            content, chunk_size, overlap, language or "text", splitter
+        )
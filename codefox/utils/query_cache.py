@@ -0,0 +1,153 @@
+import json
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import cast
+
+import numpy as np
+
+
+class QueryCache:
+    version = 1
+    default_max_entries = 256
+
+    def __init__(
+        self,
+        max_entries: int = default_max_entries,
+        path: Path | None = None,
+        key: str = "",
+        search_key: str = "",
+    ) -> None:
+        # Query vectors depend only on the model (``key``), so they stay
+        # valid across index updates; fused results are keyed by the
+        # index version as well and simply stop matching after an update.
+        # Persisted results are dropped when the search settings that
+        # shape them (``search_key``) change.
+        self.max_entries = max_entries
+        self.path = path
+        self.key = key
+        self.search_key = search_key
+        self.vectors: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.results: OrderedDict[tuple[str, int, str], list[int]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        if path is not None:
+            self._load()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.split())
+
+    def get_vector(self, query: str) -> np.ndarray | None:
+        return cast(np.ndarray | None, self._get(self.vectors, query))
+
+    def put_vector(self, query: str, vector: np.ndarray) -> None:
+        self._put(self.vectors, query, vector)
+
+    def get_results(
+        self, query: str, k: int, index_version: str
+    ) -> list[int] | None:
+        return cast(
+            list[int] | None,
+            self._get(self.results, (index_version, k, query)),
+        )
+
+    def put_results(
+        self, query: str, k: int, index_version: str, chunk_ids: list[int]
+    ) -> None:
+        self._put(self.results, (index_version, k, query), list(chunk_ids))
+
+    def _get(self, entries: OrderedDict, key):
+        value = entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _put(self, entries: OrderedDict, key, value) -> None:
+        if self.max_entries < 1:
+            return
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        self._dirty = True
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        # Written to a sibling directory and swapped in, so a concurrent
+        # reader sees either the old cache or the new one.
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+        queries = list(self.vectors)
+        if queries:
+            np.save(
+                tmp_path / "vectors.npy",
+                np.stack([self.vectors[query] for query in queries]),
+            )
+        with open(tmp_path / "cache.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "key": self.key,
+                    "search_key": self.search_key,
+                    "queries": queries,
+                    "results": [
+                        [index_version, k, query, chunk_ids]
+                        for (index_version, k, query), chunk_ids in (
+                            self.results.items()
+                        )
+                    ],
+                },
+                f,
+                ensure_ascii=False,
+            )
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def _load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path / "cache.json", encoding="utf-8") as f:
+                data = json.load(f)
+            if (
+                not isinstance(data, dict)
+                or data.get("version") != self.version
+                or data.get("key") != self.key
+            ):
+                return
+            queries = list(data["queries"])
+            vectors = (
+                np.load(self.path / "vectors.npy")
+                if queries
+                else np.zeros((0, 0), dtype="float32")
+            )
+            if len(vectors) != len(queries):
+                return
+            results = (
+                [
+                    ((str(version), int(k), str(query)), list(chunk_ids))
+                    for version, k, query, chunk_ids in data["results"]
+                ]
+                if data.get("search_key") == self.search_key
+                else []
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        limit = self.max_entries
+        self.vectors = OrderedDict(
+            list(zip(queries, vectors, strict=True))[-limit:] if limit else []
+        )
+        self.results = OrderedDict(results[-limit:] if limit else [])
@@ -0,0 +1,98 @@
+import json
+import re
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+
+class SymbolTable:
+    version = 1
+    # Leading query keywords and the symbol kind they restrict to.
+    keywords = {
+        "class": "class",
+        "struct": "class",
+        "interface": "class",
+        "trait": "class",
+        "enum": "class",
+        "type": "class",
+        "def": "function",
+        "function": "function",
+        "func": "function",
+        "fn": "function",
+        "fun": "function",
+        "method": "function",
+    }
+    _IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*(?:(?:\.|::)[A-Za-z_$][\w$]*)*")
+
+    def __init__(self) -> None:
+        # name -> [[chunk_id, kind, line], ...]
+        self.entries: dict[str, list[list]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(hits) for hits in self.entries.values())
+
+    def add(
+        self, chunk_id: int, symbols: Iterable[tuple[str, str, int]]
+    ) -> None:
+        for name, kind, line in symbols:
+            self.entries.setdefault(name, []).append([chunk_id, kind, line])
+
+    def lookup(self, name: str, kind: str | None = None) -> list[int]:
+        hits = self.entries.get(name, ())
+        return list(
+            dict.fromkeys(
+                chunk_id
+                for chunk_id, hit_kind, _ in hits
+                if kind is None or hit_kind == kind
+            )
+        )
+
+    @classmethod
+    def parse_query(cls, query: str) -> tuple[str, str | None] | None:
+        # "class Foo ...", "def foo", "function bar" and a bare (possibly
+        # dotted) identifier are symbol lookups; anything else is not.
+        words = query.split()
+        if not words:
+            return None
+        kind = cls.keywords.get(words[0].lower())
+        if kind is not None and len(words) > 1:
+            target = words[1]
+        elif len(words) == 1:
+            target, kind = words[0], None
+        else:
+            return None
+        match = cls._IDENTIFIER.match(target)
+        if match is None or target[match.end() :].strip("()[]{}<>:;,"):
+            return None
+        return re.split(r"\.|::", match.group())[-1], kind
+
+    def compact(self, is_alive: Callable[[int], bool]) -> None:
+        for name in list(self.entries):
+            hits = [hit for hit in self.entries[name] if is_alive(hit[0])]
+            if hits:
+                self.entries[name] = hits
+            else:
+                del self.entries[name]
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": self.version, "symbols": self.entries},
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "SymbolTable | None":
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != cls.version:
+            return None
+        table = cls()
+        table.entries = data.get("symbols") or {}
+        return table
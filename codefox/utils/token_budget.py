@@ -0,0 +1,126 @@
+import math
+from collections.abc import Sequence
+from typing import Any
+
+
+class TokenCounter:
+    # Characters per token of source code when tiktoken is not installed;
+    # kept on the low side so estimates err towards too many tokens.
+    chars_per_token = 3.2
+    default_encoding = "o200k_base"
+
+    def __init__(self, model: str = "") -> None:
+        self.model = model
+        self._encoding = self._load_encoding(model)
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    @classmethod
+    def _load_encoding(cls, model: str) -> Any:
+        # OpenAI models get their own encoding; for other providers it is
+        # a close estimate, which the budget's safety margin absorbs.
+        try:
+            import tiktoken
+        except ImportError:
+            return None
+        try:
+            return tiktoken.encoding_for_model(model.rsplit("/", 1)[-1])
+        except KeyError:
+            pass
+        try:
+            return tiktoken.get_encoding(cls.default_encoding)
+        except Exception:
+            return None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.count(text) <= max_tokens:
+            return text
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return str(self._encoding.decode(tokens[: max(max_tokens, 0)]))
+        return text[: int(max(max_tokens, 0) * self.chars_per_token)]
+
+
+class TokenBudget:
+    default_completion_tokens = 4096
+    default_diff_share = 0.6
+    safety_margin = 0.9
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        context_window: int,
+        completion_tokens: int | None = None,
+        diff_share: float = default_diff_share,
+    ) -> None:
+        self.counter = counter
+        self.context_window = context_window
+        self.completion_tokens = (
+            self.default_completion_tokens
+            if completion_tokens is None
+            else completion_tokens
+        )
+        self.diff_share = diff_share
+
+    def split(
+        self, fixed_text: str, diff_text: str, with_rag: bool = True
+    ) -> tuple[int, int]:
+        # Returns ``(diff_tokens, rag_tokens)``. What is left after the
+        # fixed prompt text and the completion reserve goes to the diff
+        # first, up to ``diff_share``; RAG gets the rest, including any
+        # part of that share the diff does not need.
+        available = max(
+            int(self.context_window * self.safety_margin)
+            - self.completion_tokens
+            - self.counter.count(fixed_text),
+            0,
+        )
+        share = self.diff_share if with_rag else 1.0
+        diff_tokens = min(
+            self.counter.count(diff_text), int(available * share)
+        )
+        return diff_tokens, available - diff_tokens if with_rag else 0
+
+
+def pack(
+    costs: Sequence[int],
+    values: Sequence[float],
+    capacity: int,
+    resolution: int = 1024,
+) -> list[int]:
+    # 0/1 knapsack over item indices. Costs are rounded up to units of
+    # ``capacity / resolution`` so the table stays small for large
+    # budgets, and every returned selection still fits.
+    import numpy as np
+
+    if capacity <= 0 or not costs:
+        return []
+    unit = max(1, math.ceil(capacity / resolution))
+    slots = capacity // unit
+    weights = [math.ceil(cost / unit) for cost in costs]
+    best = np.zeros(slots + 1)
+    taken = np.zeros((len(weights), slots + 1), dtype=bool)
+    for i, (weight, value) in enumerate(zip(weights, values, strict=True)):
+        if weight > slots or value <= 0:
+            continue
+        candidate = best[: slots + 1 - weight] + value
+        better = candidate > best[weight:]
+        taken[i, weight:] = better
+        best[weight:] = np.where(better, candidate, best[weight:])
+
+    chosen: list[int] = []
+    slot = slots
+    for i in range(len(weights) - 1, -1, -1):
+        if taken[i, slot]:
+            chosen.append(i)
+            slot -= weights[i]
+    return chosen[::-1]
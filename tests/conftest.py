@@ -39,3 +39,45 @@ def tmp_codefoxignore(tmp_path: Path) -> Path:
     p = tmp_path / ".codefoxignore"
     p.write_text("node_modules/\nvendor/\n# comment\n", encoding="utf-8")
     return p
+
+
+class FakeEmbedding:
+    """Deterministic bag-of-words embedder standing in for TextEmbedding."""
+
+    dim = 64
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.calls = 0
+
+    def embed(self, texts):
+        import re
+        import zlib
+
+        import numpy as np
+
+        for text in texts:
+            self.calls += 1
+            vec = np.full(self.dim, 1e-3, dtype="float32")
+            for word in re.findall(r"\w+", text.lower()):
+                vec[zlib.crc32(word.encode()) % self.dim] += 1.0
+            yield vec / np.linalg.norm(vec)
+
+
+@pytest.fixture
+def make_rag(tmp_path: Path):
+    """Build LocalRAG instances over a temp repo with a fake embedder."""
+    from unittest.mock import patch
+
+    from codefox.utils.local_rag import LocalRAG
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+
+    def factory(**kwargs) -> LocalRAG:
+        kwargs.setdefault("index_dir", str(tmp_path / "index"))
+        kwargs.setdefault("vector_cache_dir", str(tmp_path / "vectors"))
+        with patch("fastembed.TextEmbedding", FakeEmbedding):
+            return LocalRAG("fake/model", str(repo), **kwargs)
+
+    factory.repo = repo  # type: ignore[attr-defined]
+    return factory
@@ -104,3 +104,38 @@ def test_timeout_default_and_validation() -> None:
                     "review": {},
                 }
             )
+
+
+def test_rag_retrieval_defaults_to_hunks_and_is_validated() -> None:
+    with patch("codefox.api.gemini.genai.Client"):
+        g = Gemini(config={"model": {"name": "x"}, "review": {}})
+        assert g.model_config["rag_retrieval"] == "hunks"
+        with pytest.raises(ValueError, match="rag_retrieval"):
+            Gemini(
+                config={
+                    "model": {"name": "x", "rag_retrieval": "files"},
+                    "review": {},
+                }
+            )
+
+
+def test_context_window_shares_one_token_budget(
+    sample_config: dict,
+) -> None:
+    with patch("codefox.api.gemini.genai.Client"):
+        with pytest.raises(ValueError, match="context_window"):
+            Gemini(
+                config={
+                    "model": {"name": "x", "context_window": -1},
+                    "review": {},
+                }
+            )
+        sample_config["model"].update(context_window=8000, max_tokens=1000)
+        g = Gemini(config=sample_config)
+    assert g.token_budget is not None
+    counter = g.token_budget.counter
+    diff_text, rag_context = g.build_context("+ line\n" * 20_000)
+
+    assert rag_context == ""
+    assert diff_text.endswith(g.diff_truncated_notice)
+    assert counter.count(diff_text) <= 8000 * 0.9 - 1000
@@ -0,0 +1,89 @@
+"""Tests for the binary chunk store."""
+
+from pathlib import Path
+
+from codefox.utils.chunk_store import ChunkStore
+from codefox.utils.parser import Chunk
+
+
+def _chunk(text: str, start: int = 0, line: int = 1) -> Chunk:
+    end = start + len(text.encode("utf-8"))
+    return Chunk(text, start, end, line, line + text.count("\n"), "python")
+
+
+def test_append_and_read_back() -> None:
+    store = ChunkStore()
+    assert store.append("a.py", _chunk("def a(): pass")) == 0
+    assert store.append("b.py", _chunk("def b(): pass")) == 1
+    assert store.append("a.py", _chunk("def aa():\n  pass", 14, 2)) == 2
+
+    assert len(store) == 3
+    assert store.paths == ["a.py", "b.py"]
+    assert store.path(2) == "a.py"
+    assert store.lines(2) == (2, 3)
+    assert store.language(2) == "python"
+    assert store.texts(1) == ["def b(): pass", "def aa():\n  pass"]
+
+
+def test_save_load_roundtrip_keeps_ids_and_unicode(tmp_path: Path) -> None:
+    store = ChunkStore()
+    store.append("a.py", _chunk("print('héllo')"))
+    store.append("b.py", _chunk("x = '✓'", 20, 4))
+    store.save(tmp_path / "chunks")
+
+    loaded = ChunkStore.load(tmp_path / "chunks")
+    assert loaded is not None
+    assert len(loaded) == 2
+    assert loaded.text(0) == "print('héllo')"
+    assert loaded.text(1) == "x = '✓'"
+    assert loaded.path(1) == "b.py"
+    assert loaded.lines(1) == (4, 4)
+    assert (tmp_path / "chunks" / "text.bin").stat().st_size == len(
+        "print('héllo')x = '✓'".encode()
+    )
+
+
+def test_remove_keeps_ids_and_drops_text_on_save(tmp_path: Path) -> None:
+    store = ChunkStore()
+    for i in range(3):
+        store.append(f"{i}.py", _chunk(f"chunk {i}"))
+    store.save(tmp_path / "chunks")
+
+    store.remove(1)
+    store.append("3.py", _chunk("chunk 3"))
+    store.remove(3)
+    assert store.alive_count == 2
+    assert not store.is_alive(1)
+    assert store.path(1) == ""
+    assert list(store.iter_texts()) == ["chunk 0", "", "chunk 2", ""]
+
+    store.save(tmp_path / "chunks")
+    loaded = ChunkStore.load(tmp_path / "chunks")
+    assert loaded is not None
+    assert len(loaded) == 4
+    assert loaded.text(2) == "chunk 2"
+    assert not loaded.is_alive(3)
+    assert (tmp_path / "chunks" / "text.bin").read_bytes() == b"chunk 0chunk 2"
+
+
+def test_text_is_read_from_source_without_blob(tmp_path: Path) -> None:
+    source = tmp_path / "mod.py"
+    source.write_text("x = 'é'\ndef f():\n    pass\n", encoding="utf-8")
+    start = len("x = 'é'\n".encode())
+    store = ChunkStore(store_text=False)
+    store.append(str(source), _chunk("def f():\n    pass", start, 2))
+    store.save(tmp_path / "chunks")
+
+    assert not (tmp_path / "chunks" / "text.bin").exists()
+    loaded = ChunkStore.load(tmp_path / "chunks")
+    assert loaded is not None
+    assert loaded.text(0) == "def f():\n    pass"
+
+
+def test_load_missing_or_other_version_returns_none(tmp_path: Path) -> None:
+    assert ChunkStore.load(tmp_path / "missing") is None
+    ChunkStore().save(tmp_path / "chunks")
+    (tmp_path / "chunks" / "tables.json").write_text(
+        '{"version": 0, "paths": []}', encoding="utf-8"
+    )
+    assert ChunkStore.load(tmp_path / "chunks") is None
@@ -57,7 +57,7 @@ def test_run_unknown_command_prints_help() -> None:
 
 def test_init_does_not_require_codefoxenv() -> None:
     manager = CLIManager(command="init", args={})
-    with patch("codefox.cli_manager.Init") as mock_init:
+    with patch("codefox.cli.init.Init") as mock_init:
         mock_init.return_value.execute.return_value = None
         manager.run()
         mock_init.return_value.execute.assert_called_once()
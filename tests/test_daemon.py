@@ -0,0 +1,104 @@
+"""Tests for the review daemon and its socket client."""
+
+import os
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from codefox.api.base_api import Response
+from codefox.utils.daemon import DaemonClient, DaemonServer, DaemonSession
+
+
+@pytest.fixture
+def server(tmp_path: Path) -> Iterator[DaemonServer]:
+    daemon = DaemonServer(tmp_path / "d.sock")
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    assert daemon.ready.wait(5)
+    yield daemon
+    DaemonClient(daemon.socket_path).request({"command": "stop"})
+    thread.join(5)
+
+
+def test_client_reports_no_daemon(tmp_path: Path) -> None:
+    assert DaemonClient(tmp_path / "missing.sock").request({}) is None
+    stale = tmp_path / "stale.sock"
+    stale.touch()
+    assert DaemonClient(stale).connect() is None
+
+
+def test_status_and_stop(server: DaemonServer) -> None:
+    client = DaemonClient(server.socket_path)
+    status = client.request({"command": "status"})
+    assert status is not None and status["ok"]
+    assert status["rss"] > 0 and status["repos"] == []
+    assert client.request({"command": "nope"}) == {
+        "ok": False,
+        "error": "Unknown command: nope",
+    }
+
+    with pytest.raises(RuntimeError, match="already listening"):
+        DaemonServer(server.socket_path).serve_forever()
+
+    assert client.request({"command": "stop"}) == {"ok": True}
+
+
+def test_scan_reuses_session_and_captures_output(
+    server: DaemonServer, tmp_path: Path
+) -> None:
+    scan = MagicMock()
+    scan.prepare.side_effect = lambda: print("indexing") or "diff"
+    scan.model.execute.return_value = Response(text="looks good")
+    scan.model.model_config = {"name": "m"}
+    scan.model.rag = None
+    session = DaemonSession("key", scan)
+    server._session = MagicMock(return_value=session)  # type: ignore
+
+    client = DaemonClient(server.socket_path)
+    request = {"command": "scan", "cwd": str(tmp_path), "args": {}}
+    for _ in range(2):
+        response = client.request(request)
+        assert response == {
+            "ok": True,
+            "text": "looks good",
+            "output": "indexing\n",
+        }
+
+    scan.model.execute.assert_called_with("diff")
+    assert session.scans == 2
+    server.sessions[str(tmp_path)] = session
+    status = client.request({"command": "status"})
+    assert status is not None
+    assert status["repos"][0]["path"] == str(tmp_path)
+
+    scan.prepare.side_effect = RuntimeError("boom")
+    response = client.request(request)
+    assert response is not None and response["error"] == "boom"
+    assert str(tmp_path) not in server.sessions
+
+
+def test_session_scopes_client_env_to_provider_construction(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("CODEFOX_API_KEY", raising=False)
+    (tmp_path / ".codefox.yml").write_text("provider: ollama\n", "utf-8")
+    seen: list[tuple[str | None, str | None]] = []
+
+    def fake_scan(api_class: type, args: dict) -> MagicMock:
+        seen.append(
+            (os.environ.get("CODEFOX_API_KEY"), os.environ.get("INJECTED"))
+        )
+        return MagicMock()
+
+    daemon = DaemonServer(tmp_path / "d.sock")
+    with patch("codefox.cli.scan.Scan", side_effect=fake_scan) as scan:
+        scan.forwarded_env = ("CODEFOX_API_KEY",)
+        env = {"CODEFOX_API_KEY": "secret", "INJECTED": "1"}
+        daemon._session(str(tmp_path), env)
+        assert "CODEFOX_API_KEY" not in os.environ
+        daemon._session(str(tmp_path / "other"), {})
+    assert seen == [("secret", None), (None, None)]
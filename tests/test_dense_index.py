@@ -0,0 +1,101 @@
+"""Tests for the memory-mapped NumPy dense index."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from codefox.utils.dense_index import (
+    NumpyIndex,
+    estimate_recall,
+    quantize,
+    vector_bytes,
+)
+
+
+def _vectors() -> np.ndarray:
+    return np.array(
+        [[1.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.7, 0.7, 0.0], [0.0, 0.0, 3.0]],
+        dtype="float32",
+    )
+
+
+def test_search_ranks_by_cosine_similarity(tmp_path: Path) -> None:
+    index = NumpyIndex(tmp_path / "vectors")
+    index.add(0, _vectors()[:2], [0, 0])
+    index.add(2, _vectors()[2:], [1, 1])
+    assert index.count() == 4
+    assert index.search(np.array([1.0, 0.1, 0.0]), 2) == [0, 2]
+    assert index.search(np.array([0.0, 0.0, 1.0]), 10)[0] == 3
+
+
+def test_search_many_matches_single_searches(tmp_path: Path) -> None:
+    index = NumpyIndex(tmp_path / "vectors", quantization="int8")
+    index.add(0, _vectors(), [0] * 4)
+    index.delete([2])
+    queries = np.array([[1.0, 0.1, 0.0], [0.0, 0.0, 1.0], [0.5, 0.5, 0.1]])
+    expected = [index.search(query, 3) for query in queries]
+
+    assert index.search_many(queries, 3) == expected
+    with patch.object(NumpyIndex, "max_score_cells", 4):
+        assert index.search_many(queries, 3) == expected
+
+
+def test_add_out_of_order_raises(tmp_path: Path) -> None:
+    index = NumpyIndex(tmp_path / "vectors")
+    with pytest.raises(ValueError, match="in order"):
+        index.add(1, _vectors(), [0] * 4)
+
+
+def test_deleted_rows_are_skipped_and_persisted(tmp_path: Path) -> None:
+    index = NumpyIndex(tmp_path / "vectors")
+    index.add(0, _vectors(), [0] * 4)
+    index.delete([0])
+    index.save()
+    assert isinstance(index._vectors, np.memmap)
+
+    loaded = NumpyIndex(tmp_path / "vectors")
+    assert loaded.open()
+    assert loaded.count() == 4
+    assert 0 not in loaded.search(np.array([1.0, 0.0, 0.0]), 4)
+    loaded.add(4, np.array([[1.0, 0.0, 0.0]], dtype="float32"), [2])
+    assert loaded.search(np.array([1.0, 0.0, 0.0]), 1) == [4]
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_quantized_roundtrip_and_mismatch(
+    tmp_path: Path, quantization: str
+) -> None:
+    index = NumpyIndex(tmp_path / "vectors", quantization=quantization)
+    index.add(0, _vectors(), [0] * 4)
+    assert index.search(np.array([0.0, 1.0, 0.0]), 1) == [1]
+    index.save()
+    assert index.search(np.array([0.0, 1.0, 0.0]), 1) == [1]
+    assert index.search(np.array([0.0, 0.0, 1.0]), 1) == [3]
+    assert not NumpyIndex(tmp_path / "vectors").open()
+
+
+def test_binary_quantization_is_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="binary"):
+        NumpyIndex(tmp_path / "vectors", quantization="binary")
+
+
+def test_quantize_int8_keeps_per_row_scale() -> None:
+    rows, scales = quantize(np.array([[0.5, -0.25], [0.0, 0.0]]), "int8")
+    assert rows.dtype == np.int8
+    assert rows[0].tolist() == [127, -64]
+    np.testing.assert_allclose(rows[0] * scales[0], [0.5, -0.25], atol=0.01)
+    assert scales[1] == 1.0
+
+
+def test_estimate_recall_drops_with_coarser_storage() -> None:
+    sample = np.random.default_rng(0).normal(size=(200, 64))
+    assert estimate_recall(sample, "none") == 1.0
+    assert estimate_recall(sample, "int8") > 0.9
+    assert estimate_recall(sample, "int8") <= estimate_recall(
+        sample, "float16"
+    )
+    assert estimate_recall(sample, "none", dimensions=16) < 1.0
+    assert vector_bytes(64, "int8") == 68
+    assert vector_bytes(64, "float16") == 128
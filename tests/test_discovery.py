@@ -0,0 +1,127 @@
+"""Tests for gitignore matching and file discovery."""
+
+import shutil
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from codefox.utils.discovery import Discovery, FileFilter, IgnoreMatcher
+
+
+def _write(root: Path, rel: str, text: str = "x = 1\n") -> None:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def _rel(root: Path, files: list[str]) -> list[str]:
+    return sorted(Path(f).relative_to(root).as_posix() for f in files)
+
+
+def test_ignore_matcher_follows_gitignore_semantics() -> None:
+    matcher = IgnoreMatcher()
+    matcher.add_patterns(
+        [
+            "# comment",
+            "*.log",
+            "!keep.log",
+            "/build",
+            "cache/",
+            "docs/**/*.tmp",
+            "\\#literal",
+        ]
+    )
+    assert matcher.is_ignored("a/b/debug.log")
+    assert not matcher.is_ignored("a/keep.log")
+    assert matcher.is_ignored("build/out.py")
+    assert not matcher.is_ignored("src/build/out.py")
+    assert matcher.is_ignored("src/cache/x.py")
+    assert not matcher.is_ignored("src/cache")
+    assert matcher.is_ignored("docs/a/b/c.tmp")
+    assert matcher.is_ignored("docs/c.tmp")
+    assert matcher.is_ignored("#literal")
+
+
+def test_ignored_directory_cannot_be_reincluded() -> None:
+    matcher = IgnoreMatcher()
+    matcher.add_patterns(["vendor/", "!vendor/keep.py"])
+    assert matcher.is_ignored("vendor/keep.py")
+
+
+def test_walker_prunes_ignored_directories(tmp_path: Path) -> None:
+    _write(tmp_path, "a.py")
+    _write(tmp_path, "pkg/node_modules/dep/index.js")
+    _write(tmp_path, "pkg/src/b.py")
+    _write(tmp_path, "pkg/src/gen.py")
+    _write(tmp_path, "pkg/.gitignore", "src/gen.py\n")
+    _write(tmp_path, "dist/bundle.js")
+    _write(tmp_path, ".gitignore", "dist/\n")
+    _write(tmp_path, ".codefoxignore", "*.js\n")
+    _write(tmp_path, "web/app.js")
+
+    with patch.object(Discovery, "_git_ls_files", return_value=None):
+        files = Discovery.list_files(str(tmp_path))
+    assert _rel(tmp_path, files) == ["a.py", "pkg/src/b.py"]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_git_listing_includes_untracked_and_honours_ignores(
+    tmp_path: Path,
+) -> None:
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    _write(tmp_path, "tracked.py")
+    _write(tmp_path, "sub/untracked.py")
+    _write(tmp_path, "sub/.gitignore", "*.gen.py\n")
+    _write(tmp_path, "sub/x.gen.py")
+    _write(tmp_path, "vendor/lib.py")
+    _write(tmp_path, ".codefoxignore", "vendor/\n")
+    _write(tmp_path, "deleted.py")
+    subprocess.run(
+        ["git", "-C", str(tmp_path), "add", "tracked.py", "deleted.py"],
+        check=True,
+    )
+    (tmp_path / "deleted.py").unlink()
+
+    files = Discovery.list_files(str(tmp_path))
+    assert _rel(tmp_path, files) == ["sub/untracked.py", "tracked.py"]
+
+
+def test_file_filter_skips_and_reports_by_reason(tmp_path: Path) -> None:
+    noise = "".join(chr(33 + i * 7 % 90) for i in range(4000))
+    _write(tmp_path, "small.py", "def f():\n    return 1\n")
+    _write(tmp_path, "normal.py", "def g(x):\n    return x + 1\n" * 200)
+    _write(tmp_path, "huge.py", "x = 1\n" * 5000)
+    _write(tmp_path, "app.min.js", "var a=1;")
+    _write(tmp_path, "bundle.js", "var a=1;" * 1000)
+    _write(tmp_path, "pb2.py", "# @generated by protoc\n" + "x = 1\n" * 500)
+    _write(tmp_path, "package-lock.json", "{}")
+    _write(
+        tmp_path,
+        "blob.py",
+        "\n".join(noise[i : i + 80] for i in range(0, 4000, 80)),
+    )
+
+    file_filter = FileFilter(max_file_size=20_000)
+    with patch.object(Discovery, "_git_ls_files", return_value=None):
+        files = Discovery.list_files(str(tmp_path), file_filter)
+
+    assert _rel(tmp_path, files) == ["normal.py", "small.py"]
+    assert file_filter.skipped == {
+        "size": [1, 30_000],
+        "minified": [2, 8008],
+        "generated": [1, 3023],
+        "lockfile": [1, 2],
+        "entropy": [1, 4049],
+    }
+    assert file_filter.skipped_files == 6
+    assert "Skipped 6 files" in file_filter.summary()
+
+
+def test_file_filter_content_heuristics() -> None:
+    file_filter = FileFilter(max_file_size=None)
+    assert FileFilter.entropy(b"aaaa") == 0.0
+    assert FileFilter.entropy(bytes(range(256))) == 8.0
+    assert not FileFilter(max_file_size=None, skip_generated=False)
+    assert file_filter
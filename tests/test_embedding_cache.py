@@ -0,0 +1,47 @@
+"""Tests for the content-addressed embedding cache."""
+
+from pathlib import Path
+
+import numpy as np
+
+from codefox.utils.embedding_cache import EmbeddingCache
+
+
+def test_put_and_get_roundtrip(tmp_path: Path) -> None:
+    cache = EmbeddingCache(tmp_path, "org/model")
+    vectors = np.arange(6, dtype="float32").reshape(2, 3)
+    cache.put_many(["a", "b"], vectors)
+
+    hits = cache.get_many(["b", "missing", "a"])
+    assert hits[1] is None
+    np.testing.assert_array_equal(hits[0], vectors[1])
+    np.testing.assert_array_equal(hits[2], vectors[0])
+
+
+def test_cache_persists_across_instances(tmp_path: Path) -> None:
+    EmbeddingCache(tmp_path, "org/model").put_many(
+        ["a"], np.ones((1, 4), dtype="float32")
+    )
+    EmbeddingCache(tmp_path, "org/model").put_many(
+        ["b"], np.zeros((1, 4), dtype="float32")
+    )
+
+    cache = EmbeddingCache(tmp_path, "org/model")
+    assert len(cache) == 2
+    a, b = cache.get_many(["a", "b"])
+    assert a is not None and a.sum() == 4
+    assert b is not None and b.sum() == 0
+
+
+def test_cache_is_per_model(tmp_path: Path) -> None:
+    EmbeddingCache(tmp_path, "org/model").put_many(
+        ["a"], np.ones((1, 4), dtype="float32")
+    )
+    assert EmbeddingCache(tmp_path, "org/other").get_many(["a"]) == [None]
+
+
+def test_mismatched_dimension_is_not_cached(tmp_path: Path) -> None:
+    cache = EmbeddingCache(tmp_path, "org/model")
+    cache.put_many(["a"], np.ones((1, 4), dtype="float32"))
+    cache.put_many(["b"], np.ones((1, 8), dtype="float32"))
+    assert cache.get_many(["b"]) == [None]
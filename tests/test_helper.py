@@ -30,7 +30,8 @@ def test_read_codefoxignore_missing_returns_empty(tmp_path: Path) -> None:
     prev = os.getcwd()
     try:
         os.chdir(tmp_path)
-        out = Helper.read_codefoxignore()
+        with pytest.warns(DeprecationWarning):
+            out = Helper.read_codefoxignore()
         assert out == []
     finally:
         os.chdir(prev)
@@ -44,10 +45,9 @@ def test_read_codefoxignore_with_file(tmp_path: Path) -> None:
     prev = os.getcwd()
     try:
         os.chdir(tmp_path)
-        out = Helper.read_codefoxignore()
-        assert "node_modules/" in out
-        assert "vendor/" in out
-        assert "# comment" not in out
+        with pytest.warns(DeprecationWarning):
+            out = Helper.read_codefoxignore()
+        assert out == ["node_modules/", "vendor/"]
     finally:
         os.chdir(prev)
 
@@ -114,13 +114,10 @@ def test_parse_diff_for_rag_respects_max_tokens() -> None:
     assert len(parts) <= 5 or "a.py" in out
 
 
-# --- chunk_text_sentences (require nltk punkt) ---
+# --- chunk_text_sentences (built-in splitter, no nltk data) ---
 
 
 def test_chunk_text_sentences_splits_by_size() -> None:
-    import nltk
-
-    nltk.download("punkt_tab", quiet=True)
     text = "First sentence. Second sentence. Third sentence. Fourth one."
     chunks = Helper.chunk_text_sentences(text, chunk_size=30, overlap=5)
     assert len(chunks) >= 1
@@ -130,9 +127,6 @@ def test_chunk_text_sentences_splits_by_size() -> None:
 
 
 def test_chunk_text_sentences_single_short() -> None:
-    import nltk
-
-    nltk.download("punkt_tab", quiet=True)
     text = "One short sentence."
     chunks = Helper.chunk_text_sentences(text, chunk_size=100, overlap=0)
     assert len(chunks) == 1
@@ -156,9 +150,6 @@ def test_get_ts_parser_by_extension_unknown_returns_none() -> None:
 
 
 def test_smart_chunk_fallback_to_sentences() -> None:
-    import nltk
-
-    nltk.download("punkt_tab", quiet=True)
     path = Path("readme.txt")
     content = "First sentence here. Second sentence there. Third."
     chunks = Helper.smart_chunk(path, content, chunk_size=25, overlap=5)
@@ -0,0 +1,64 @@
+"""Import-time regression checks for CLI startup."""
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = (
+    "bm25s",
+    "fastembed",
+    "git",
+    "github",
+    "google.genai",
+    "nltk",
+    "ollama",
+    "openai",
+    "pygments.lexers",
+    "qdrant_client",
+    "tree_sitter_language_pack",
+)
+IMPORT_BUDGET_US = 1_000_000
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["codefox.main", "codefox.cli.clean", "codefox.cli.list"],
+)
+def test_cli_modules_do_not_import_heavy_dependencies(module: str) -> None:
+    result = _run(
+        f"import sys, {module}\n"
+        f"print('\\n'.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert result.stdout.split() == []
+
+
+def test_cli_entrypoint_import_time_budget() -> None:
+    result = _run("import codefox.main", "-X", "importtime")
+    cumulative = {
+        fields[2].strip(): int(fields[1])
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+        and len(fields := line[len("import time:") :].split("|")) == 3
+        and fields[1].strip().isdigit()
+    }
+    assert cumulative["codefox.main"] < IMPORT_BUDGET_US
+
+
+def test_text_chunking_does_not_import_nltk() -> None:
+    result = _run(
+        "import sys\n"
+        "from codefox.utils.parser import Parser\n"
+        "Parser.chunk_text_spans('One. Two.', 4, 0, language='markdown')\n"
+        "print('nltk' in sys.modules)"
+    )
+    assert result.stdout.strip() == "False"
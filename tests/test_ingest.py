@@ -0,0 +1,85 @@
+"""Tests for parallel file ingestion."""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from codefox.utils.ingest import Ingest, read_and_chunk
+from codefox.utils.manifest import Manifest
+
+
+def _write_files(tmp_path: Path, count: int) -> list[str]:
+    files = []
+    for i in range(count):
+        path = tmp_path / f"mod_{i}.py"
+        path.write_text(f"def func_{i}():\n    return {i}\n", "utf-8")
+        files.append(str(path))
+    return files
+
+
+def test_read_and_chunk_empty_and_missing(tmp_path: Path) -> None:
+    empty = tmp_path / "empty.py"
+    empty.write_text("  \n", encoding="utf-8")
+    assert read_and_chunk(str(empty), 300, 50) == (
+        str(empty),
+        [],
+        Manifest.file_hash(str(empty)),
+    )
+    missing = str(tmp_path / "missing.py")
+    assert read_and_chunk(missing, 300, 50) == (missing, None, None)
+
+
+def test_read_and_chunk_reads_bytes_and_mmaps_large_files(
+    tmp_path: Path,
+) -> None:
+    path = tmp_path / "mod.py"
+    content = "s = 'äöü'\n\ndef f():\n    return '✓'\n"
+    path.write_text(content, encoding="utf-8")
+    source = content.encode("utf-8")
+
+    for threshold in (1 << 20, 1):
+        with patch.object(Ingest, "mmap_min_bytes", threshold):
+            _, chunks, digest = read_and_chunk(str(path), 300, 50)
+        assert digest == Manifest.file_hash(str(path))
+        assert chunks is not None
+        assert [c.text for c in chunks] == ["def f():\n    return '✓'"]
+        chunk = chunks[0]
+        assert source[chunk.start_byte : chunk.end_byte].decode() == chunk.text
+        assert (chunk.start_line, chunk.end_line) == (3, 4)
+
+
+def test_iter_chunks_parallel_keeps_order(tmp_path: Path) -> None:
+    files = _write_files(tmp_path, Ingest.min_parallel_files + 8)
+    results = list(Ingest.iter_chunks(files, 300, 50, workers=2))
+    assert [file for file, _, _ in results] == files
+    assert Ingest._mp_context().get_start_method() != "fork"
+    for i, (_, chunks, _) in enumerate(results):
+        assert chunks is not None
+        assert [c.text for c in chunks] == [f"def func_{i}():\n    return {i}"]
+        assert (chunks[0].start_line, chunks[0].end_line) == (1, 2)
+
+
+def test_iter_chunks_stops_early(tmp_path: Path) -> None:
+    files = _write_files(tmp_path, Ingest.min_parallel_files + 8)
+    taken = []
+    for file, _, _ in Ingest.iter_chunks(files, 300, 50, workers=2):
+        taken.append(file)
+        if len(taken) == 3:
+            break
+    assert taken == files[:3]
+
+
+def test_iter_chunks_bounds_in_flight_tasks(tmp_path: Path) -> None:
+    files = _write_files(tmp_path, Ingest.min_parallel_files * 4)
+    with (
+        patch.object(Ingest, "files_per_task", 2),
+        patch(
+            "codefox.utils.ingest.ProcessPoolExecutor.submit",
+            autospec=True,
+            side_effect=ProcessPoolExecutor.submit,
+        ) as submit,
+    ):
+        results = Ingest.iter_chunks(files, 300, 50, workers=2)
+        next(results)
+        assert submit.call_count == 2 * Ingest.tasks_per_worker
+        results.close()
@@ -9,56 +9,51 @@ from codefox.utils.local_rag import LocalRAG
 
 
 def test_index_dir_uses_default() -> None:
-    with patch("codefox.utils.local_rag.TextEmbedding") as _:
+    with patch("fastembed.TextEmbedding") as _:
         with patch(
             "codefox.utils.local_rag.Helper.get_all_files", return_value=[]
         ):
-            with patch("codefox.utils.local_rag.nltk.download"):
-                rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
-                rag.kwargs = {"index_dir": LocalRAG.default_index_dir}
+            rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
+            rag.kwargs = {"index_dir": LocalRAG.default_index_dir}
     assert rag._index_dir() == Path(LocalRAG.default_index_dir)
 
 
 def test_index_dir_uses_custom_from_kwargs() -> None:
-    with patch("codefox.utils.local_rag.TextEmbedding") as _:
+    with patch("fastembed.TextEmbedding") as _:
         with patch(
             "codefox.utils.local_rag.Helper.get_all_files", return_value=[]
         ):
-            with patch("codefox.utils.local_rag.nltk.download"):
-                rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
-                rag.kwargs = {"index_dir": "/custom/rag"}
+            rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
+            rag.kwargs = {"index_dir": "/custom/rag"}
     assert rag._index_dir() == Path("/custom/rag")
 
 
 def test_qdrant_path_is_under_index_dir() -> None:
-    with patch("codefox.utils.local_rag.TextEmbedding") as _:
+    with patch("fastembed.TextEmbedding") as _:
         with patch(
             "codefox.utils.local_rag.Helper.get_all_files", return_value=[]
         ):
-            with patch("codefox.utils.local_rag.nltk.download"):
-                rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
-                rag.kwargs = {"index_dir": "/custom/rag"}
+            rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
+            rag.kwargs = {"index_dir": "/custom/rag"}
     assert rag._qdrant_path() == Path("/custom/rag") / "qdrant"
 
 
 def test_get_kwargs_language_not_string_raises() -> None:
-    with patch("codefox.utils.local_rag.TextEmbedding") as _:
+    with patch("fastembed.TextEmbedding") as _:
         with patch(
             "codefox.utils.local_rag.Helper.get_all_files", return_value=[]
         ):
-            with patch("codefox.utils.local_rag.nltk.download"):
-                rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
+            rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
     with pytest.raises(TypeError, match="language"):
         rag._get_kwargs(language=123)  # type: ignore[arg-type]
 
 
 def test_get_kwargs_rff_k_invalid_raises() -> None:
-    with patch("codefox.utils.local_rag.TextEmbedding") as _:
+    with patch("fastembed.TextEmbedding") as _:
         with patch(
             "codefox.utils.local_rag.Helper.get_all_files", return_value=[]
         ):
-            with patch("codefox.utils.local_rag.nltk.download"):
-                rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
+            rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
     with pytest.raises(ValueError, match="rff_k"):
         rag._get_kwargs(rff_k=0)
     with pytest.raises(ValueError, match="rff_k"):
@@ -66,12 +61,11 @@ def test_get_kwargs_rff_k_invalid_raises() -> None:
 
 
 def test_get_kwargs_chunk_overlap_ge_chunk_size_raises() -> None:
-    with patch("codefox.utils.local_rag.TextEmbedding") as _:
+    with patch("fastembed.TextEmbedding") as _:
         with patch(
             "codefox.utils.local_rag.Helper.get_all_files", return_value=[]
         ):
-            with patch("codefox.utils.local_rag.nltk.download"):
-                rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
+            rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
     with pytest.raises(ValueError, match="chunk_overlap"):
         rag._get_kwargs(chunk_size=100, chunk_overlap=100)
     with pytest.raises(ValueError, match="chunk_overlap"):
@@ -79,12 +73,11 @@ def test_get_kwargs_chunk_overlap_ge_chunk_size_raises() -> None:
 
 
 def test_get_kwargs_defaults() -> None:
-    with patch("codefox.utils.local_rag.TextEmbedding") as _:
+    with patch("fastembed.TextEmbedding") as _:
         with patch(
             "codefox.utils.local_rag.Helper.get_all_files", return_value=[]
         ):
-            with patch("codefox.utils.local_rag.nltk.download"):
-                rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
+            rag = LocalRAG("BAAI/bge-small-en-v1.5", "/tmp")
     kw = rag._get_kwargs()
     assert kw["language"] == "english"
     assert kw["rff_k"] == 60
@@ -94,9 +87,7 @@ def test_get_kwargs_defaults() -> None:
 
 
 def test_get_model_tag_returns_list() -> None:
-    with patch(
-        "codefox.utils.local_rag.TextEmbedding.list_supported_models"
-    ) as m:
+    with patch("fastembed.TextEmbedding.list_supported_models") as m:
         m.return_value = [
             {"model": "BAAI/bge-small-en-v1.5"},
             {"model": "other"},
@@ -105,3 +96,342 @@ def test_get_model_tag_returns_list() -> None:
     assert isinstance(tags, list)
     assert "BAAI/bge-small-en-v1.5" in tags
     assert "other" in tags
+
+
+def test_update_reembeds_only_changed_files(make_rag) -> None:
+    repo = make_rag.repo
+    (repo / "a.py").write_text("def alpha():\n    return 1\n", "utf-8")
+    (repo / "b.py").write_text("def beta():\n    return 2\n", "utf-8")
+    (repo / "c.py").write_text("def gamma():\n    return 3\n", "utf-8")
+    for i in range(4):
+        (repo / f"m{i}.py").write_text(f"def m{i}():\n    pass\n", "utf-8")
+
+    rag = make_rag()
+    rag.build()
+    rag.save_index()
+    rag.close()
+
+    (repo / "b.py").write_text("def beta_v2():\n    return 22\n", "utf-8")
+    (repo / "c.py").unlink()
+    (repo / "d.py").write_text("def delta():\n    return 4\n", "utf-8")
+
+    rag = make_rag()
+    assert rag.load_index()
+    assert rag.update()
+    assert rag.model.calls == 2
+
+    paths = {Path(c["path"]).name for c in rag.search("beta_v2 delta", k=5)}
+    assert "c.py" not in paths
+    assert {"b.py", "d.py"} <= paths
+    assert not rag.update()
+    rag.close()
+
+
+def test_load_index_reuses_persisted_bm25(make_rag) -> None:
+    repo = make_rag.repo
+    (repo / "a.py").write_text("def alpha():\n    return 1\n", "utf-8")
+    (repo / "b.py").write_text("def beta():\n    return 2\n", "utf-8")
+
+    rag = make_rag()
+    rag.build()
+    rag.save_index()
+    rag.close()
+    assert (rag._bm25_path() / "params.index.json").exists()
+
+    rag = make_rag()
+    with patch("bm25s.tokenize") as tokenize:
+        assert rag.load_index()
+    tokenize.assert_not_called()
+    hits = rag.search("beta", k=1)
+    assert Path(hits[0]["path"]).name == "b.py"
+    rag.close()
+
+
+def test_load_index_rebuilds_bm25_on_version_mismatch(make_rag) -> None:
+    (make_rag.repo / "a.py").write_text("def alpha():\n    pass\n", "utf-8")
+    rag = make_rag()
+    rag.build()
+    rag.save_index()
+    rag.close()
+
+    rag = make_rag()
+    rag.bm25_format_version = 0
+    assert rag.load_index()
+    assert rag._load_bm25(rag._bm25_meta())
+    rag.close()
+
+
+def test_build_streams_batches_and_counts_chunks(make_rag) -> None:
+    for i in range(10):
+        (make_rag.repo / f"m{i}.py").write_text(
+            f"def m{i}():\n    pass\n", "utf-8"
+        )
+    rag = make_rag(embed_batch_size=3, pipeline_depth=1, max_chunks=7)
+    rag.build()
+    assert len(rag.store) == 7
+    assert rag.dense.count() == 7
+    assert rag.retriever.scores["num_docs"] == 7
+    rag.close()
+
+
+def test_build_propagates_embedding_errors(make_rag) -> None:
+    for i in range(10):
+        (make_rag.repo / f"m{i}.py").write_text(
+            f"def m{i}():\n    pass\n", "utf-8"
+        )
+    rag = make_rag(embed_batch_size=2, pipeline_depth=1)
+    with patch.object(rag.model, "embed", side_effect=RuntimeError("boom")):
+        with pytest.raises(RuntimeError, match="boom"):
+            rag.build()
+    rag.close()
+
+
+def test_get_kwargs_pipeline_depth_invalid_raises(make_rag) -> None:
+    rag = make_rag()
+    with pytest.raises(ValueError, match="pipeline_depth"):
+        rag._get_kwargs(pipeline_depth=0)
+
+
+def test_rebuild_reuses_cached_embeddings(make_rag) -> None:
+    for i in range(3):
+        (make_rag.repo / f"m{i}.py").write_text(
+            f"def m{i}():\n    pass\n", "utf-8"
+        )
+    rag = make_rag()
+    rag.build()
+    assert rag.model.calls == 3
+    rag.close()
+
+    (make_rag.repo / "new.py").write_text("def fresh():\n    pass\n", "utf-8")
+    rag = make_rag()
+    rag.build()
+    assert rag.model.calls == 1
+    assert rag.dense.count() == 4
+    rag.close()
+
+
+def test_build_uploads_path_ids_as_payload(make_rag) -> None:
+    (make_rag.repo / "a.py").write_text("def a():\n    pass\n", "utf-8")
+    rag = make_rag()
+    rag.build()
+    points, _ = rag.dense.client.scroll(rag.collection_name, with_payload=True)
+    assert points
+    for point in points:
+        assert point.payload == {"path_id": rag.store.path_id(point.id)}
+    rag.close()
+
+
+def test_numpy_backend_builds_loads_and_updates(make_rag) -> None:
+    repo = make_rag.repo
+    (repo / "a.py").write_text("def alpha():\n    return 1\n", "utf-8")
+    for i in range(3):
+        (repo / f"m{i}.py").write_text(f"def m{i}():\n    pass\n", "utf-8")
+    rag = make_rag(backend="numpy")
+    rag.build()
+    rag.save_index()
+    assert (rag._vectors_path() / "vectors.npy").exists()
+    assert not rag._qdrant_path().exists()
+
+    (repo / "b.py").write_text("def beta():\n    return 2\n", "utf-8")
+    rag = make_rag(backend="numpy")
+    assert rag.load_index()
+    assert rag.update()
+    assert rag.dense.count() == 5
+    paths = [Path(c["path"]).name for c in rag.search("beta", k=2)]
+    assert paths[0] == "b.py"
+    assert not make_rag().load_index()
+
+
+def test_get_kwargs_backend_invalid_raises(make_rag) -> None:
+    rag = make_rag()
+    with pytest.raises(ValueError, match="backend"):
+        rag._get_kwargs(backend="faiss")
+
+
+def test_quantized_truncated_index_searches(make_rag) -> None:
+    repo = make_rag.repo
+    (repo / "a.py").write_text("def alpha():\n    return 1\n", "utf-8")
+    (repo / "b.py").write_text("def beta():\n    return 2\n", "utf-8")
+    rag = make_rag(backend="numpy", quantization="int8", dimensions=32)
+    rag.build()
+    rag.save_index()
+    rag.close()
+
+    rag = make_rag(backend="numpy", quantization="int8", dimensions=32)
+    assert rag.load_index()
+    paths = [Path(c["path"]).name for c in rag.search("beta", k=1)]
+    assert paths == ["b.py"]
+    rag.close()
+    assert not make_rag(backend="numpy", quantization="int8").load_index()
+
+
+def test_get_kwargs_quantization_invalid_raises(make_rag) -> None:
+    rag = make_rag()
+    with pytest.raises(ValueError, match="quantization"):
+        rag._get_kwargs(quantization="int4")
+    with pytest.raises(ValueError, match="quantization"):
+        rag._get_kwargs(backend="numpy", quantization="binary")
+    with pytest.raises(ValueError, match="numpy backend"):
+        rag._get_kwargs(backend="qdrant", quantization="int8")
+    with pytest.raises(ValueError, match="dimensions"):
+        rag._get_kwargs(dimensions=0)
+
+
+def test_symbol_lookups_skip_hybrid_search(make_rag) -> None:
+    repo = make_rag.repo
+    (repo / "a.py").write_text(
+        "class Alpha:\n    def run(self):\n        pass\n", "utf-8"
+    )
+    (repo / "b.py").write_text("def run():\n    return 2\n", "utf-8")
+    rag = make_rag()
+    rag.build()
+    rag.save_index()
+    rag.close()
+
+    (repo / "b.py").unlink()
+    rag = make_rag()
+    assert rag.load_index()
+    hits = rag.search("class Alpha", k=5)
+    assert [Path(c["path"]).name for c in hits] == ["a.py"]
+    assert len(rag.search("def run", k=5)) == 2
+    assert rag.model.calls == 0
+
+    assert rag.update()
+    assert [Path(c["path"]).name for c in rag.search("run", k=5)] == ["a.py"]
+    assert rag.model.calls == 0
+    rag.close()
+
+
+def test_search_caches_vectors_and_results(make_rag) -> None:
+    repo = make_rag.repo
+    (repo / "a.py").write_text("def alpha():\n    return 1\n", "utf-8")
+    (repo / "b.py").write_text("def beta():\n    return 2\n", "utf-8")
+    rag = make_rag(persist_query_cache=True)
+    rag.build()
+    rag.save_index()
+    calls = rag.model.calls
+
+    first = rag.search("beta   returns two", k=1)
+    assert rag.search("beta returns two", k=1) == first
+    assert rag.model.calls == calls + 1
+    assert not rag._query_cache_path().exists()
+    rag.close()
+    assert rag._query_cache_path().exists()
+
+    (repo / "c.py").write_text("def gamma():\n    return 3\n", "utf-8")
+    rag = make_rag(persist_query_cache=True)
+    assert rag.load_index()
+    assert rag.query_cache.get_results(
+        "beta returns two", 1, rag.index_version
+    )
+    assert rag.update()
+    assert rag.search("beta returns two", k=1) == first
+    assert rag.model.calls == 1
+    rag.close()
+
+
+@pytest.mark.parametrize("backend", ["qdrant", "numpy"])
+def test_search_many_embeds_queries_in_one_batch(make_rag, backend) -> None:
+    repo = make_rag.repo
+    (repo / "a.py").write_text("def alpha():\n    return 1\n", "utf-8")
+    (repo / "b.py").write_text("def beta():\n    return 2\n", "utf-8")
+    (repo / "c.py").write_text("def gamma():\n    return 3\n", "utf-8")
+    rag = make_rag(backend=backend, query_cache_size=0)
+    rag.build()
+    queries = ["alpha returns one", "gamma returns three", "def beta"]
+    expected = [rag.search(query, k=2) for query in queries]
+
+    with patch.object(rag.model, "embed", wraps=rag.model.embed) as embed:
+        assert rag.search_many(queries, k=2) == expected
+    embed.assert_called_once()
+    assert len(embed.call_args.args[0]) == 2
+    assert Path(expected[1][0]["path"]).name == "c.py"
+    rag.close()
+
+
+def test_update_tokenizes_only_new_chunks(make_rag) -> None:
+    from bm25s.tokenization import Tokenizer
+
+    repo = make_rag.repo
+    for name in ("alpha", "beta", "gamma", "delta"):
+        (repo / f"{name}.py").write_text(
+            f"def {name}():\n    return '{name}'\n", "utf-8"
+        )
+    rag = make_rag()
+    rag.build()
+    rag.save_index()
+    rag.close()
+
+    (repo / "gamma.py").unlink()
+    (repo / "omega.py").write_text("def omega():\n    pass\n", "utf-8")
+
+    rag = make_rag()
+    assert rag.load_index()
+    with patch.object(
+        Tokenizer, "tokenize", autospec=True, side_effect=Tokenizer.tokenize
+    ) as tokenize:
+        assert rag.update()
+    assert [call.args[1] for call in tokenize.call_args_list] == [
+        ["def omega():\n    pass"]
+    ]
+    assert rag.corpus_ids is not None
+    assert len(rag.corpus_ids) == len(rag.store)
+    assert rag.retriever.scores["num_docs"] == len(rag.store)
+    rag.save_index()
+    rag.close()
+
+    rag = make_rag()
+    assert rag.load_index()
+    paths = [Path(c["path"]).name for c in rag.search("omega gamma", k=2)]
+    assert paths[0] == "omega.py" and "gamma.py" not in paths
+    assert [] in rag._corpus_tokens()[1]
+    rag.close()
+
+
+def test_build_hashes_files_from_the_chunked_buffer(make_rag) -> None:
+    from codefox.utils.manifest import Manifest
+
+    path = make_rag.repo / "a.py"
+    path.write_text("def alpha():\n    return 1\n", "utf-8")
+    rag = make_rag()
+    with patch.object(Manifest, "file_hash", side_effect=AssertionError):
+        rag.build()
+    assert rag.manifest.entries[str(path)]["hash"] == Manifest.file_hash(
+        str(path)
+    )
+    rag.close()
+
+
+def test_update_settles_when_limits_skip_files(make_rag) -> None:
+    repo = make_rag.repo
+    for name in ("a", "b", "c", "d"):
+        (repo / f"{name}.py").write_text(f"def {name}():\n    pass\n", "utf-8")
+    rag = make_rag(max_files=2)
+    rag.build()
+    assert sorted(rag.manifest.entries) == sorted(rag.all_files)
+    version = rag.index_version
+    assert not rag.update()
+    assert rag.index_version == version
+    rag.close()
+
+
+def test_update_counts_only_live_chunks_against_max_chunks(make_rag) -> None:
+    repo = make_rag.repo
+    for name in ("a", "b", "c", "d"):
+        (repo / f"{name}.py").write_text(f"def {name}():\n    pass\n", "utf-8")
+    rag = make_rag(max_chunks=4)
+    rag.build()
+    for name in ("a", "b"):
+        (repo / f"{name}.py").write_text(
+            f"def {name}_v2():\n    pass\n", "utf-8"
+        )
+    assert rag.update()
+    assert rag.store.alive_count == 4
+    indexed = {
+        Path(path).name
+        for path, entry in rag.manifest.entries.items()
+        if entry["chunks"]
+    }
+    assert indexed == {"a.py", "b.py", "c.py", "d.py"}
+    assert not rag.update()
+    rag.close()
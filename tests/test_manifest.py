@@ -0,0 +1,96 @@
+"""Tests for the RAG file manifest."""
+
+import os
+from pathlib import Path
+
+from codefox.utils.manifest import Manifest
+
+
+def test_diff_detects_added_modified_removed(tmp_path: Path) -> None:
+    keep = tmp_path / "keep.py"
+    change = tmp_path / "change.py"
+    gone = tmp_path / "gone.py"
+    for p in (keep, change, gone):
+        p.write_text(f"# {p.name}\n", encoding="utf-8")
+
+    manifest = Manifest()
+    for i, p in enumerate((keep, change, gone)):
+        manifest.record(str(p), [i])
+
+    change.write_text("# changed content\n", encoding="utf-8")
+    gone.unlink()
+    new = tmp_path / "new.py"
+    new.write_text("# new\n", encoding="utf-8")
+
+    diff = manifest.diff([str(keep), str(change), str(new)])
+    assert diff.added == [str(new)]
+    assert diff.modified == [str(change)]
+    assert diff.removed == [str(gone)]
+    assert bool(diff)
+
+
+def test_diff_touched_file_is_not_a_change(tmp_path: Path) -> None:
+    path = tmp_path / "a.py"
+    path.write_text("x = 1\n", encoding="utf-8")
+    manifest = Manifest()
+    manifest.record(str(path), [0])
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+    diff = manifest.diff([str(path)])
+    assert not diff
+    assert diff.touched == [str(path)]
+    assert manifest.entries[str(path)]["mtime"] == os.stat(path).st_mtime_ns
+
+
+def test_save_and_load_roundtrip(tmp_path: Path) -> None:
+    path = tmp_path / "a.py"
+    path.write_text("x = 1\n", encoding="utf-8")
+    manifest = Manifest()
+    manifest.record(str(path), [3, 4])
+    manifest.save(tmp_path / "manifest.json")
+
+    loaded = Manifest.load(tmp_path / "manifest.json")
+    assert loaded is not None
+    assert loaded.chunk_ids(str(path)) == [3, 4]
+
+
+def test_load_rejects_other_version(tmp_path: Path) -> None:
+    (tmp_path / "manifest.json").write_text(
+        '{"version": 0, "files": {}}', encoding="utf-8"
+    )
+    assert Manifest.load(tmp_path / "manifest.json") is None
+    assert Manifest.load(tmp_path / "missing.json") is None
+
+
+def test_stale_checks_recorded_files_by_stat(tmp_path: Path) -> None:
+    keep = tmp_path / "keep.py"
+    change = tmp_path / "change.py"
+    for p in (keep, change):
+        p.write_text("x = 1\n", encoding="utf-8")
+    manifest = Manifest()
+    manifest.record(str(keep), [0])
+    manifest.record(str(change), [1])
+
+    change.write_text("x = 22\n", encoding="utf-8")
+    assert manifest.stale() == [str(change)]
+    keep.unlink()
+    assert manifest.stale() == [str(keep), str(change)]
+
+
+def test_skipped_and_unreadable_files_are_not_re_added(tmp_path: Path) -> None:
+    skipped = tmp_path / "skipped.py"
+    skipped.write_text("x = 1\n", encoding="utf-8")
+    broken = tmp_path / "broken.py"
+    broken.symlink_to(tmp_path / "missing.py")
+
+    manifest = Manifest()
+    manifest.skip(str(skipped))
+    manifest.record(str(broken), [])
+    paths = [str(skipped), str(broken)]
+    assert not manifest.diff(paths)
+    assert manifest.diff(paths, retry_skipped=True).added == [str(skipped)]
+
+    skipped.write_text("x = 2\n", encoding="utf-8")
+    assert manifest.diff(paths).modified == [str(skipped)]
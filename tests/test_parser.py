@@ -0,0 +1,370 @@
+"""Tests for Parser chunk spans and context assembly."""
+
+import re
+from unittest.mock import MagicMock, patch
+
+import pygments.lexers
+
+from codefox.utils.parser import Parser
+
+
+def test_chunk_code_spans_use_byte_offsets_and_lines() -> None:
+    content = "x = 'é'\n\ndef f():\n    return 'ü'\n"
+    parser = Parser.get_ts_parser_by_extension(".py")
+    chunks = Parser.chunk_code_spans(parser, content, "python")
+
+    assert [c.text for c in chunks] == ["def f():\n    return 'ü'"]
+    source = content.encode("utf-8")
+    chunk = chunks[0]
+    assert source[chunk.start_byte : chunk.end_byte].decode() == chunk.text
+    assert (chunk.start_line, chunk.end_line) == (3, 4)
+    assert chunk.language == "python"
+
+
+def test_chunk_code_spans_use_per_language_definition_types() -> None:
+    go = "package a\n\nfunc (s *S) Run() int {\n\treturn 1\n}\n"
+    rust = "struct S;\n\nfn run() -> i32 {\n    1\n}\n"
+    python = "@cache\ndef f():\n    return 1\n"
+    cases = [
+        (".go", "go", go),
+        (".rs", "rust", rust),
+        (".py", "python", python),
+    ]
+
+    texts = {}
+    for ext, language, content in cases:
+        parser = Parser.get_ts_parser_by_extension(ext)
+        chunks = Parser.chunk_code_spans(parser, content, language)
+        texts[language] = [c.text for c in chunks]
+
+    assert texts["go"] == ["func (s *S) Run() int {\n\treturn 1\n}"]
+    assert texts["rust"] == ["struct S;", "fn run() -> i32 {\n    1\n}"]
+    assert texts["python"] == ["@cache\ndef f():\n    return 1"]
+
+
+def test_chunk_code_spans_register_function_valued_variables() -> None:
+    content = (
+        "export const handler = async (req) => {\n  return req;\n};\n"
+        "const limit = 5;\n"
+        "let parse = function (s) { return s; }, other = 1;\n"
+        "function plain() {}\n"
+    )
+    for ext, language in ((".js", "javascript"), (".ts", "typescript")):
+        parser = Parser.get_ts_parser_by_extension(ext)
+        chunks = Parser.chunk_code_spans(parser, content, language)
+        assert [c.text for c in chunks] == [
+            "const handler = async (req) => {\n  return req;\n};",
+            "let parse = function (s) { return s; }, other = 1;",
+            "function plain() {}",
+        ]
+        assert [c.symbols for c in chunks] == [
+            [("handler", "function", 1)],
+            [("parse", "function", 5)],
+            [("plain", "function", 6)],
+        ]
+
+
+def test_chunk_code_spans_handle_deep_nesting() -> None:
+    content = "x = " + "[" * 3000 + "]" * 3000 + "\n\ndef f():\n    pass\n"
+    parser = Parser.get_ts_parser_by_extension(".py")
+    chunks = Parser.chunk_code_spans(parser, content, "python")
+    assert [c.start_line for c in chunks] == [3]
+
+
+def test_definition_types_exist_in_grammars() -> None:
+    from tree_sitter_language_pack import get_language
+
+    for language, types in [
+        *Parser.DEFINITION_TYPES.items(),
+        *(
+            (language, values | Parser.DECLARATION_TYPES)
+            for language, values in Parser.FUNCTION_VALUE_TYPES.items()
+        ),
+    ]:
+        grammar = get_language(language)
+        for node_type in types:
+            assert grammar.id_for_node_kind(node_type, True) is not None, (
+                language,
+                node_type,
+            )
+
+
+def test_chunk_code_spans_pack_small_definitions() -> None:
+    content = "".join(
+        f"def h{i}(x):\n    return x + {i}\n\n" for i in range(9)
+    )
+    parser = Parser.get_ts_parser_by_extension(".py")
+    chunks = Parser.chunk_code_spans(parser, content, "python", chunk_size=100)
+
+    source = content.encode("utf-8")
+    assert len(chunks) == 3
+    assert all(len(c.text) <= 100 for c in chunks)
+    assert [c.start_line for c in chunks] == [1, 10, 19]
+    for chunk in chunks:
+        assert source[chunk.start_byte : chunk.end_byte].decode() == chunk.text
+
+
+def test_chunk_code_spans_split_oversized_definitions() -> None:
+    methods = "".join(
+        f"    def m{i}(self):\n        return {i}\n\n" for i in range(12)
+    )
+    content = f"class Big(Base):\n{methods}"
+    parser = Parser.get_ts_parser_by_extension(".py")
+    chunks = Parser.chunk_code_spans(parser, content, "python", chunk_size=120)
+
+    source = content.encode("utf-8")
+    assert len(chunks) > 1
+    assert chunks[0].text.startswith("class Big(Base):\n    def m0(self):")
+    for chunk in chunks[1:]:
+        header, _, body = chunk.text.partition("\n")
+        assert header == "class Big(Base):"
+        assert body.startswith("    def m")
+        assert len(body) <= 120
+        assert source[chunk.start_byte : chunk.end_byte].decode() == body
+    assert chunks[-1].end_line == content.rstrip().count("\n") + 1
+
+
+def test_chunk_code_spans_attach_symbols_to_chunks() -> None:
+    content = (
+        "class Service:\n    def run(self):\n        pass\n\n\n"
+        "@cache\ndef helper():\n    pass\n"
+    )
+    parser = Parser.get_ts_parser_by_extension(".py")
+    chunks = Parser.chunk_code_spans(parser, content, "python")
+
+    assert [c.symbols for c in chunks] == [
+        [("Service", "class", 1), ("run", "function", 2)],
+        [("helper", "function", 7)],
+    ]
+
+
+def test_get_files_context_emits_line_ranges() -> None:
+    rag = MagicMock()
+    rag.search.return_value = [
+        {
+            "path": "a.py",
+            "text": "def a(): pass",
+            "start_line": 3,
+            "end_line": 4,
+        },
+        {"path": "b.py", "text": "legacy"},
+    ]
+    out = Parser.get_files_context(rag, "query", parse_diff=False)
+    assert "<file path='a.py' lines='3-4'>\ndef a(): pass\n</file>" in out
+    assert "<file path='b.py'>\nlegacy\n</file>" in out
+
+
+def test_merge_context_chunks_joins_ranges_per_file() -> None:
+    source = [f"line {n}" for n in range(1, 21)]
+
+    def chunk(path: str, start: int, end: int, header: str = "") -> dict:
+        text = "\n".join(source[start - 1 : end])
+        return {
+            "path": path,
+            "text": f"{header}\n{text}" if header else text,
+            "start_line": start,
+            "end_line": end,
+        }
+
+    entries = Parser.merge_context_chunks(
+        [
+            chunk("b.py", 2, 3),
+            chunk("a.py", 5, 8),
+            chunk("b.py", 3, 6),
+            chunk("b.py", 7, 9, header="class Big:"),
+            chunk("b.py", 15, 16),
+        ]
+    )
+
+    assert [e["path"] for e in entries] == ["b.py", "a.py"]
+    assert entries[0]["ranges"] == [(2, 9), (15, 16)]
+    assert entries[0]["text"] == "\n".join(
+        [*source[1:9], "...", *source[14:16]]
+    )
+    out = Parser._format_context_block(entries[0])
+    assert out.startswith("<file path='b.py' lines='2-9, 15-16'>\nline 2\n")
+
+
+def test_get_files_context_packs_blocks_past_an_oversized_one() -> None:
+    def chunk(path: str, size: int) -> dict:
+        return {"path": path, "text": "x" * size, "start_line": 1}
+
+    rag = MagicMock()
+    rag.search.return_value = [
+        chunk("a.py", 50),
+        chunk("big.py", 400),
+        chunk("b.py", 50),
+        chunk("c.py", 50),
+    ]
+    out = Parser.get_files_context(
+        rag, "query", max_rag_chars=300, parse_diff=False
+    )
+    assert re.findall(r"<file path='([^']+)'", out) == ["a.py", "b.py", "c.py"]
+    assert len(out) <= 300
+    assert Parser.context_k(4096, 1000) == 13
+    assert Parser.context_k(100, 1000) == Parser.min_context_k
+
+
+_DIFF = """diff --git a/a.py b/a.py
+--- a/a.py
++++ b/a.py
+@@ -1,2 +1,2 @@
+-alpha = 1
++alpha = 2
+@@ -9,1 +9,1 @@
++    beta()
+diff --git a/b.py b/b.py
+--- a/b.py
++++ /dev/null
+@@ -1 +0,0 @@
+-gamma = True
+"""
+
+
+def test_split_diff_hunks_by_file_and_hunk() -> None:
+    hunks = Parser.split_diff_hunks(_DIFF)
+    assert [path for path, _ in hunks] == ["a.py", "a.py", "b.py"]
+    assert hunks[0][1] == "@@ -1,2 +1,2 @@\n-alpha = 1\n+alpha = 2"
+    assert [path for path, _ in Parser.split_diff_hunks(_DIFF, 2)] == [
+        "a.py",
+        "b.py",
+    ]
+    assert len(Parser.split_diff_hunks(_DIFF, 1)) == 1
+
+
+def test_get_hunks_context_shares_budget_across_hunks() -> None:
+    def chunk(path: str, line: int) -> dict:
+        return {
+            "path": path,
+            "text": "x" * 40,
+            "start_line": line,
+            "end_line": line + 1,
+        }
+
+    rag = MagicMock()
+    rag.search_many.return_value = [
+        [chunk("big.py", 1), chunk("big.py", 5), chunk("shared.py", 1)],
+        [chunk("shared.py", 1), chunk("big.py", 9)],
+        [chunk("gone.py", 1)],
+    ]
+    out = Parser.get_hunks_context(rag, _DIFF, k=3, max_rag_chars=260)
+
+    queries = rag.search_many.call_args.args[0]
+    assert len(queries) == 3
+    assert "alpha" in queries[0] and "gamma" in queries[2]
+    paths = re.findall(r"<file path='([^']+)' lines='(\d+)", out)
+    assert paths == [("shared.py", "1"), ("big.py", "1"), ("gone.py", "1")]
+
+
+def test_get_hunks_context_reserves_each_hunks_best_chunk() -> None:
+    def chunk(path: str, size: int) -> dict:
+        return {"path": path, "text": "x" * size, "start_line": 1}
+
+    diff = "".join(
+        f"diff --git a/{name}.py b/{name}.py\n--- a/{name}.py\n"
+        f"+++ b/{name}.py\n@@ -1 +1 @@\n+{name} = 1\n"
+        for name in "abcde"
+    )
+    rag = MagicMock()
+    rag.search_many.return_value = [[chunk("a0.py", 2500)]] + [
+        [chunk(f"{name}0.py", 300), chunk(f"{name}1.py", 300)]
+        for name in "bcde"
+    ]
+    out = Parser.get_hunks_context(rag, diff, k=2, max_rag_chars=4096)
+
+    paths = re.findall(r"<file path='([^']+)'", out)
+    assert {"a0.py", "b0.py", "c0.py", "d0.py", "e0.py"} <= set(paths)
+    assert len(out) <= 4096
+
+
+def test_chunk_text_spans_split_sentences_as_exact_slices() -> None:
+    text = "First one. Second one!\nThird (yes.) Fourth?"
+    chunks = Parser.chunk_text_spans(text, chunk_size=10, overlap=0)
+    assert [c.text for c in chunks] == [
+        "First one.",
+        "Second one!",
+        "Third (yes.)",
+        "Fourth?",
+    ]
+    assert [c.start_line for c in chunks] == [1, 1, 2, 2]
+
+
+def test_markdown_headings_start_new_chunks() -> None:
+    text = "# Intro\nShort. Text.\n\n## Usage\nRun it.\n```\nx = 1. y\n```\n"
+    chunks = Parser.chunk_text_spans(text, 1000, 0, language="markdown")
+    assert [c.text for c in chunks] == [
+        "# Intro\nShort. Text.",
+        "## Usage\nRun it.\n```\nx = 1. y\n```",
+    ]
+    assert (chunks[1].start_line, chunks[1].end_line) == (4, 8)
+
+
+def test_yaml_top_level_keys_start_new_chunks() -> None:
+    text = "build:\n  steps: [a, b]\n# note\ntest:\n  run: pytest\n"
+    chunks = Parser.chunk_text_spans(text, 1000, 0, language="yaml")
+    assert [c.text for c in chunks] == [
+        "build:\n  steps: [a, b]\n# note",
+        "test:\n  run: pytest",
+    ]
+
+
+def test_nltk_splitter_falls_back_when_punkt_is_missing() -> None:
+    with patch.object(Parser, "_punkt_available", None):
+        with patch("nltk.data.find", side_effect=LookupError):
+            with patch("nltk.download", return_value=False) as download:
+                chunks = Parser.chunk_text_spans(
+                    "A b. C d.", 3, 0, splitter="nltk"
+                )
+                Parser.chunk_text_spans("E f.", 3, 0, splitter="nltk")
+        assert download.call_count == 1
+    assert [c.text for c in chunks] == ["A b.", "C d."]
+
+
+def test_resolve_splitter_falls_back_without_punkt() -> None:
+    with patch.object(Parser, "ensure_punkt", return_value=False) as ensure:
+        assert Parser.resolve_splitter("nltk") == "builtin"
+        assert Parser.resolve_splitter("builtin") == "builtin"
+    assert ensure.call_count == 1
+    with patch.object(Parser, "ensure_punkt", return_value=True):
+        assert Parser.resolve_splitter("nltk") == "nltk"
+
+
+def test_language_and_parser_are_memoized_per_extension() -> None:
+    with (
+        patch.object(Parser, "_languages", {}),
+        patch.object(Parser, "_ts_parsers", {}),
+        patch(
+            "pygments.lexers.get_lexer_for_filename",
+            wraps=pygments.lexers.get_lexer_for_filename,
+        ) as guess,
+    ):
+        first = Parser.get_ts_parser_by_extension(".py")
+        assert Parser.get_ts_parser_by_extension(".PY") is first
+        assert Parser.get_ts_parser_by_extension(".pyi") is first
+        assert not Parser.is_supported_extension(".xyz")
+        assert not Parser.is_supported_extension(".xyz")
+    assert first is not None
+    assert guess.call_count == 3
+
+
+def test_pack_context_measures_each_chunk_once() -> None:
+    from codefox.utils.token_budget import TokenCounter
+
+    chunks = [
+        {
+            "path": f"m{i % 50}.py",
+            "text": "\n".join(f"v{i}_{j} = {j}" for j in range(10)),
+            "start_line": i * 20 + 1,
+            "end_line": i * 20 + 10,
+        }
+        for i in range(400)
+    ]
+    values = [1.0 / (i + 1) for i in range(len(chunks))]
+    counter = TokenCounter()
+    with patch.object(counter, "count", wraps=counter.count) as count:
+        out = Parser._pack_context(
+            chunks, values, 0, 5000, counter, reserved=[3, 7]
+        )
+    assert count.call_count <= len(chunks) + 5
+    assert counter.count(out) <= 5000
+    assert "v3_0 = 0" in out and "v7_0 = 0" in out
@@ -0,0 +1,61 @@
+"""Tests for the LRU query vector and search result cache."""
+
+from pathlib import Path
+
+import numpy as np
+
+from codefox.utils.query_cache import QueryCache
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    cache = QueryCache(max_entries=2)
+    cache.put_vector("a", np.ones(2))
+    cache.put_vector("b", np.ones(2))
+    assert cache.get_vector("a") is not None
+    cache.put_vector("c", np.ones(2))
+
+    assert list(cache.vectors) == ["a", "c"]
+    assert cache.get_vector("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_results_are_keyed_by_k_and_index_version() -> None:
+    cache = QueryCache()
+    cache.put_results("q", 5, "v1", [3, 1])
+    assert cache.get_results("q", 5, "v1") == [3, 1]
+    assert cache.get_results("q", 6, "v1") is None
+    assert cache.get_results("q", 5, "v2") is None
+    assert QueryCache.normalize("  def   foo \n") == "def foo"
+
+
+def test_disabled_cache_stores_nothing() -> None:
+    cache = QueryCache(max_entries=0)
+    cache.put_vector("a", np.ones(2))
+    assert cache.get_vector("a") is None
+
+
+def test_persisted_cache_round_trips_per_model(tmp_path: Path) -> None:
+    path = tmp_path / "query_cache"
+    cache = QueryCache(path=path, key="model:None")
+    cache.put_vector("q", np.arange(3, dtype="float32"))
+    cache.put_results("q", 5, "v1", [7])
+    cache.save()
+
+    loaded = QueryCache(path=path, key="model:None")
+    vector = loaded.get_vector("q")
+    assert vector is not None
+    assert vector.tolist() == [0.0, 1.0, 2.0]
+    assert loaded.get_results("q", 5, "v1") == [7]
+    assert not QueryCache(path=path, key="other:None").vectors
+
+
+def test_persisted_results_depend_on_search_settings(tmp_path: Path) -> None:
+    path = tmp_path / "query_cache"
+    cache = QueryCache(path=path, key="model:None", search_key="rff_k=60")
+    cache.put_vector("q", np.ones(2, dtype="float32"))
+    cache.put_results("q", 5, "v1", [7])
+    cache.save()
+
+    loaded = QueryCache(path=path, key="model:None", search_key="rff_k=10")
+    assert loaded.get_vector("q") is not None
+    assert loaded.get_results("q", 5, "v1") is None
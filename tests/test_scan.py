@@ -73,3 +73,32 @@ def test_get_branchs_prefers_args_over_config() -> None:
     src, tgt = scan._get_branchs()
     assert src == "feat"
     assert tgt == "master"
+
+
+def test_execute_remote_falls_back_without_daemon() -> None:
+    with patch("codefox.cli.scan.DaemonClient") as client:
+        client.return_value.connect.return_value = None
+        assert Scan.execute_remote({}) is False
+        assert Scan.execute_remote({"ci": True}) is False
+        client.return_value.connect.assert_called_once()
+
+
+def test_execute_remote_prints_daemon_result() -> None:
+    with (
+        patch("codefox.cli.scan.DaemonClient") as client,
+        patch.object(Scan, "_show_result") as show,
+        patch("codefox.cli.scan.print"),
+        patch.dict("os.environ", {"CODEFOX_API_KEY": "k"}),
+    ):
+        client.return_value.send.return_value = {
+            "ok": True,
+            "text": "review",
+            "output": "",
+        }
+        assert Scan.execute_remote({"sourceBranch": "a"}) is True
+
+    request = client.return_value.send.call_args.args[1]
+    assert request["command"] == "scan"
+    assert request["args"] == {"sourceBranch": "a"}
+    assert request["env"] == {"CODEFOX_API_KEY": "k"}
+    show.assert_called_once_with("review")
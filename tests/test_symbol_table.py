@@ -0,0 +1,47 @@
+"""Tests for the persisted definition symbol table."""
+
+from pathlib import Path
+
+from codefox.utils.symbol_table import SymbolTable
+
+
+def test_parse_query_recognizes_definition_lookups() -> None:
+    assert SymbolTable.parse_query("class UserService methods") == (
+        "UserService",
+        "class",
+    )
+    assert SymbolTable.parse_query("def validate_token") == (
+        "validate_token",
+        "function",
+    )
+    assert SymbolTable.parse_query("function create_user()") == (
+        "create_user",
+        "function",
+    )
+    assert SymbolTable.parse_query("Service.run") == ("run", None)
+    assert SymbolTable.parse_query("how authentication works") is None
+    assert SymbolTable.parse_query("class") == ("class", None)
+    assert SymbolTable.parse_query("") is None
+
+
+def test_lookup_filters_by_kind_and_survives_save(tmp_path: Path) -> None:
+    table = SymbolTable()
+    table.add(0, [("Foo", "class", 1), ("run", "function", 3)])
+    table.add(1, [("run", "function", 10), ("run", "function", 20)])
+    table.add(2, [("Foo", "function", 5)])
+
+    assert table.lookup("run") == [0, 1]
+    assert table.lookup("Foo", "class") == [0]
+    assert table.lookup("missing") == []
+    assert len(table) == 5
+
+    table.compact(lambda chunk_id: chunk_id != 0)
+    path = tmp_path / "symbols.json"
+    table.save(path)
+    loaded = SymbolTable.load(path)
+    assert loaded is not None
+    assert loaded.lookup("run") == [1]
+    assert loaded.lookup("Foo", "class") == []
+
+    path.write_text('{"version": 0}', encoding="utf-8")
+    assert SymbolTable.load(path) is None
@@ -0,0 +1,46 @@
+"""Tests for token estimates, budget splitting and the knapsack packer."""
+
+from unittest.mock import patch
+
+from codefox.utils.token_budget import TokenBudget, TokenCounter, pack
+
+
+def _heuristic_counter() -> TokenCounter:
+    with patch.object(TokenCounter, "_load_encoding", return_value=None):
+        return TokenCounter("some-model")
+
+
+def test_heuristic_counter_counts_and_truncates() -> None:
+    counter = _heuristic_counter()
+    assert not counter.exact
+    assert counter.count("") == 0
+    assert counter.count("x" * 32) == 10
+    assert counter.truncate("x" * 100, 10) == "x" * 32
+    assert counter.truncate("short", 10) == "short"
+
+
+def test_pack_beats_greedy_by_value() -> None:
+    # Greedy by value takes the 60-cost item and then nothing else fits.
+    assert pack([60, 50, 50], [1.0, 0.8, 0.8], 100) == [1, 2]
+    assert pack([120], [1.0], 100) == []
+    assert pack([], [], 100) == []
+
+
+def test_pack_rounds_costs_up_for_large_capacities() -> None:
+    chosen = pack([500, 500, 1], [1.0, 1.0, 1.0], 1000, resolution=10)
+    assert sum([500, 500, 1][i] for i in chosen) <= 1000
+    assert len(chosen) == 2
+
+
+def test_budget_gives_unused_diff_share_to_rag() -> None:
+    budget = TokenBudget(_heuristic_counter(), 10_000, completion_tokens=1000)
+    available = 9000 - 1000 - 32
+    diff_tokens, rag_tokens = budget.split("x" * 100, "y" * 320)
+    assert (diff_tokens, rag_tokens) == (100, available - 100)
+
+    diff_tokens, rag_tokens = budget.split("x" * 100, "y" * 100_000)
+    assert diff_tokens == int(available * budget.diff_share)
+    assert diff_tokens + rag_tokens == available
+
+    diff_tokens, rag_tokens = budget.split("", "y" * 100_000, with_rag=False)
+    assert (diff_tokens, rag_tokens) == (8000, 0)